@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+
+from fingerprinting.analysis.record import TlsRecordType
+from fingerprinting.analysis.inference import FrameInference
+from fingerprinting.analysis.columns import DIRECTIONS, FrameStore, RecordStore
+
+# places every TLS record and HTTP/2 frame on the encrypted byte stream of its
+# direction, i.e. at the TCP payload offset an observer on the wire counts,
+# and answers point and range queries over it with binary searches. HTTP/2
+# plaintext is assumed to start with the first record that carries a frame:
+# TLS 1.3 sends its encrypted handshake as application data records before
+# it, and a NewSessionTicket after it is still counted as HTTP/2 bytes
+
+TLS_HEADER_LENGTH = 5
+TLS_TAG_LENGTH = 16
+
+# AES-GCM in TLS 1.2 sends an 8-byte explicit nonce in front of the payload,
+# the other AEAD record layouts only append to it
+TLS_EXPLICIT_NONCE = 8
+
+NOT_FOUND = -1
+
+
+class ByteRangeIndex(object):
+
+    RECORD_DTYPE = numpy.dtype([
+        ("id", numpy.int64),
+        ("packet", numpy.int64),
+        ("type", numpy.uint8),
+        ("start", numpy.int64),
+        ("finish", numpy.int64),
+    ])
+
+    FRAME_DTYPE = numpy.dtype([
+        ("id", numpy.int64),
+        ("packet", numpy.int64),
+        ("record", numpy.int64),
+        ("stream", numpy.int64),
+        ("object", numpy.int64),
+        ("type", numpy.uint8),
+        ("start", numpy.int64),
+        ("finish", numpy.int64),
+        ("timestamp", numpy.float64),
+    ])
+
+    def __init__(self, records, frames, objects=None, overhead=None):
+
+        if overhead is None:
+            overhead = FrameInference.estimate_overhead(records.select(type=TlsRecordType.APPLICATION_DATA))
+
+        self.overhead = overhead
+        self.prefix = TLS_EXPLICIT_NONCE if overhead >= TLS_TAG_LENGTH + TLS_EXPLICIT_NONCE else 0
+
+        # per direction arrays, both sorted by start and non-overlapping
+        self.records = {}
+        self.frames = {}
+        self.record_bounds = {}
+        self.frame_bounds = {}
+
+        for direction in DIRECTIONS:
+
+            direction_records = records.select(direction=direction).sort("id").rows
+            direction_frames = frames.select(direction=direction).sort("id").rows
+
+            self.records[direction], plaintext = self.place_records(direction_records, direction_frames)
+            self.frames[direction] = self.place_frames(
+                direction_frames, self.records[direction], plaintext, objects or {}
+            )
+
+            self.record_bounds[direction] = self.get_bounds(self.records[direction])
+            self.frame_bounds[direction] = self.get_bounds(self.frames[direction])
+
+    @classmethod
+    def from_application(cls, application, **options):
+
+        # web objects are numbered by their position in their stream
+        objects = {}
+
+        for stream in application.streams.values():
+            for position, web_object in enumerate(stream.objects):
+
+                objects[web_object.request["frame"]] = position
+
+                if web_object.response:
+                    objects[web_object.response["frame"]] = position
+
+                for entry in web_object.body:
+                    objects[entry["frame"]] = position
+
+        return cls(
+            RecordStore.from_application(application),
+            FrameStore.from_application(application),
+            objects,
+            **options
+        )
+
+    def place_records(self, rows, frames):
+
+        index = numpy.zeros(len(rows), dtype=self.RECORD_DTYPE)
+        index["id"] = rows["id"]
+        index["packet"] = rows["packet"]
+        index["type"] = rows["type"]
+
+        length = rows["length"] + TLS_HEADER_LENGTH
+        index["finish"] = numpy.cumsum(length)
+        index["start"] = index["finish"] - length
+
+        # only application data records from the first one a frame was mapped
+        # to onwards carry HTTP/2 frames
+        carrier = rows["type"] == TlsRecordType.APPLICATION_DATA.value
+        carrier[0:self.get_first_carrier(rows, frames)] = False
+
+        plaintext = numpy.where(carrier, numpy.maximum(rows["length"] - self.overhead, 0), 0)
+        plaintext_finish = numpy.cumsum(plaintext)
+
+        return index, (plaintext_finish - plaintext, plaintext_finish)
+
+    @staticmethod
+    def get_first_carrier(rows, frames):
+
+        mapped = numpy.flatnonzero(numpy.isin(rows["id"], frames["record"][frames["record"] != NOT_FOUND]))
+
+        return int(mapped[0]) if len(mapped) else 0
+
+    def place_frames(self, rows, records, plaintext, objects):
+
+        index = numpy.zeros(len(rows), dtype=self.FRAME_DTYPE)
+        index["id"] = rows["id"]
+        index["packet"] = rows["packet"]
+        index["stream"] = rows["stream"]
+        index["type"] = rows["type"]
+        index["timestamp"] = rows["timestamp"]
+        index["object"] = [objects.get(frame_id, NOT_FOUND) for frame_id in rows["id"].tolist()]
+
+        if len(rows) == 0 or len(records) == 0:
+            index["record"] = NOT_FOUND
+            return index
+
+        # frames follow each other on the decrypted stream of their direction,
+        # so the first and the last byte of every frame fall into known records
+        plaintext_end = numpy.cumsum(rows["length"])
+        plaintext_start = plaintext_end - rows["length"]
+
+        index["start"], index["record"] = self.locate(plaintext_start, records, plaintext)
+        finish, _ = self.locate(plaintext_end - 1, records, plaintext)
+        index["finish"] = finish + 1
+
+        return index
+
+    def locate(self, offsets, records, plaintext):
+
+        # encrypted offset of every decrypted offset and the record holding it
+        record_start, record_finish = plaintext
+        position = numpy.minimum(numpy.searchsorted(record_finish, offsets, side="right"), len(records) - 1)
+        start = records["start"][position] + TLS_HEADER_LENGTH + self.prefix + offsets - record_start[position]
+
+        return start, records["id"][position]
+
+    @staticmethod
+    def get_bounds(index):
+
+        # searchsorted on a field of a structured array copies it on every
+        # call, so the bounds are kept as contiguous arrays of their own
+        return numpy.ascontiguousarray(index["start"]), numpy.ascontiguousarray(index["finish"])
+
+    @staticmethod
+    def find(bounds, offsets):
+
+        # position of the entry covering every offset, NOT_FOUND in the gaps
+        starts, finishes = bounds
+        offsets = numpy.asarray(offsets, dtype=numpy.int64)
+
+        if len(starts) == 0:
+            return numpy.full(offsets.shape, NOT_FOUND)
+
+        position = numpy.searchsorted(starts, offsets, side="right") - 1
+        covered = (position >= 0) & (offsets < finishes[numpy.maximum(position, 0)])
+
+        return numpy.where(covered, position, NOT_FOUND)
+
+    @staticmethod
+    def get_slice(bounds, start, finish):
+
+        # entries with at least one byte in [start, finish)
+        starts, finishes = bounds
+
+        first = numpy.searchsorted(finishes, start, side="right")
+        last = numpy.searchsorted(starts, finish, side="left")
+
+        return slice(first, max(first, last))
+
+    def lookup(self, index, bounds, column, offsets):
+
+        position = self.find(bounds, offsets)
+
+        if len(index) == 0:
+            return position
+
+        return numpy.where(position >= 0, index[column][position], NOT_FOUND)
+
+    def frames_at(self, direction, offsets):
+
+        return self.lookup(self.frames[direction], self.frame_bounds[direction], "id", offsets)
+
+    def records_at(self, direction, offsets):
+
+        return self.lookup(self.records[direction], self.record_bounds[direction], "id", offsets)
+
+    def streams_at(self, direction, offsets):
+
+        return self.lookup(self.frames[direction], self.frame_bounds[direction], "stream", offsets)
+
+    def objects_at(self, direction, offsets):
+
+        # (stream, position of the object in that stream) of every offset,
+        # bytes of frames that belong to no object give NOT_FOUND for both
+        objects = self.lookup(self.frames[direction], self.frame_bounds[direction], "object", offsets)
+        streams = self.streams_at(direction, offsets)
+
+        return numpy.where(objects != NOT_FOUND, streams, NOT_FOUND), objects
+
+    def frames_between(self, direction, start, finish):
+
+        return self.frames[direction][self.get_slice(self.frame_bounds[direction], start, finish)]
+
+    def records_between(self, direction, start, finish):
+
+        return self.records[direction][self.get_slice(self.record_bounds[direction], start, finish)]
+
+    def length(self, direction):
+
+        index = self.records[direction]
+
+        return int(index["finish"][-1]) if len(index) else 0
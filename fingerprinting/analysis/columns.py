@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+
+from enum import Enum
+
+from fingerprinting.analysis.h2 import Http2Frame
+from fingerprinting.analysis.record import TlsRecordType
+
+DIRECTIONS = ("C2S", "S2C")
+
+NO_RECORD = -1
+
+
+def encode_direction(direction):
+    return DIRECTIONS.index(direction)
+
+
+def packet_direction(packet):
+    return "S2C" if packet.source_port == 443 else "C2S"
+
+
+class ColumnStore(object):
+
+    DTYPE = None
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, column):
+        return self.rows[column]
+
+    @classmethod
+    def encode(cls, column, value):
+
+        if isinstance(value, Enum):
+            return value.value
+        elif column == "direction" and isinstance(value, str):
+            return encode_direction(value)
+        else:
+            return value
+
+    def where(self, mask):
+
+        return type(self)(self.rows[mask])
+
+    def select(self, **conditions):
+
+        mask = numpy.ones(len(self.rows), dtype=bool)
+
+        for column, value in conditions.items():
+
+            if isinstance(value, (list, tuple, set, frozenset)):
+                values = [self.encode(column, v) for v in value]
+                mask &= numpy.isin(self.rows[column], values)
+            else:
+                mask &= self.rows[column] == self.encode(column, value)
+
+        return self.where(mask)
+
+    def between(self, column, lower, upper):
+
+        values = self.rows[column]
+        return self.where((values >= lower) & (values < upper))
+
+    def sort(self, column):
+
+        return type(self)(numpy.sort(self.rows, order=column, kind="stable"))
+
+    def group_count(self, key):
+
+        return numpy.unique(self.rows[key], return_counts=True)
+
+    def group_sum(self, key, value):
+
+        keys, inverse = numpy.unique(self.rows[key], return_inverse=True)
+        return keys, numpy.bincount(inverse, weights=self.rows[value], minlength=len(keys))
+
+    def histogram(self, column, bins=10, bounds=None):
+
+        return numpy.histogram(self.rows[column], bins=bins, range=bounds)
+
+    def inter_arrival(self):
+
+        return numpy.diff(numpy.sort(self.rows["timestamp"], kind="stable"))
+
+
+class FrameStore(ColumnStore):
+
+    DTYPE = numpy.dtype([
+        ("id", numpy.int64),
+        ("packet", numpy.int64),
+        ("stream", numpy.int64),
+        ("record", numpy.int64),
+        ("type", numpy.uint8),
+        ("direction", numpy.uint8),
+        ("body", numpy.int64),
+        ("length", numpy.int64),
+        ("timestamp", numpy.float64),
+        ("bytecount_start", numpy.float64),
+        ("bytecount_finish", numpy.float64),
+    ])
+
+    @classmethod
+    def from_frames(cls, frames):
+
+        rows = numpy.fromiter((
+            (
+                frame.id,
+                frame.packet.id,
+                frame.stream_id,
+                frame.last_ssl_record.id if frame.last_ssl_record else NO_RECORD,
+                frame.type.value,
+                encode_direction(frame.direction),
+                frame.body,
+                frame.length,
+                frame.timestamp,
+                frame.bytecount_start,
+                frame.bytecount_finish,
+            )
+            for frame in frames
+        ), dtype=cls.DTYPE)
+
+        return cls(rows)
+
+    @classmethod
+    def from_application(cls, application):
+
+        return cls.from_frames(application.frames.values())
+
+    def types(self):
+
+        return [Http2Frame(value) for value in self.rows["type"]]
+
+
+class RecordStore(ColumnStore):
+
+    DTYPE = numpy.dtype([
+        ("id", numpy.int64),
+        ("packet", numpy.int64),
+        ("type", numpy.uint8),
+        ("direction", numpy.uint8),
+        ("length", numpy.int64),
+        ("content_length", numpy.int64),
+        ("bytecount_index", numpy.int64),
+        ("timestamp", numpy.float64),
+    ])
+
+    @classmethod
+    def from_records(cls, records):
+
+        rows = numpy.fromiter((
+            (
+                record.id,
+                record.packet.id,
+                record.type.value,
+                encode_direction(packet_direction(record.packet)),
+                record.length,
+                record.content_length,
+                record.bytecount_index,
+                record.packet.time_relative,
+            )
+            for record in records
+        ), dtype=cls.DTYPE)
+
+        return cls(rows)
+
+    @classmethod
+    def from_application(cls, application):
+
+        return cls.from_records(application.records)
+
+    def types(self):
+
+        return [TlsRecordType(value) for value in self.rows["type"]]
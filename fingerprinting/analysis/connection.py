@@ -24,7 +24,7 @@ class Connection(object):
 
     def serialize(self):
 
-        base_dictionary = vars(self)
+        base_dictionary = dict(vars(self))
         base_dictionary["error"] = self.error.name
         return base_dictionary
 
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+
+from fingerprinting.analysis.h2 import Http2Frame
+
+# fixed-schema numeric features of an analysed connection and of each of its
+# web objects, so that the captures of a corpus line up as rows of a matrix
+
+SETTINGS = (
+    "ENABLE_PUSH",
+    "MAX_FRAME_SIZE",
+    "HEADER_TABLE_SIZE",
+    "MAX_HEADER_LIST_SIZE",
+    "INITIAL_WINDOW_SIZE",
+    "MAX_CONCURRENT_STREAMS",
+)
+
+# sizes and request times of the first objects of a connection, in the order
+# they were requested; shorter connections are padded with zeros
+SEQUENCE_LENGTH = 32
+
+CONNECTION_COLUMNS = tuple(
+    ["frames_count", "frames_length"] +
+    ["%s_count" % frame_type.name.lower() for frame_type in Http2Frame] +
+    ["%s_length" % frame_type.name.lower() for frame_type in Http2Frame] +
+    ["setting_%s" % name.lower() for name in SETTINGS] +
+    [
+        "streams",
+        "client_streams",
+        "server_streams",
+        "first_stream",
+        "last_stream",
+        "terminated",
+        "objects",
+        "objects_length",
+        "duration",
+    ] +
+    ["object_%d_length" % i for i in range(SEQUENCE_LENGTH)] +
+    ["object_%d_request" % i for i in range(SEQUENCE_LENGTH)]
+)
+
+OBJECT_COLUMNS = (
+    "connection",
+    "position",
+    "stream",
+    "status",
+    "length",
+    "finished",
+    "data_frames",
+    "request",
+    "response_delay",
+    "payload_delay",
+    "payload_duration",
+)
+
+
+def get_applications(state):
+
+    # state is an Application or a ConnectionDemultiplexer
+    if hasattr(state, "applications"):
+        return [application for _, application in sorted(state.applications.items())]
+    else:
+        return [state]
+
+
+def get_objects(application):
+
+    objects = [
+        (web_object.request["timestamp"], stream.id, web_object)
+        for stream in application.streams.values()
+        for web_object in stream.objects
+    ]
+
+    objects.sort(key=lambda entry: entry[0:2])
+
+    return [(stream_id, web_object) for _, stream_id, web_object in objects]
+
+
+def get_connection_features(application, objects):
+
+    frames = application.statistics.serialize()
+    connection = application.connection
+    streams = application.streams.values()
+
+    first_request = objects[0][1].request["timestamp"] if objects else 0.0
+    lengths = [web_object.length for _, web_object in objects[0:SEQUENCE_LENGTH]]
+    requests = [web_object.request["timestamp"] - first_request for _, web_object in objects[0:SEQUENCE_LENGTH]]
+    padding = [0] * (SEQUENCE_LENGTH - len(lengths))
+
+    if streams:
+        duration = max(stream.last_seen for stream in streams) - min(stream.first_seen for stream in streams)
+    else:
+        duration = 0.0
+
+    return (
+        [application.statistics.total_count, application.statistics.total_length] +
+        [frames[frame_type.name]["count"] for frame_type in Http2Frame] +
+        [frames[frame_type.name]["length"] for frame_type in Http2Frame] +
+        [application.settings[name] for name in SETTINGS] +
+        [
+            len(application.streams),
+            len(connection.client_streams),
+            len(connection.server_streams),
+            connection.first_stream,
+            connection.last_stream,
+            connection.terminated,
+            len(objects),
+            sum(web_object.length for _, web_object in objects),
+            duration,
+        ] +
+        lengths + padding +
+        requests + padding
+    )
+
+
+def get_object_features(connection, objects):
+
+    first_request = objects[0][1].request["timestamp"] if objects else 0.0
+
+    for position, (stream_id, web_object) in enumerate(objects):
+
+        request = web_object.request["timestamp"]
+        response = web_object.response.get("timestamp", numpy.nan)
+
+        if web_object.body:
+            payload_start = web_object.body[0]["timestamp"]
+            payload_finish = web_object.body[-1]["timestamp"]
+        else:
+            payload_start = payload_finish = numpy.nan
+
+        yield (
+            connection,
+            position,
+            stream_id,
+            web_object.status,
+            web_object.length,
+            web_object.finished,
+            len(web_object.body),
+            request - first_request,
+            response - request,
+            payload_start - request,
+            payload_finish - payload_start,
+        )
+
+
+def extract_features(state):
+
+    # one row per connection and one row per web object, the "connection"
+    # column of an object is the row of its connection in this capture
+    connections = []
+    objects = []
+
+    for connection, application in enumerate(get_applications(state)):
+
+        application_objects = get_objects(application)
+        connections.append(get_connection_features(application, application_objects))
+        objects.extend(get_object_features(connection, application_objects))
+
+    return (
+        numpy.array(connections, dtype=numpy.float64).reshape(-1, len(CONNECTION_COLUMNS)),
+        numpy.array(objects, dtype=numpy.float64).reshape(-1, len(OBJECT_COLUMNS))
+    )
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+from fingerprinting.analysis.h2f import Settings
+from fingerprinting.analysis.parser import FieldWrapper
+from fingerprinting.analysis.h2 import Http2Frame, Http2Settings
+from fingerprinting.analysis.record import TlsRecordType
+
+# tshark -T fields flattens the dissection tree: every field is printed once per
+# packet with all of its occurrences joined by AGGREGATOR. Fields that occur once
+# per TLS record or HTTP/2 frame are zipped back together, and fields that only
+# occur for some frame types are consumed in frame order.
+
+AGGREGATOR = "\x1f"
+
+SEPARATOR = "\t"
+
+FLAG_END_STREAM = 0x01
+FLAG_ACK = 0x01
+FLAG_END_HEADERS = 0x04
+FLAG_PADDED = 0x08
+FLAG_PRIORITY = 0x20
+
+PACKET_FIELDS = [
+    "frame.number",
+    "frame.time_delta",
+    "frame.len",
+    "frame.time_relative",
+    "ip.src",
+    "ip.dst",
+    "tcp.srcport",
+    "tcp.dstport",
+    "tcp.stream",
+]
+
+RECORD_FIELDS = [
+    "ssl.record.content_type",
+    "ssl.record.length",
+    "ssl.handshake.type",
+    "ssl.handshake.length",
+]
+
+FRAME_FIELDS = [
+    "http2.magic",
+    "http2.type",
+    "http2.length",
+    "http2.streamid",
+    "http2.flags",
+    "http2.exclusive",
+    "http2.headers.weight_real",
+    "http2.stream_dependency",
+    "http2.header.count",
+    "http2.header.name",
+    "http2.header.value",
+    "http2.settings.id",
+    "http2.goaway.last_stream_id",
+    "http2.goaway.error",
+    "http2.error",
+    "http2.window_update.window_size_increment",
+] + list(Settings.JSON_VALUES.values())
+
+FIELDS = PACKET_FIELDS + RECORD_FIELDS + FRAME_FIELDS
+
+BOOLEAN_FIELDS = {"http2.exclusive"}
+
+HEADER_FIELDS = {
+    ":path": "http2.headers.path",
+    ":status": "http2.headers.status",
+    ":method": "http2.headers.method",
+}
+
+
+def show_flag(flags, mask):
+    return "1" if flags & mask else "0"
+
+
+class FieldsRow(object):
+
+    def __init__(self, line):
+
+        self.values = {}
+
+        for field, value in zip(FIELDS, line.rstrip("\r\n").split(SEPARATOR)):
+
+            occurrences = value.split(AGGREGATOR) if value else []
+
+            if field in BOOLEAN_FIELDS:
+                occurrences = ["1" if v in ("1", "True", "true") else "0" for v in occurrences]
+
+            self.values[field] = occurrences
+
+    def first(self, field):
+
+        occurrences = self.values.get(field)
+        return occurrences[0] if occurrences else None
+
+    def layer(self, name, fields):
+
+        return FieldWrapper(name, {
+            field: self.first(field)
+            for field in fields
+            if self.first(field) is not None
+        })
+
+    @property
+    def packet(self):
+
+        return FieldWrapper("packet", {
+            "frame": self.layer("frame", PACKET_FIELDS[0:4]),
+            "ip": self.layer("ip", PACKET_FIELDS[4:6]),
+            "tcp": self.layer("tcp", PACKET_FIELDS[6:9]),
+        })
+
+    @property
+    def records(self):
+
+        records = []
+        handshakes = list(zip(self.values["ssl.handshake.type"], self.values["ssl.handshake.length"]))
+
+        for content_type, length in zip(self.values["ssl.record.content_type"], self.values["ssl.record.length"]):
+
+            fields = {
+                "ssl.record.length": length,
+                "ssl.record.content_type": content_type
+            }
+
+            if int(content_type) == TlsRecordType.HANDSHAKE.value:
+
+                types = self.group_handshakes(handshakes, int(length))
+
+                # like the PDML path, a record is typed by its first message,
+                # records holding none are the encrypted handshake messages
+                if types:
+                    fields["ssl.handshake"] = FieldWrapper("ssl.handshake", {
+                        "ssl.handshake.type": types[0]
+                    })
+
+            records.append(FieldWrapper("ssl.record", fields))
+
+        return records
+
+    @staticmethod
+    def group_handshakes(handshakes, record_length):
+
+        # a record can carry several handshake messages, each a 4-byte header
+        # and its body, so the messages are taken in order while they fit
+        types = []
+        consumed = 0
+
+        while handshakes and consumed + 4 + int(handshakes[0][1]) <= record_length:
+            handshake_type, handshake_length = handshakes.pop(0)
+            consumed += 4 + int(handshake_length)
+            types.append(handshake_type)
+
+        return types
+
+    @property
+    def frames(self):
+
+        frames = [
+            FieldWrapper("http2.stream", {"http2.magic": magic})
+            for magic in self.values["http2.magic"]
+        ]
+
+        queues = {field: iter(self.values[field]) for field in FRAME_FIELDS}
+
+        frame_fields = zip(
+            self.values["http2.type"],
+            self.values["http2.length"],
+            self.values["http2.streamid"],
+            self.values["http2.flags"]
+        )
+
+        for type_value, length, stream_id, flags in frame_fields:
+
+            frame_type = Http2Frame(int(type_value))
+            flags = int(flags, 0)
+
+            fields = {
+                "http2.type": type_value,
+                "http2.length": length,
+                "http2.streamid": stream_id,
+                "http2.flags": FieldWrapper("http2.flags", {
+                    "http2.flags.eh": show_flag(flags, FLAG_END_HEADERS),
+                    "http2.flags.padded": show_flag(flags, FLAG_PADDED),
+                    "http2.flags.priority": show_flag(flags, FLAG_PRIORITY),
+                    "http2.flags.ack.settings": show_flag(flags, FLAG_ACK),
+                    "http2.flags.end_stream": show_flag(flags, FLAG_END_STREAM)
+                })
+            }
+
+            if frame_type == Http2Frame.PRIORITY or (frame_type == Http2Frame.HEADERS and flags & FLAG_PRIORITY):
+                fields["http2.exclusive"] = next(queues["http2.exclusive"])
+                fields["http2.headers.weight_real"] = next(queues["http2.headers.weight_real"])
+                fields["http2.stream_dependency"] = next(queues["http2.stream_dependency"])
+
+            if frame_type == Http2Frame.HEADERS or frame_type == Http2Frame.PUSH_PROMISE:
+                fields["http2.header"] = self.parse_headers(queues)
+            elif frame_type == Http2Frame.SETTINGS:
+                fields["http2.settings"] = self.parse_settings(queues, int(length))
+            elif frame_type == Http2Frame.GO_AWAY:
+                fields["http2.goaway.error"] = next(queues["http2.goaway.error"])
+                fields["http2.goaway.last_stream_id"] = next(queues["http2.goaway.last_stream_id"])
+            elif frame_type == Http2Frame.RST_STREAM:
+                fields["http2.error"] = next(queues["http2.error"])
+            elif frame_type == Http2Frame.WINDOW_UPDATE:
+                field = "http2.window_update.window_size_increment"
+                fields[field] = next(queues[field])
+
+            frames.append(FieldWrapper("http2.stream", fields))
+
+        return frames
+
+    @staticmethod
+    def parse_headers(queues):
+
+        headers = []
+
+        for _ in range(int(next(queues["http2.header.count"], 0))):
+
+            name = next(queues["http2.header.name"])
+            value = next(queues["http2.header.value"])
+
+            if name in HEADER_FIELDS:
+                headers.append(FieldWrapper("http2.header", {HEADER_FIELDS[name]: value}))
+
+        return headers
+
+    @staticmethod
+    def parse_settings(queues, length):
+
+        settings = []
+
+        # every SETTINGS entry is a 16-bit identifier followed by a 32-bit value
+        for _ in range(length // 6):
+
+            setting_id = next(queues["http2.settings.id"])
+
+            # identifiers tshark has no value field for (e.g. extensions from
+            # later RFCs) carry nothing to consume and are skipped
+            try:
+                field = Settings.JSON_VALUES[Http2Settings(int(setting_id))]
+            except (ValueError, KeyError):
+                continue
+
+            settings.append(FieldWrapper("http2.settings", {
+                "http2.settings.id": setting_id,
+                field: next(queues[field])
+            }))
+
+        return settings
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+
+# every web object of a labelled capture becomes one (length, resource, label)
+# entry; entries are kept sorted by length so that the objects within a size
+# tolerance are a contiguous slice found with two binary searches
+
+
+def get_web_objects(state):
+
+    # state is an Application or a ConnectionDemultiplexer
+    applications = state.applications.values() if hasattr(state, "applications") else [state]
+
+    for application in applications:
+        for stream in application.streams.values():
+            for web_object in stream.objects:
+                if web_object.length > 0:
+                    yield web_object
+
+
+class FingerprintIndex(object):
+
+    def __init__(self):
+
+        self.names = []
+        self.labels = []
+        self.name_ids = {}
+        self.label_ids = {}
+        self.pending = []
+        self.lengths = numpy.zeros(0, dtype=numpy.int64)
+        self.resources = numpy.zeros(0, dtype=numpy.int32)
+        self.owners = numpy.zeros(0, dtype=numpy.int32)
+        self.label_captures = {}
+        self.label_sizes = None
+
+    def __len__(self):
+
+        self.build()
+        return len(self.lengths)
+
+    @staticmethod
+    def intern(value, values, value_ids):
+
+        if value not in value_ids:
+            value_ids[value] = len(values)
+            values.append(value)
+
+        return value_ids[value]
+
+    def insert(self, label, name, length):
+
+        self.pending.append((
+            length,
+            self.intern(name if name else "", self.names, self.name_ids),
+            self.intern(label, self.labels, self.label_ids)
+        ))
+
+        self.label_sizes = None
+
+    def insert_capture(self, label, state):
+
+        label_id = self.intern(label, self.labels, self.label_ids)
+        self.label_captures[label_id] = self.label_captures.get(label_id, 0) + 1
+        self.label_sizes = None
+
+        for web_object in get_web_objects(state):
+            self.insert(label, web_object.name, web_object.length)
+
+    def get_label_sizes(self):
+
+        # mean number of objects in one capture of each label, objects that
+        # were inserted on their own count as a single capture
+        self.build()
+
+        if self.label_sizes is None:
+            captures = numpy.ones(len(self.labels))
+
+            for label_id, count in self.label_captures.items():
+                captures[label_id] = max(count, 1)
+
+            self.label_sizes = numpy.bincount(self.owners, minlength=len(self.labels)) / captures
+
+        return self.label_sizes
+
+    def build(self):
+
+        if len(self.pending) == 0:
+            return
+
+        pending = numpy.array(self.pending, dtype=numpy.int64).reshape(-1, 3)
+        self.pending = []
+
+        lengths = numpy.concatenate([self.lengths, pending[:, 0]])
+        resources = numpy.concatenate([self.resources, pending[:, 1].astype(numpy.int32)])
+        owners = numpy.concatenate([self.owners, pending[:, 2].astype(numpy.int32)])
+
+        order = numpy.argsort(lengths, kind="stable")
+
+        self.lengths = lengths[order]
+        self.resources = resources[order]
+        self.owners = owners[order]
+
+    def save(self, filename):
+
+        self.build()
+
+        with open(filename, mode="wb") as fp:
+            numpy.savez_compressed(
+                fp,
+                lengths=self.lengths,
+                resources=self.resources,
+                owners=self.owners,
+                names=numpy.array(self.names, dtype=str),
+                labels=numpy.array(self.labels, dtype=str),
+                captures=numpy.array([self.label_captures.get(i, 0) for i in range(len(self.labels))], dtype=numpy.int64)
+            )
+
+    @staticmethod
+    def load(filename):
+
+        index = FingerprintIndex()
+
+        with numpy.load(filename, allow_pickle=False) as contents:
+
+            index.names = contents["names"].tolist()
+            index.labels = contents["labels"].tolist()
+            index.lengths = contents["lengths"]
+            index.resources = contents["resources"]
+            index.owners = contents["owners"]
+
+            if "captures" in contents:
+                index.label_captures = {i: int(count) for i, count in enumerate(contents["captures"]) if count}
+
+        index.name_ids = {name: i for i, name in enumerate(index.names)}
+        index.label_ids = {label: i for i, label in enumerate(index.labels)}
+
+        return index
+
+    def lookup(self, lengths, tolerance=0):
+
+        # for every observed length, the [start, finish) slice of entries whose
+        # length lies within tolerance bytes of it
+        self.build()
+        lengths = numpy.asarray(lengths, dtype=numpy.int64)
+
+        start = numpy.searchsorted(self.lengths, lengths - tolerance, side="left")
+        finish = numpy.searchsorted(self.lengths, lengths + tolerance, side="right")
+
+        return start, finish
+
+    def match_object(self, length, tolerance=0):
+
+        start, finish = self.lookup([length], tolerance)
+
+        return [
+            (self.names[self.resources[i]], self.labels[self.owners[i]], int(self.lengths[i]))
+            for i in range(start[0], finish[0])
+        ]
+
+    def match(self, lengths, tolerance=0, limit=10):
+
+        # ranks labels by the Jaccard similarity between the observed object
+        # sizes and the objects of one capture of each label, so labels with
+        # more reference captures are not penalised for their larger totals
+        start, finish = self.lookup(lengths, tolerance)
+        counts = finish - start
+
+        if len(self.labels) == 0 or counts.sum() == 0:
+            return []
+
+        # expand every slice into entry positions, remembering which observed
+        # length each position was found for
+        observed = numpy.repeat(numpy.arange(len(counts)), counts)
+        offsets = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        owners = self.owners[numpy.repeat(start, counts) + offsets]
+
+        # an observed length counts once per label, however many objects match
+        pairs = numpy.unique(observed * len(self.labels) + owners)
+        matched = numpy.bincount(pairs % len(self.labels), minlength=len(self.labels))
+
+        candidates = numpy.flatnonzero(matched)
+        label_sizes = self.get_label_sizes()[candidates]
+
+        # matched can exceed the objects of one capture when the observed
+        # sizes hit different captures, the union is never smaller than either
+        union = numpy.maximum(len(counts) + label_sizes - matched[candidates], numpy.maximum(len(counts), label_sizes))
+        scores = matched[candidates] / union
+        ranking = numpy.argsort(-scores, kind="stable")[:limit]
+
+        return [
+            (self.labels[candidates[i]], float(scores[i]), int(matched[candidates[i]]))
+            for i in ranking
+        ]
@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 
-from fingerprinting.analysis.parser import XmlWrapper
+from fingerprinting.analysis.slotted import EMPTY, Slotted
 from fingerprinting.analysis.h2 import Http2Error, Http2Frame, Http2Settings
 
 
-class SslSegmentIndex(object):
+class SslSegmentIndex(Slotted):
+
+    __slots__ = (
+        "record_id",
+        "record_size",
+        "segment_id",
+        "segment_size",
+        "content_length",
+        "bytecount_start",
+        "bytecount_finish",
+    )
 
     def __init__(self, record_id, record_size, segment_id, segment_size):
 
@@ -17,14 +27,32 @@ class SslSegmentIndex(object):
         self.content_length = 0
 
 
-class Frame(object):
-
-    INSTANCE_COUNTER = 0
+class Frame(Slotted):
+
+    __slots__ = (
+        "id",
+        "type",
+        "body",
+        "length",
+        "packet",
+        "layer_id",
+        "stream_id",
+        "direction",
+        "sublayer_id",
+        "bytecount_start",
+        "bytecount_finish",
+        "last_ssl_record",
+        "ssl_segment_indices",
+        "ssl_segment_reassembly",
+    )
+
+    # framing overheads: every frame starts with a 9-byte header and the client
+    # opens the connection with the 24-byte connection preface
+    HEADER_LENGTH = 9
+    PREFACE_LENGTH = 24
 
     def __init__(self, packet, layer, layer_id, sublayer_id):
 
-        Frame.INSTANCE_COUNTER += 1
-
         if packet.source_port == 443:
             self.direction = "S2C"
         else:
@@ -36,21 +64,30 @@ class Frame(object):
         self.bytecount_start = 0
         self.bytecount_finish = 0
         self.sublayer_id = sublayer_id
-        self.id = Frame.INSTANCE_COUNTER
+        self.id = packet.identifiers.next_frame()
 
         if layer.exists("http2.streamid"):
             self.type = Http2Frame(layer.integer("http2.type"))
             self.stream_id = layer.integer("http2.streamid")
             self.body = layer.integer("http2.length")
-            self.length = self.body + 9
+            self.length = self.body + Frame.HEADER_LENGTH
         else:
             self.body = 0
-            self.length = 24
+            self.length = Frame.PREFACE_LENGTH
             self.stream_id = 0
             self.type = Http2Frame.MAGIC
 
-        self.ssl_segment_indices = []
-        self.ssl_segment_reassembly = []
+        self.ssl_segment_indices = EMPTY
+        self.ssl_segment_reassembly = None
+
+    @staticmethod
+    def upgrade_state(state):
+
+        # older dumps kept an empty list for frames without a reassembly
+        if state.get("ssl_segment_reassembly") == []:
+            state["ssl_segment_reassembly"] = None
+
+        return state
 
     @property
     def endpoint(self):
@@ -62,6 +99,9 @@ class Frame(object):
 
     def insert_unique_segment(self, record, segment_id):
 
+        if self.ssl_segment_indices is EMPTY:
+            self.ssl_segment_indices = []
+
         self.ssl_segment_indices.append(SslSegmentIndex(
             record.id,
             record.lengths["total"],
@@ -71,6 +111,9 @@ class Frame(object):
 
     def insert_reassembled_segment(self, record_id, record_length, segment_id, segment_length):
 
+        if self.ssl_segment_indices is EMPTY:
+            self.ssl_segment_indices = []
+
         self.ssl_segment_indices.append(SslSegmentIndex(
             record_id,
             record_length,
@@ -114,6 +157,8 @@ class Frame(object):
 
 class Data(Frame):
 
+    __slots__ = ("padded", "end_stream")
+
     def __init__(self, packet, layer, layer_id, sublayer_id):
 
         super().__init__(packet, layer, layer_id, sublayer_id)
@@ -132,6 +177,8 @@ class Data(Frame):
 
 class GoAway(Frame):
 
+    __slots__ = ("error", "last_stream")
+
     def __init__(self, packet, layer, layer_id, sublayer_id):
 
         super().__init__(packet, layer, layer_id, sublayer_id)
@@ -149,6 +196,20 @@ class GoAway(Frame):
 
 class Headers(Frame):
 
+    __slots__ = (
+        "weight",
+        "padded",
+        "priority",
+        "exclusive",
+        "end_stream",
+        "end_headers",
+        "http_status",
+        "http_method",
+        "http_response",
+        "http_resource",
+        "stream_dependency",
+    )
+
     def __init__(self, packet, layer, layer_id, sublayer_id):
 
         super().__init__(packet, layer, layer_id, sublayer_id)
@@ -165,9 +226,7 @@ class Headers(Frame):
 
         self.http_response = False
 
-        for _, header in layer.children("http2.header"):
-
-            wrapper = XmlWrapper(header)
+        for _, wrapper in layer.nested_children("http2.header"):
 
             if wrapper.exists("http2.headers.status"):
                 self.http_response = True
@@ -213,6 +272,8 @@ class Headers(Frame):
 
 class Ping(Frame):
 
+    __slots__ = ("ack",)
+
     def __init__(self, packet, layer, layer_id, sublayer_id):
         super().__init__(packet, layer, layer_id, sublayer_id)
         flags = layer.nested("http2.flags")
@@ -228,6 +289,8 @@ class Ping(Frame):
 
 class Priority(Frame):
 
+    __slots__ = ("weight", "exclusive", "stream_dependency")
+
     def __init__(self, packet, layer, layer_id, sublayer_id):
 
         super().__init__(packet, layer, layer_id, sublayer_id)
@@ -247,6 +310,8 @@ class Priority(Frame):
 
 class PushPromise(Frame):
 
+    __slots__ = ("padded", "end_headers")
+
     def __init__(self, packet, layer, layer_id, sublayer_id):
 
         super().__init__(packet, layer, layer_id, sublayer_id)
@@ -265,6 +330,8 @@ class PushPromise(Frame):
 
 class RstStream(Frame):
 
+    __slots__ = ("error",)
+
     def __init__(self, packet, layer, layer_id, sublayer_id):
 
         super().__init__(packet, layer, layer_id, sublayer_id)
@@ -280,6 +347,8 @@ class RstStream(Frame):
 
 class Settings(Frame):
 
+    __slots__ = ("ack", "settings")
+
     JSON_VALUES = {
         Http2Settings.ENABLE_PUSH: "http2.settings.enable_push",
         Http2Settings.MAX_FRAME_SIZE: "http2.settings.max_frame_size",
@@ -294,12 +363,12 @@ class Settings(Frame):
         super().__init__(packet, layer, layer_id, sublayer_id)
         flags = layer.nested("http2.flags")
         self.ack = flags.boolean("http2.flags.ack.settings")
-        self.settings = Settings.parse_json(layer.children("http2.settings"))
+        self.settings = Settings.parse_json(layer.nested_children("http2.settings"))
 
     @staticmethod
     def parse_json(settings):
 
-        return dict(Settings.parse_json_setting(XmlWrapper(s)) for _, s in settings)
+        return dict(Settings.parse_json_setting(s) for _, s in settings)
 
     @staticmethod
     def parse_json_setting(setting):
@@ -317,6 +386,8 @@ class Settings(Frame):
 
 class WindowUpdate(Frame):
 
+    __slots__ = ("window_size",)
+
     def __init__(self, packet, layer, layer_id, sublayer_id):
 
         super().__init__(packet, layer, layer_id, sublayer_id)
@@ -17,10 +17,10 @@ class Stream(object):
         self.packet = packet
         self.children = set()
         self.state = Http2State.IDLE
-        self.statistics = Statistics()
+        self.statistics = Statistics(distributions=False)
         self.error = Http2Error.NO_ERROR
 
-        packet.streams.append(stream_id)
+        packet.insert_stream(stream_id)
 
         if packet.source_port == 443:
             self.direction = "S2C"
@@ -73,7 +73,7 @@ class Stream(object):
             self.window_size = window_size
 
         if len(self.frames) > 0:
-            self.frames[-1].packet.streams_closed.append(self.id)
+            self.frames[-1].packet.insert_closed_stream(self.id)
 
         self.first_seen = self.frames[0].timestamp
         self.last_seen = self.frames[-1].timestamp
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+
+class Identifiers(object):
+
+    # frames, TLS records and SSL segments are numbered from 1 within the
+    # capture they belong to, so the ids do not depend on what else the
+    # process has analysed before
+
+    def __init__(self):
+
+        self.frames = 0
+        self.records = 0
+        self.segments = 0
+
+    def next_frame(self):
+
+        self.frames += 1
+        return self.frames
+
+    def next_record(self):
+
+        self.records += 1
+        return self.records
+
+    def next_segment(self):
+
+        self.segments += 1
+        return self.segments
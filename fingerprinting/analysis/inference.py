@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+
+from fingerprinting.analysis.h2 import Http2Frame
+from fingerprinting.analysis.h2f import Frame
+from fingerprinting.analysis.record import TlsRecordType
+from fingerprinting.analysis.columns import DIRECTIONS, ColumnStore, RecordStore
+
+# without the TLS keys tshark only sees record lengths and timing, so frames
+# and web objects are estimated from them: the plaintext sent in one direction
+# is a byte stream, a record shorter than the TLS maximum ends a write of the
+# sender, and every write is split into HTTP/2 frames with the known overheads
+
+C2S = DIRECTIONS.index("C2S")
+S2C = DIRECTIONS.index("S2C")
+
+TLS_MAX_PLAINTEXT = 16384
+
+# bytes an AEAD record adds to its plaintext: explicit nonce and tag of
+# AES-GCM in TLS 1.2, tag and inner content type in TLS 1.3, and the tag of
+# ChaCha20-Poly1305 in TLS 1.2; the first one is the default
+TLS_RECORD_OVERHEADS = (24, 17, 16)
+TLS_RECORD_OVERHEAD = TLS_RECORD_OVERHEADS[0]
+TLS13_RECORD_OVERHEAD = TLS_RECORD_OVERHEADS[1]
+
+# writes made of a single frame whose size gives its type away
+CONTROL_FRAMES = {
+    Frame.HEADER_LENGTH: Http2Frame.SETTINGS,
+    Frame.HEADER_LENGTH + 4: Http2Frame.WINDOW_UPDATE,
+    Frame.HEADER_LENGTH + 5: Http2Frame.PRIORITY,
+    Frame.HEADER_LENGTH + 8: Http2Frame.PING,
+}
+
+# assumed size of a response HEADERS frame including its frame header. The
+# header block cannot be told apart from the body in the same write, so every
+# inferred object is off by the difference to the real block: the responses
+# of the firefox test capture have 65 to 122 bytes (median 121), a first
+# response with cookies or a long content-security-policy can be several
+# hundred. Request counts and the total bytes of a write do not depend on it.
+RESPONSE_HEADERS_LENGTH = 128
+
+
+class InferredFrameStore(ColumnStore):
+
+    DTYPE = numpy.dtype([
+        ("write", numpy.int64),
+        ("record", numpy.int64),
+        ("type", numpy.uint8),
+        ("direction", numpy.uint8),
+        ("offset", numpy.int64),
+        ("length", numpy.int64),
+        ("timestamp", numpy.float64),
+    ])
+
+
+class InferredObjectStore(ColumnStore):
+
+    DTYPE = numpy.dtype([
+        ("write", numpy.int64),
+        ("length", numpy.int64),
+        ("frames", numpy.int64),
+        ("records", numpy.int64),
+        ("first_seen", numpy.float64),
+        ("last_seen", numpy.float64),
+    ])
+
+
+class FrameInference(object):
+
+    def __init__(self, records, max_frame_size=TLS_MAX_PLAINTEXT,
+                 headers_length=RESPONSE_HEADERS_LENGTH, overhead=None):
+
+        records = records.select(type=TlsRecordType.APPLICATION_DATA).sort("id")
+
+        self.max_frame_size = max_frame_size
+        self.headers_length = headers_length
+        self.overhead = overhead if overhead is not None else self.estimate_overhead(records)
+
+        if self.overhead == TLS13_RECORD_OVERHEAD:
+            records = records.where(numpy.arange(len(records)) >= self.get_first_write(records))
+
+        frames = []
+        objects = []
+        self.requests = 0
+
+        for direction in (C2S, S2C):
+
+            rows = records.select(direction=direction).rows
+            if len(rows) == 0:
+                continue
+
+            direction_frames, direction_objects, requests = self.infer_direction(direction, rows)
+            frames.append(direction_frames)
+            objects.append(direction_objects)
+            self.requests += requests
+
+        self.frames = InferredFrameStore(
+            numpy.concatenate(frames) if frames else numpy.zeros(0, dtype=InferredFrameStore.DTYPE)
+        )
+
+        self.objects = InferredObjectStore(
+            numpy.concatenate(objects) if objects else numpy.zeros(0, dtype=InferredObjectStore.DTYPE)
+        )
+
+    @classmethod
+    def from_application(cls, application, **options):
+
+        # no SETTINGS frame is visible without the keys, so this is the default
+        options.setdefault("max_frame_size", application.settings["MAX_FRAME_SIZE"])
+
+        return cls(RecordStore.from_application(application), **options)
+
+    @staticmethod
+    def estimate_overhead(records):
+
+        if len(records) == 0:
+            return TLS_RECORD_OVERHEAD
+
+        lengths = records["length"]
+
+        # a record filled up to the TLS maximum gives the overhead away
+        overhead = int(lengths.max()) - TLS_MAX_PLAINTEXT
+
+        if overhead in TLS_RECORD_OVERHEADS:
+            return overhead
+
+        # otherwise pick the overhead under which most records hold a single
+        # control frame; the smallest record alone cannot tell an empty frame
+        # under one overhead from a WINDOW_UPDATE or PING under another
+        control = numpy.array(list(CONTROL_FRAMES), dtype=numpy.int64)
+        scores = [int(numpy.isin(lengths - overhead, control).sum()) for overhead in TLS_RECORD_OVERHEADS]
+
+        return TLS_RECORD_OVERHEADS[int(numpy.argmax(scores))]
+
+    @staticmethod
+    def get_first_write(records):
+
+        # TLS 1.3 encrypts the rest of the handshake as application data: the
+        # server's flight comes before any client record and the first client
+        # record is its Finished, so HTTP/2 starts with the second one
+        client = numpy.flatnonzero(records["direction"] == C2S)
+
+        return int(client[1]) if len(client) > 1 else 0
+
+    def infer_direction(self, direction, rows):
+
+        plaintext = numpy.maximum(rows["length"] - self.overhead, 0)
+        record_finish = numpy.cumsum(plaintext)
+
+        # a write ends with the first record that is not filled up
+        full = plaintext >= TLS_MAX_PLAINTEXT
+        write_ids = numpy.concatenate(([0], numpy.cumsum(~full[:-1])))
+        write_count = write_ids[-1] + 1
+
+        write_length = numpy.bincount(write_ids, weights=plaintext, minlength=write_count).astype(numpy.int64)
+        write_records = numpy.bincount(write_ids, minlength=write_count)
+        write_first = numpy.flatnonzero(numpy.diff(write_ids, prepend=-1))
+        write_last = numpy.append(write_first[1:], len(rows)) - 1
+
+        control_types = numpy.zeros(write_count, dtype=numpy.uint8)
+        control = numpy.zeros(write_count, dtype=bool)
+
+        for length, frame_type in CONTROL_FRAMES.items():
+            mask = write_length == length
+            control |= mask
+            control_types[mask] = frame_type.value
+
+        # the first write of either side sets the connection up
+        control[0] = True
+        control_types[0] = Http2Frame.SETTINGS.value
+
+        if direction == S2C:
+
+            # an empty frame right after a response is its END_STREAM DATA frame
+            payload = ~control
+            trailer = (write_length == Frame.HEADER_LENGTH) & numpy.roll(payload, 1)
+            trailer[0] = False
+            control_types[trailer] = Http2Frame.DATA.value
+
+            headers = numpy.where(payload, numpy.minimum(self.headers_length, write_length), write_length)
+            body = write_length - headers
+
+        else:
+
+            payload = numpy.zeros(write_count, dtype=bool)
+            headers = write_length
+            body = numpy.zeros(write_count, dtype=numpy.int64)
+
+        # responses are a HEADERS frame followed by DATA frames of at most
+        # max_frame_size bytes, everything else is a single frame
+        stride = self.max_frame_size + Frame.HEADER_LENGTH
+        data_frames = -(-body // stride)
+        preface = 1 if direction == C2S and write_length[0] > Frame.PREFACE_LENGTH else 0
+
+        counts = 1 + data_frames
+        counts[0] += preface
+        total = int(counts.sum())
+
+        frame_writes = numpy.repeat(numpy.arange(write_count), counts)
+        position = numpy.arange(total) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+
+        frames = numpy.zeros(total, dtype=InferredFrameStore.DTYPE)
+        frames["write"] = frame_writes
+        frames["direction"] = direction
+
+        first = position == 0
+        frames["length"] = numpy.where(first, headers[frame_writes], stride)
+        frames["type"] = numpy.where(first, Http2Frame.HEADERS.value, Http2Frame.DATA.value)
+
+        control_frames = first & control[frame_writes]
+        frames["type"][control_frames] = control_types[frame_writes[control_frames]]
+
+        # the last DATA frame of a response carries whatever is left of the body
+        last = numpy.cumsum(counts) - 1
+        last_data = last[data_frames > 0]
+        frames["length"][last_data] = body[data_frames > 0] - (data_frames[data_frames > 0] - 1) * stride
+
+        if preface:
+            frames["type"][0:2] = (Http2Frame.MAGIC.value, Http2Frame.SETTINGS.value)
+            frames["length"][0] = Frame.PREFACE_LENGTH
+            frames["length"][1] = write_length[0] - Frame.PREFACE_LENGTH
+
+        frames["offset"] = numpy.cumsum(frames["length"]) - frames["length"]
+
+        # every frame is stamped with the record its first byte arrived in
+        record_index = numpy.searchsorted(record_finish, frames["offset"], side="right")
+        record_index = numpy.minimum(record_index, len(rows) - 1)
+        frames["record"] = rows["id"][record_index]
+        frames["timestamp"] = rows["timestamp"][record_index]
+
+        requests = int((~control).sum()) if direction == C2S else 0
+
+        # a response and its trailing empty DATA frame make one object
+        owner = numpy.where(payload, numpy.arange(write_count), -1)
+        owner = numpy.maximum.accumulate(owner)
+
+        objects = numpy.zeros(int(payload.sum()), dtype=InferredObjectStore.DTYPE)
+        responses = numpy.flatnonzero(payload)
+        last_seen = rows["timestamp"][write_last].copy()
+
+        if direction == S2C:
+            trailing = numpy.flatnonzero(trailer)
+            last_seen[owner[trailing]] = numpy.maximum(last_seen[owner[trailing]], last_seen[trailing])
+
+        objects["write"] = responses
+        objects["length"] = body[responses] - data_frames[responses] * Frame.HEADER_LENGTH
+        objects["frames"] = counts[responses]
+        objects["records"] = write_records[responses]
+        objects["first_seen"] = rows["timestamp"][write_first[responses]]
+        objects["last_seen"] = last_seen[responses]
+
+        return frames, objects, requests
+
+    def serialize(self):
+
+        frame_types, frame_counts = self.frames.group_count("type")
+
+        return {
+            "overhead": self.overhead,
+            "requests": self.requests,
+            "max_frame_size": self.max_frame_size,
+            "frames": {
+                Http2Frame(int(frame_type)).name: int(count)
+                for frame_type, count in zip(frame_types, frame_counts)
+            },
+            "objects": [
+                {
+                    "length": int(row["length"]),
+                    "frames": int(row["frames"]),
+                    "records": int(row["records"]),
+                    "first_seen": float(row["first_seen"]),
+                    "last_seen": float(row["last_seen"]),
+                }
+                for row in self.objects.rows
+            ]
+        }
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+
+class IntervalNode(object):
+
+    def __init__(self, center, by_start, by_finish, left, right):
+
+        self.left = left
+        self.right = right
+        self.center = center
+        self.by_start = by_start
+        self.by_finish = by_finish
+
+
+class IntervalIndex(object):
+
+    # centered interval tree over closed intervals [start, finish], answering
+    # "which intervals contain this point" in O(log n + k)
+
+    def __init__(self, intervals):
+
+        self.size = 0
+        self.root = None
+
+        entries = []
+
+        for start, finish, value in intervals:
+            entries.append((start, finish, self.size, value))
+            self.size += 1
+
+        self.root = self._build(entries)
+
+    def _build(self, entries):
+
+        if len(entries) == 0:
+            return None
+
+        endpoints = sorted(point for entry in entries for point in entry[0:2])
+        center = endpoints[len(endpoints) // 2]
+
+        left = [entry for entry in entries if entry[1] < center]
+        right = [entry for entry in entries if entry[0] > center]
+        middle = [entry for entry in entries if entry[0] <= center <= entry[1]]
+
+        return IntervalNode(
+            center,
+            sorted(middle, key=lambda entry: entry[0]),
+            sorted(middle, key=lambda entry: entry[1], reverse=True),
+            self._build(left),
+            self._build(right)
+        )
+
+    def query(self, point):
+
+        matches = []
+        node = self.root
+
+        while node is not None:
+
+            if point < node.center:
+
+                for entry in node.by_start:
+                    if entry[0] > point:
+                        break
+                    matches.append(entry)
+
+                node = node.left
+
+            elif point > node.center:
+
+                for entry in node.by_finish:
+                    if entry[1] < point:
+                        break
+                    matches.append(entry)
+
+                node = node.right
+
+            else:
+
+                matches.extend(node.by_start)
+                break
+
+        # results come back in the order the intervals were inserted
+        matches.sort(key=lambda entry: entry[2])
+
+        return [entry[3] for entry in matches]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+
+# how the request, response and payload of every pair of web objects on a
+# connection lie in time, computed for all pairs at once: relations[i, j, k]
+# is what WebObject.compare reports for (objects[i], objects[j]) at the k-th
+# position, -1 when the left hand side comes first, 1 when it comes last and
+# 0 when a point falls inside (or an interval overlaps) the right hand side
+
+RELATIONS = (
+    "request_request",
+    "request_response",
+    "request_payload",
+    "response_request",
+    "response_response",
+    "response_payload",
+    "payload_request",
+    "payload_response",
+    "payload_payload",
+)
+
+# one of the two objects has not reached that part of the exchange yet
+UNDEFINED = 2
+
+
+def get_timestamp(entry):
+
+    return entry["timestamp"] if entry else numpy.nan
+
+
+class OverlapMatrix(object):
+
+    def __init__(self, objects):
+
+        self.objects = list(objects)
+
+        self.request = numpy.array([get_timestamp(o.request) for o in self.objects], dtype=numpy.float64)
+        self.response = numpy.array([get_timestamp(o.response) for o in self.objects], dtype=numpy.float64)
+        self.payload_start = numpy.array([get_timestamp(o.body and o.body[0]) for o in self.objects], dtype=numpy.float64)
+        self.payload_finish = numpy.array([get_timestamp(o.body and o.body[-1]) for o in self.objects], dtype=numpy.float64)
+        self.finished = numpy.array([o.finished for o in self.objects], dtype=bool)
+
+        self.relations = self.build()
+
+    @classmethod
+    def from_application(cls, application):
+
+        return cls(
+            web_object
+            for stream in sorted(application.streams.values(), key=lambda stream: stream.id)
+            for web_object in stream.objects
+        )
+
+    def __len__(self):
+        return len(self.objects)
+
+    def build(self):
+
+        # a timestamp is the interval [t, t], so every comparison is the same
+        # "ends before / starts after / overlaps" test of two intervals
+        bounds = {
+            "request": (self.request, self.request),
+            "response": (self.response, self.response),
+            "payload": (self.payload_start, self.payload_finish),
+        }
+
+        relations = numpy.empty((len(self.objects), len(self.objects), len(RELATIONS)), dtype=numpy.int8)
+
+        for k, name in enumerate(RELATIONS):
+
+            lhs, rhs = name.split("_")
+            lhs_start, lhs_finish = bounds[lhs]
+            rhs_start, rhs_finish = bounds[rhs]
+
+            before = lhs_finish[:, None] < rhs_start[None, :]
+            after = lhs_start[:, None] > rhs_finish[None, :]
+            defined = ~numpy.isnan(lhs_start)[:, None] & ~numpy.isnan(rhs_start)[None, :]
+
+            relations[:, :, k] = numpy.where(defined, after.astype(numpy.int8) - before, UNDEFINED)
+
+        return relations
+
+    def relation(self, name):
+
+        return self.relations[:, :, RELATIONS.index(name)]
+
+    def multiplexed(self):
+
+        # pairs of distinct objects whose payloads were in flight together
+        overlapping = self.relation("payload_payload") == 0
+        numpy.fill_diagonal(overlapping, False)
+
+        return overlapping
+
+    def concurrency(self):
+
+        # number of other objects each payload was interleaved with
+        return self.multiplexed().sum(axis=1)
+
+    def compare(self, i, j):
+
+        # the same layout as WebObject.compare, read off the matrix
+        if not self.finished[i] or not self.finished[j]:
+            return []
+
+        relations = self.relations[i, j].tolist()
+        headers = 3 if relations[2] != UNDEFINED else 2
+
+        comparison = [relations[0:headers], relations[3:3 + headers]]
+
+        if relations[8] != UNDEFINED:
+            comparison += relations[6:9]
+
+        return comparison
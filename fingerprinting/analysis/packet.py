@@ -1,9 +1,17 @@
 # -*- coding: utf-8 -*-
 
+import sys
+import logging
+
+from fingerprinting.analysis.slotted import EMPTY, Slotted
 from fingerprinting.analysis.record import TlsRecord, TlsRecordType
 
+logger = logging.getLogger(__name__)
+
+
+class LayerItem(Slotted):
 
-class LayerItem(object):
+    __slots__ = ("item", "index", "type", "reasslength", "layer_id", "sublayer_id")
 
     def __init__(self, item_type, item, sublayer_id=0):
         self.item = item
@@ -26,7 +34,9 @@ class LayerItem(object):
         return LayerItem("http2frame", item, item.sublayer_id)
 
 
-class SslFakeSegment(object):
+class SslFakeSegment(Slotted):
+
+    __slots__ = ("segments", "packet", "layer_id", "frame_layer_id", "sublayer_id", "count", "length")
 
     def __init__(self, packet, layer, layer_id, sublayer_id):
 
@@ -43,6 +53,11 @@ class SslFakeSegment(object):
             ssl_length = int(ssl_segment.attrib["size"])       
             self.segments.append([packet_id, ssl_length])       
 
+    def key(self):
+
+        # two reassemblies are duplicates when they stitch the same segments
+        return self.length, self.count, tuple((packet_id, length) for packet_id, length in self.segments)
+
     def serialize(self):
 
         return {
@@ -52,36 +67,91 @@ class SslFakeSegment(object):
             "segments": self.segments
         }
 
-class Packet(object):
-
-    def __init__(self, layer):
-
-        self.frames = []
-        self.records = []
-        self.streams = []
-        self.handshakes = []
-        self.application = []
-        self.fake_segments = []
-        self.frames_unique = []
-        self.streams_active = []
-        self.streams_closed = []
-        self.ssl_segments_reassembled = []
-
-        self.lengths = {
-            "total": 0,
-            "frames": 0,
-            "records": 0,
-            "handshakes": 0,
-            "application_data": 0
-        }
+class Packet(Slotted):
+
+    # most packets carry no HTTP/2 at all, so the containers below start out as
+    # the shared EMPTY tuple and only become lists when something is inserted
+    __slots__ = (
+        "id",
+        "source",
+        "time_delta",
+        "source_port",
+        "destination",
+        "time_relative",
+        "destination_port",
+        "frames",
+        "records",
+        "streams",
+        "handshakes",
+        "application",
+        "identifiers",
+        "fake_segments",
+        "frames_unique",
+        "streams_active",
+        "streams_closed",
+        "ssl_segments_reassembled",
+        "length_total",
+        "length_frames",
+        "length_records",
+        "length_handshakes",
+        "length_application_data",
+    )
+
+    def __init__(self, layer, identifiers):
+
+        self.identifiers = identifiers
+        self.frames = EMPTY
+        self.records = EMPTY
+        self.streams = EMPTY
+        self.handshakes = EMPTY
+        self.application = EMPTY
+        self.fake_segments = EMPTY
+        self.frames_unique = EMPTY
+        self.streams_active = EMPTY
+        self.streams_closed = EMPTY
+        self.ssl_segments_reassembled = EMPTY
+
+        self.length_total = 0
+        self.length_frames = 0
+        self.length_records = 0
+        self.length_handshakes = 0
+        self.length_application_data = 0
 
         self._parse_ip_layer(layer.proto("ip"))
         self._parse_tcp_layer(layer.proto("tcp"))
         self._parse_frame_layer(layer.proto("frame"))
 
+    @staticmethod
+    def upgrade_state(state):
+
+        lengths = state.pop("lengths", None)
+
+        if lengths is not None:
+            state["length_total"] = lengths["total"]
+            state["length_frames"] = lengths["frames"]
+            state["length_records"] = lengths["records"]
+            state["length_handshakes"] = lengths["handshakes"]
+            state["length_application_data"] = lengths["application_data"]
+
+        # a loaded packet takes no new items, so it needs no id allocator
+        state.setdefault("identifiers", None)
+
+        return state
+
+    @property
+    def lengths(self):
+
+        return {
+            "total": self.length_total,
+            "frames": self.length_frames,
+            "records": self.length_records,
+            "handshakes": self.length_handshakes,
+            "application_data": self.length_application_data
+        }
+
     def _parse_ip_layer(self, layer):
-        self.source = layer.string("ip.src")
-        self.destination = layer.string("ip.dst")
+        self.source = sys.intern(layer.string("ip.src"))
+        self.destination = sys.intern(layer.string("ip.dst"))
 
     def _parse_tcp_layer(self, layer):
         self.source_port = layer.integer("tcp.srcport")
@@ -90,16 +160,37 @@ class Packet(object):
     def _parse_frame_layer(self, layer):
         self.id = layer.integer("frame.number")
         self.time_delta = layer.real("frame.time_delta")
-        self.lengths["total"] = layer.integer("frame.len")
+        self.length_total = layer.integer("frame.len")
         self.time_relative = layer.real("frame.time_relative")
 
     def insert_frame(self, frame):
+
+        if self.frames is EMPTY:
+            self.frames = []
+
         self.frames.append(frame)
-        self.lengths["frames"] += frame.length
+        self.length_frames += frame.length
         self.application[-1].frames.append(frame)
 
+    def insert_stream(self, stream_id):
+
+        if self.streams is EMPTY:
+            self.streams = []
+
+        self.streams.append(stream_id)
+
+    def insert_closed_stream(self, stream_id):
+
+        if self.streams_closed is EMPTY:
+            self.streams_closed = []
+
+        self.streams_closed.append(stream_id)
+
     def insert_fake_segment(self, layer, layer_id, sublayer_id):
 
+        if self.fake_segments is EMPTY:
+            self.fake_segments = []
+
         self.fake_segments.append(
             SslFakeSegment(self, layer, layer_id, sublayer_id)
         )
@@ -107,15 +198,28 @@ class Packet(object):
     def insert_ssl_record(self, layer, layer_id, sublayer_id):
 
         record = TlsRecord(self, layer, layer_id, sublayer_id)
+
+        if self.records is EMPTY:
+            self.records = []
+
         self.records.append(record)
-        self.lengths["records"] += record.length
+        self.length_records += record.length
 
         if record.type == TlsRecordType.HANDSHAKE:
+
+            if self.handshakes is EMPTY:
+                self.handshakes = []
+
             self.handshakes.append(record)
-            self.lengths["handshakes"] += record.length
+            self.length_handshakes += record.length
+
         elif record.type == TlsRecordType.APPLICATION_DATA:
+
+            if self.application is EMPTY:
+                self.application = []
+
             self.application.append(record)
-            self.lengths["application_data"] += record.length
+            self.length_application_data += record.length
 
         return record
 
@@ -124,13 +228,13 @@ class Packet(object):
         return {
             "source": self.source,
             "lengths": self.lengths,
-            "streams": self.streams,
+            "streams": list(self.streams),
             "time_delta": self.time_delta,
             "source_port": self.source_port,
             "destination": self.destination,
             "time_relative": self.time_relative,
-            "streams_active": self.streams_active,
-            "streams_closed": self.streams_closed,
+            "streams_active": list(self.streams_active),
+            "streams_closed": list(self.streams_closed),
             "destination_port": self.destination_port,
             "frames": [frame.id for frame in self.frames],
             "records": {v.id: v.serialize() for v in self.records},
@@ -156,8 +260,48 @@ class Packet(object):
         ])
 
         items_sorted = sorted(items, key=lambda item: (item.layer_id, item.sublayer_id))
+        count = len(items_sorted)
+
+        # next-of-type tables: entry i holds the first index >= i whose item
+        # matches, or -1, so every lookup below is a single list access
+        next_record = [-1] * (count + 1)
+        next_not_record = [-1] * (count + 1)
+        next_frame = [-1] * (count + 1)
+        next_reassembly = [-1] * (count + 1)
+        reassembly_run = [0] * (count + 1)
+        frame_run_end = list(range(count + 1))
+
+        for index in range(count - 1, -1, -1):
+
+            item_type = items_sorted[index].type
+
+            next_record[index] = index if item_type == "ssl" else next_record[index + 1]
+            next_not_record[index] = index if item_type != "ssl" else next_not_record[index + 1]
+            next_frame[index] = index if item_type == "http2frame" else next_frame[index + 1]
+            next_reassembly[index] = index if item_type == "sslreass" else next_reassembly[index + 1]
+            reassembly_run[index] = reassembly_run[index + 1] + 1 if item_type == "sslreass" else 0
+            frame_run_end[index] = frame_run_end[index + 1] if item_type == "http2frame" else index
+
+        def get_next(table, start):
+            # same result as scanning range(start, count): a start of -1 looks
+            # at the last item first and then wraps around to the beginning
+            if start >= count:
+                return -1
+            elif start >= 0:
+                return table[start]
+            elif table[count - 1] == count - 1:
+                return -1
+            else:
+                return table[0]
+
+        # every record overwrites the run of frames that follows it, so the
+        # assignments are logged as index ranges and resolved once at the end
+        assignments = []
 
-        for index in range(0, len(items_sorted) - 1):
+        def assign_record(start, finish, ssl_record):
+            assignments.append((start % count, finish, ssl_record))
+
+        for index in range(0, count - 1):
 
             item = items_sorted[index]
             next_item = items_sorted[index + 1]
@@ -166,20 +310,13 @@ class Packet(object):
                 continue
 
             if item.reasslength >= 0:
-                print("sort 3")
+                logger.debug("sort 3")
                 next_item.index = item.index - 1
                 next_item.reasslength = item.reasslength
 
             elif next_item.type == "sslreass":
-                print("sort 4")
-                reassembled_length = 2
-
-                for j in range(index + 2, len(items_sorted)):
-
-                    if items_sorted[j].type == "sslreass":
-                        reassembled_length += 1
-                    else:
-                        break
+                logger.debug("sort 4")
+                reassembled_length = reassembly_run[index]
 
                 item.reasslength = reassembled_length
                 item.index = item.reasslength - 1
@@ -188,142 +325,185 @@ class Packet(object):
                 next_item.index = item.reasslength - 2
 
             else:
-                print("sort 5")
+                logger.debug("sort 5")
                 item.index = 0
                 item.reasslength = 1
-        
-        def get_next_item_of_type(item_type, start):
-            for index in range(start, len(items_sorted)):
-                if items_sorted[index].type == item_type:
-                    return index
-            return -1
-
-        def get_next_item_not_of_type(item_type, start):
-            for index in range(start, len(items_sorted)):
-                if items_sorted[index].type != item_type:
-                    return index
-            return -1
-
-        def get_next_item_of_type_nossl(item_type, start):
-            for index in range(start, len(items_sorted)):
-                if items_sorted[index].type == item_type:
-                    return index
-                elif item_type == "ssl":
-                    break
-            return -1
 
-        record_index = get_next_item_of_type("ssl", 0)
-        frame_index = get_next_item_not_of_type("ssl", record_index)
-        reassembled_index = get_next_item_of_type_nossl("sslreass", frame_index)
-        frame_index = get_next_item_of_type_nossl("http2frame", frame_index)
+        record_index = get_next(next_record, 0)
+        frame_index = get_next(next_not_record, record_index)
+        reassembled_index = get_next(next_reassembly, frame_index)
+        frame_index = get_next(next_frame, frame_index)
 
         while record_index >= 0 and frame_index >= 0:
 
+            state = (record_index, frame_index, reassembled_index)
             ssl_record = items_sorted[record_index].item
 
             if len(ssl_record.segment_data) == 1:
 
-                frame_index = get_next_item_of_type_nossl("http2frame", frame_index)
+                frame_index = get_next(next_frame, frame_index)
 
                 if frame_index < 0:
-                    frame = items_sorted[frame_index].item
-                    frame.last_ssl_record = ssl_record
+                    assign_record(frame_index, count, ssl_record)
                     frame_index += 1
 
             elif reassembled_index < 0:
 
-                frame_index = get_next_item_of_type_nossl("http2frame", frame_index)
+                frame_index = get_next(next_frame, frame_index)
 
                 if frame_index >= 0:
-                    frame = items_sorted[frame_index].item
-                    frame.last_ssl_record = ssl_record
+                    assign_record(frame_index, frame_index + 1, ssl_record)
                     frame_index += 1
 
             else:
 
-                reassembled_index = get_next_item_of_type_nossl("sslreass", reassembled_index)
+                reassembled_index = get_next(next_reassembly, reassembled_index)
 
                 if reassembled_index >= 0:
                     pointer_sslreass = items_sorted[reassembled_index]
                     actual_sslreass_delta_i = 2 * pointer_sslreass.index - (pointer_sslreass.reasslength - 1)
                     sslreass = items_sorted[reassembled_index + actual_sslreass_delta_i]
                     frame = items_sorted[frame_index].item
-                    frame.ssl_segment_reassembly = sslreass.item
-                    sslreass.item.frame_layer_id = frame.layer_id
+
+                    # either index can run onto an item of another type, which
+                    # has no slot for the link
+                    if items_sorted[frame_index].type == "http2frame":
+                        frame.ssl_segment_reassembly = sslreass.item
+                    if sslreass.type == "sslreass":
+                        sslreass.item.frame_layer_id = frame.layer_id
                     frame_index += 1
                     reassembled_index += 1
 
-            if record_index + 1 >= len(items_sorted):
+            if record_index + 1 >= count:
+
+                # the last record never moves on, a step that leaves every
+                # index where it was would repeat the same assignment forever
+                if (record_index, frame_index, reassembled_index) == state:
+                    break
+
                 continue
 
             if items_sorted[record_index + 1].type != "ssl":
 
                 ssl_record = items_sorted[record_index].item
 
-                while frame_index < len(items_sorted) and items_sorted[frame_index].type == "http2frame":
-                    frame = items_sorted[frame_index].item
-                    frame.last_ssl_record = ssl_record
-                    frame_index += 1
+                if frame_index < 0 and items_sorted[frame_index].type == "http2frame":
+                    assign_record(frame_index, count, ssl_record)
+                    frame_index = 0
+
+                if 0 <= frame_index < count and frame_run_end[frame_index] > frame_index:
+                    assign_record(frame_index, frame_run_end[frame_index], ssl_record)
+                    frame_index = frame_run_end[frame_index]
 
-                record_index = get_next_item_of_type("ssl", record_index + 1)
-                tmp_index = get_next_item_not_of_type("ssl", record_index)
-                reassembled_index = get_next_item_of_type_nossl("sslreass", tmp_index)
-                frame_index = get_next_item_of_type_nossl("http2frame", tmp_index)
+                record_index = get_next(next_record, record_index + 1)
+                tmp_index = get_next(next_not_record, record_index)
+                reassembled_index = get_next(next_reassembly, tmp_index)
+                frame_index = get_next(next_frame, tmp_index)
 
             else:
 
                 record_index += 1
 
-    def find_sslids_and_update_frameid_withproto_noseg(self, record, frame):
+        # the last assignment to an item wins, so walk the log backwards and
+        # skip items that are already resolved
+        next_unresolved = list(range(count + 1))
 
-        def filter_records(ssl_record): return \
-            ssl_record.packet.id == record.packet.id and \
-            ssl_record.layer_id == record.layer_id and \
-            ssl_record.sublayer_id == record.sublayer_id
+        def find_unresolved(index):
+            root = index
+            while next_unresolved[root] != root:
+                root = next_unresolved[root]
+            while next_unresolved[index] != root:
+                next_unresolved[index], index = root, next_unresolved[index]
+            return root
 
-        for ssl_record in filter(filter_records, self.records):
+        for start, finish, ssl_record in reversed(assignments):
 
-            ssl_segment = ssl_record.segment_data[0]
-            ssl_segment.frames.append([frame.id, frame.body])
+            index = find_unresolved(start)
 
-            return ssl_record.id, ssl_segment.id
+            while index < finish:
+                # a negative frame index wraps onto the last item, which need
+                # not be a frame; it still counts as resolved
+                if items_sorted[index].type == "http2frame":
+                    items_sorted[index].item.last_ssl_record = ssl_record
+                next_unresolved[index] = index + 1
+                index = find_unresolved(index + 1)
 
-        return ()
+    def find_sslids_and_update_frameid_withproto_noseg(self, record, frame, records_by_layer):
+
+        ssl_record = records_by_layer.get((record.packet.id, record.layer_id, record.sublayer_id))
+
+        if ssl_record is None:
+            return ()
 
-    def find_sslids_and_update_frameid(self, segment, frame):
+        ssl_segment = ssl_record.segment_data[0]
+        ssl_segment.insert_frame(frame.id, frame.body)
+
+        return ssl_record.id, ssl_segment.id
+
+    def find_sslids_and_update_frameid(self, segment, frame, segments, open_segments):
 
         packet_id = segment[0]
         ssl_length = segment[1]
 
-        for ssl_record in self.records:
+        if packet_id != self.id:
+            return ()
 
-            if packet_id != self.id:
-                continue
+        # an empty piece still fits into full (and empty) segments, so it is
+        # placed first-fit over all of them
+        candidates = open_segments if ssl_length > 0 else segments
 
-            ssl_segments = iter(ssl_record.segment_data)
-            next(ssl_segments)
+        for index, (ssl_record, ssl_segment) in enumerate(candidates):
 
-            for ssl_segment in ssl_segments:
+            if ssl_segment.frames_length + ssl_length > ssl_segment.length:
+                continue
 
-                frame_length = sum(segment[1] for segment in ssl_segment.frames)
+            ssl_segment.insert_frame(frame.id, ssl_length)
 
-                if frame_length + ssl_length > ssl_segment.length:
-                    continue
+            # segments that are full can never take another non-empty piece
+            if ssl_length > 0 and ssl_segment.frames_length >= ssl_segment.length:
+                del open_segments[index]
 
-                ssl_segment.frames.append([frame.id, ssl_length])
-
-                return ssl_record.id, ssl_segment.id
+            return ssl_record.id, ssl_segment.id
 
         return ()
     
+    # associate_frames_with_records and update_frame_bytecount are not part of
+    # the analysis pipeline, callers that want frame byte counts (and the
+    # bytecount columns of FrameStore filled) run both after mapping a packet
     def associate_frames_with_records(self):
 
+        # records keyed by their position in the dissection tree, the first
+        # record wins when several share a position
+        records_by_layer = {}
+
+        for ssl_record in self.records:
+            records_by_layer.setdefault(
+                (ssl_record.packet.id, ssl_record.layer_id, ssl_record.sublayer_id),
+                ssl_record
+            )
+
+        # segments after the first one of every record in record order, and
+        # those that still have room, so reassembled frames fill them first-fit
+        segments = [
+            (ssl_record, ssl_segment)
+            for ssl_record in self.records
+            for ssl_segment in ssl_record.segment_data[1:]
+        ]
+
+        open_segments = [
+            (ssl_record, ssl_segment)
+            for ssl_record, ssl_segment in segments
+            if ssl_segment.frames_length < ssl_segment.length
+        ]
+
+        records_by_id = {ssl_record.id: ssl_record for ssl_record in self.records}
+
         for frame in self.frames:
 
-            if len(frame.ssl_segment_reassembly) == 0:
+            if frame.ssl_segment_reassembly is None:
 
                 record = frame.last_ssl_record
-                indices = self.find_sslids_and_update_frameid_withproto_noseg(record, frame)
+                indices = self.find_sslids_and_update_frameid_withproto_noseg(record, frame, records_by_layer)
 
                 if len(indices) != 2:
                     continue
@@ -337,118 +517,115 @@ class Packet(object):
 
                 for segment in frame.ssl_segment_reassembly.segments:
 
-                    indices = self.find_sslids_and_update_frameid(segment, frame)
+                    indices = self.find_sslids_and_update_frameid(segment, frame, segments, open_segments)
 
                     if len(indices) != 2:
                         continue
                     
                     frame.insert_reassembled_segment(
-                        indices[0], self.records[indices[0]].length,
+                        indices[0], records_by_id[indices[0]].length,
                         indices[1], segment[1]
                     )
 
     def remove_duplicate_reassemblies(self):
 
-        for fake_segment in self.fake_segments:
-
-            unique_segment = True
+        if self.frames_unique is EMPTY:
+            self.frames_unique = []
 
-            if len(self.ssl_segments_reassembled) > 0:
+        if self.ssl_segments_reassembled is EMPTY:
+            self.ssl_segments_reassembled = []
 
-                for reassembled_segment in self.ssl_segments_reassembled:
+        frames_by_layer = {}
 
-                    if fake_segment.length != reassembled_segment.length or \
-                        fake_segment.count != reassembled_segment.count:
-                        continue
+        for frame in self.frames:
+            frames_by_layer.setdefault(frame.layer_id, []).append(frame)
 
-                    comparison_list = zip(
-                        fake_segment.segments,
-                        reassembled_segment.segments
-                    )
+        reassembled = {
+            reassembled_segment.key()
+            for reassembled_segment in self.ssl_segments_reassembled
+        }
 
-                    if not any(i[0] != j[0] or i[1] != j[1] for i, j in comparison_list):
-                        unique_segment = False
-                        break
+        for fake_segment in self.fake_segments:
 
-            if unique_segment:
+            key = fake_segment.key()
 
-                self.ssl_segments_reassembled.append(fake_segment)
+            if key in reassembled:
+                continue
 
-                self.frames_unique.extend([
-                    frame for frame in self.frames
-                    if frame.layer_id == fake_segment.frame_layer_id
-                ])
+            reassembled.add(key)
+            self.ssl_segments_reassembled.append(fake_segment)
+            self.frames_unique.extend(frames_by_layer.get(fake_segment.frame_layer_id, EMPTY))
 
         self.frames_unique.extend([
             frame for frame in self.frames
-            if len(frame.ssl_segment_reassembly) == 0
+            if frame.ssl_segment_reassembly is None
         ])
 
     def update_frame_bytecount(self):
-        
-        for frame in self.frames:
 
-            frame_start = -1
-            frame_finish = -1
+        # per record: the payload carried by all of its segments, and for every
+        # (segment, frame) pair the offset of the frame's bytes in that payload
+        # and their size; later occurrences of a frame in a segment win
+        records = {}
 
-            for segment_index in frame.ssl_segment_indices:
+        for ssl_record in self.records:
 
-                frame_length = 0
-                ssl_record = self.records[segment_index.record_id]
+            offsets = {}
+            content_length = 0
 
-                for ssl_segment in ssl_record.segment_data:
-                    for http_frame_seg in ssl_segment.frames:
-                        frame_length += http_frame_seg[1]
+            for ssl_segment in ssl_record.segment_data:
+                for frame_id, length in ssl_segment.frames:
+                    offsets[(ssl_segment.id, frame_id)] = (content_length, length)
+                    content_length += length
 
-                last_http2_frame = 0
-                ssl_record.content_length = frame_length
-                segment_index.content_length = ssl_record.content_length
+            segment_ids = {ssl_segment.id for ssl_segment in ssl_record.segment_data}
+            records[ssl_record.id] = (ssl_record, content_length, offsets, segment_ids)
 
-                for ssl_segment in ssl_record.segment_data:
+        for frame in self.frames:
 
-                    first_ssl_segment = 0
-                    http2_ssl_seg_size = 0
+            frame_start = -1
+            frame_finish = -1
 
-                    for http_frame_seg in ssl_segment.frames:
+            for segment_index in frame.ssl_segment_indices:
 
-                        if http_frame_seg[0] == frame.id:
-                            http2_ssl_seg_size = http_frame_seg[1]
-                            first_ssl_segment = last_http2_frame
+                ssl_record, frame_length, offsets, segment_ids = records[segment_index.record_id]
 
-                        last_http2_frame += http_frame_seg[1]
+                ssl_record.content_length = frame_length
+                segment_index.content_length = ssl_record.content_length
 
-                    if ssl_segment.id == segment_index.segment_id:
+                if segment_index.segment_id not in segment_ids:
+                    continue
 
-                        if frame_length > 0:
-                            first_ssl_segment = first_ssl_segment / (1.0 * frame_length) * ssl_record.length
-                            last_ssl_segment = first_ssl_segment + http2_ssl_seg_size / (1.0 * frame_length) * ssl_record.length
-                        else:
-                            first_ssl_segment = 0
-                            last_ssl_segment = ssl_record.length
+                first_ssl_segment, http2_ssl_seg_size = offsets.get((segment_index.segment_id, frame.id), (0, 0))
 
-                        if first_ssl_segment < 0:
-                            first_ssl_segment = 0
+                if frame_length > 0:
+                    first_ssl_segment = first_ssl_segment / (1.0 * frame_length) * ssl_record.length
+                    last_ssl_segment = first_ssl_segment + http2_ssl_seg_size / (1.0 * frame_length) * ssl_record.length
+                else:
+                    first_ssl_segment = 0
+                    last_ssl_segment = ssl_record.length
 
-                        if last_ssl_segment > ssl_record.length:
-                            last_ssl_segment = ssl_record.length
+                if first_ssl_segment < 0:
+                    first_ssl_segment = 0
 
-                        segment_index.bytecount_start = ssl_record.bytecount_index + first_ssl_segment
-                        segment_index.bytecount_finish = ssl_record.bytecount_index + last_ssl_segment - 1
+                if last_ssl_segment > ssl_record.length:
+                    last_ssl_segment = ssl_record.length
 
-                        if frame_start == -1:
+                segment_index.bytecount_start = ssl_record.bytecount_index + first_ssl_segment
+                segment_index.bytecount_finish = ssl_record.bytecount_index + last_ssl_segment - 1
 
-                            frame_start = segment_index.bytecount_start
-                            frame_finish = segment_index.bytecount_finish
+                if frame_start == -1:
 
-                        else:
+                    frame_start = segment_index.bytecount_start
+                    frame_finish = segment_index.bytecount_finish
 
-                            if frame_finish < segment_index.bytecount_finish:
-                                frame_finish = segment_index.bytecount_finish
+                else:
 
-                            if frame_start > segment_index.bytecount_start:
-                                frame_start = segment_index.bytecount_start
+                    if frame_finish < segment_index.bytecount_finish:
+                        frame_finish = segment_index.bytecount_finish
 
-                        break
+                    if frame_start > segment_index.bytecount_start:
+                        frame_start = segment_index.bytecount_start
 
             frame.bytecount_start = frame_start
             frame.bytecount_finish = frame_finish
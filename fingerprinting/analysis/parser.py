@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from xml.etree import ElementTree
+
 
 class MissingField(Exception):
 
@@ -9,27 +11,100 @@ class MissingField(Exception):
         super().__init__(self.TEMPLATE % value)
 
 
+def show_boolean(value):
+    return value == "1"
+
+
+def iterate_packets(capture):
+
+    context = ElementTree.iterparse(capture, events=("start", "end"))
+    _, root = next(context)
+
+    for event, element in context:
+
+        if event != "end" or element.tag != "packet":
+            continue
+
+        yield element
+        root.clear()
+
+
 class XmlWrapper(object):
 
     def __init__(self, layer):
         self.layer = layer
+        self._values = {}
+        self._fields = None
+        self._protos = None
 
     @property
     def type(self):
         return self.layer.attrib["name"]
 
+    def _build_index(self):
+
+        self._fields = {}
+        self._protos = {}
+
+        for xml_element in self.layer:
+
+            if xml_element.tag == "field":
+                index = self._fields
+            elif xml_element.tag == "proto":
+                index = self._protos
+            else:
+                continue
+
+            name = xml_element.attrib.get("name")
+
+            if name in index:
+                index[name].append(xml_element)
+            else:
+                index[name] = [xml_element]
+
+    def _field(self, field):
+
+        if self._fields is None:
+            self._build_index()
+
+        xml_elements = self._fields.get(field)
+        return xml_elements[0] if xml_elements else None
+
+    def _proto(self, field):
+
+        if self._protos is None:
+            self._build_index()
+
+        xml_elements = self._protos.get(field)
+        return xml_elements[0] if xml_elements else None
+
+    def _convert(self, field, conversion):
+
+        key = (field, conversion)
+
+        if key in self._values:
+            return self._values[key]
+
+        xml_element = self._field(field)
+
+        if xml_element is None:
+            raise MissingField(field)
+
+        value = self._values[key] = conversion(xml_element.attrib["show"])
+        return value
+
     def nested(self, field):
 
-        xml_element = self.layer.find(f'field[@name="{field}"]')
+        xml_element = self._field(field)
 
-        if xml_element:
+        if xml_element is not None and len(xml_element) > 0:
             return XmlWrapper(xml_element)
         else:
             raise MissingField(field)
 
     def proto(self, field):
 
-        xml_element = self.layer.find(f'proto[@name="{field}"]')
+        xml_element = self._proto(field)
 
         if xml_element is None:
             raise MissingField(field)
@@ -38,44 +113,92 @@ class XmlWrapper(object):
 
     def exists(self, field):
 
-        return self.layer.find(f'field[@name="{field}"]') is not None
+        return self._field(field) is not None
 
     def children(self, field):
 
-        return enumerate(self.layer.findall(f'field[@name="{field}"]'))
+        if self._fields is None:
+            self._build_index()
 
-    def integer(self, field):
+        return enumerate(self._fields.get(field, ()))
 
-        xml_element = self.layer.find(f'field[@name="{field}"]')
+    def nested_children(self, field):
 
-        if xml_element is None:
-            raise MissingField(field)
-        else:
-            return int(xml_element.attrib["show"])
+        return ((index, XmlWrapper(xml_element)) for index, xml_element in self.children(field))
 
-    def boolean(self, field):
+    def integer(self, field):
 
-        xml_element = self.layer.find(f'field[@name="{field}"]')
+        return self._convert(field, int)
 
-        if xml_element is None:
-            raise MissingField(field)
-        else:
-            return xml_element.attrib["show"] == "1"
+    def boolean(self, field):
+
+        return self._convert(field, show_boolean)
 
     def real(self, field):
 
-        xml_element = self.layer.find(f'field[@name="{field}"]')
+        return self._convert(field, float)
 
-        if xml_element is None:
+    def string(self, field):
+
+        return self._convert(field, str)
+
+
+class FieldWrapper(object):
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    @property
+    def type(self):
+        return self.name
+
+    def _show(self, field):
+
+        value = self.fields.get(field)
+
+        if value is None or isinstance(value, (list, FieldWrapper)):
             raise MissingField(field)
         else:
-            return float(xml_element.attrib["show"])
+            return value
 
-    def string(self, field):
+    def nested(self, field):
 
-        xml_element = self.layer.find(f'field[@name="{field}"]')
+        value = self.fields.get(field)
 
-        if xml_element is None:
-            raise MissingField(field)
+        if isinstance(value, FieldWrapper):
+            return value
         else:
-            return str(xml_element.attrib["show"])
+            raise MissingField(field)
+
+    def proto(self, field):
+
+        return self.nested(field)
+
+    def exists(self, field):
+
+        return field in self.fields
+
+    def children(self, field):
+
+        return enumerate(self.fields.get(field, ()))
+
+    def nested_children(self, field):
+
+        return self.children(field)
+
+    def integer(self, field):
+
+        return int(self._show(field))
+
+    def boolean(self, field):
+
+        return show_boolean(self._show(field))
+
+    def real(self, field):
+
+        return float(self._show(field))
+
+    def string(self, field):
+
+        return str(self._show(field))
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from enum import Enum
+from fingerprinting.analysis.slotted import Slotted
 from fingerprinting.analysis.parser import MissingField
 
 class TlsRecordType(Enum):
@@ -25,17 +26,29 @@ class TlsHandshakeType(Enum):
     ENCRYPTED = 255
 
 
-class SslSegmentData(object):
+class SslSegmentData(Slotted):
 
-    INSTANCE_COUNT = 0
+    __slots__ = ("id", "frames", "length", "frames_length")
 
-    def __init__(self, length):
-
-        SslSegmentData.INSTANCE_COUNT += 1
+    def __init__(self, segment_id, length):
 
         self.frames = []
+        self.id = segment_id
         self.length = length
-        self.id = SslSegmentData.INSTANCE_COUNT
+        self.frames_length = 0
+
+    @staticmethod
+    def upgrade_state(state):
+
+        if "frames_length" not in state:
+            state["frames_length"] = sum(length for _, length in state.get("frames", ()))
+
+        return state
+
+    def insert_frame(self, frame_id, length):
+
+        self.frames_length += length
+        self.frames.append([frame_id, length])
 
     def serialize(self):
 
@@ -46,25 +59,36 @@ class SslSegmentData(object):
         }
 
 
-class TlsRecord(object):
+class TlsRecord(Slotted):
 
-    INSTANCE_COUNT = 0
+    __slots__ = (
+        "id",
+        "type",
+        "packet",
+        "length",
+        "frames",
+        "layer_id",
+        "handshake",
+        "sublayer_id",
+        "segment_data",
+        "frames_length",
+        "content_length",
+        "bytecount_index",
+    )
 
     def __init__(self, packet, layer, layer_id, sublayer_id):
 
-        TlsRecord.INSTANCE_COUNT += 1
-
         self.packet = packet
         self.layer_id = layer_id
         self.sublayer_id = sublayer_id
-        self.id = TlsRecord.INSTANCE_COUNT
+        self.id = packet.identifiers.next_record()
         self.length = layer.integer("ssl.record.length")
         self.type = TlsRecordType(layer.integer("ssl.record.content_type"))
 
         self.segment_data = []
         self.content_length = 0
-        self.segment_data.append(SslSegmentData(self.length))
-        self.bytecount_index = packet.lengths["records"]
+        self.segment_data.append(SslSegmentData(packet.identifiers.next_segment(), self.length))
+        self.bytecount_index = packet.length_records
 
         if self.type == TlsRecordType.APPLICATION_DATA:
             self.frames = []
@@ -86,7 +110,7 @@ class TlsRecord(object):
 
     def insert_segment_data(self, length):
 
-        self.segment_data.append(SslSegmentData(length))
+        self.segment_data.append(SslSegmentData(self.packet.identifiers.next_segment(), length))
 
     def serialize(self):
 
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+# shared placeholder for containers that are only allocated on first insert
+EMPTY = ()
+
+
+class Slotted(object):
+
+    # YAML represents a bare __slots__ object with a (None, slots) state tuple,
+    # which cannot be reloaded once the object graph has cycles, so the state
+    # is exposed as a plain dictionary like an ordinary instance would be
+
+    __slots__ = ()
+
+    @classmethod
+    def get_slots(cls):
+
+        return [name for base in cls.__mro__ for name in getattr(base, "__slots__", ())]
+
+    def __getstate__(self):
+
+        state = {}
+
+        for name in self.get_slots():
+            if hasattr(self, name):
+                state[name] = getattr(self, name)
+
+        return state
+
+    def __setstate__(self, state):
+
+        state = self.upgrade_state(dict(state))
+        slots = set(self.get_slots())
+
+        # values that are derived now (properties) are not restored
+        for name, value in state.items():
+            if name in slots:
+                setattr(self, name, value)
+
+    @staticmethod
+    def upgrade_state(state):
+
+        # translates the state of dumps written before the slotted model
+        return state
@@ -1,14 +1,247 @@
 # -*- coding: utf-8 -*-
 
+import math
+
 from fingerprinting.analysis.h2 import Http2Frame
 
+QUANTILES = (0.5, 0.9, 0.99)
 
-class Statistics(object):
+
+class Moments(object):
+
+    # running count, mean and variance (Welford), merged with Chan's formula
 
     def __init__(self):
 
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    @property
+    def variance(self):
+
+        return self.m2 / self.count if self.count > 0 else 0.0
+
+    def insert(self, value):
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other):
+
+        if other.count == 0:
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+
+        if self.minimum is None or other.minimum < self.minimum:
+            self.minimum = other.minimum
+
+        if self.maximum is None or other.maximum > self.maximum:
+            self.maximum = other.maximum
+
+        return self
+
+    def serialize(self):
+
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "deviation": math.sqrt(self.variance),
+        }
+
+
+class QuantileSketch(object):
+
+    # logarithmic buckets with a fixed relative accuracy: a value x > 0 lands
+    # in bucket ceil(log_gamma(x)), so every quantile is returned within
+    # RELATIVE_ACCURACY of the exact one and sketches merge by adding counts
+
+    RELATIVE_ACCURACY = 0.01
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+
+        self.count = 0
+        self.zeros = 0
+        self.buckets = {}
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+
+    def insert(self, value):
+
+        self.count += 1
+
+        if value <= 0:
+            self.zeros += 1
+            return
+
+        index = int(math.ceil(math.log(value) / self.log_gamma))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+
+        if other.relative_accuracy != self.relative_accuracy:
+            raise Exception("[E] Cannot merge sketches with different accuracies!")
+
+        self.count += other.count
+        self.zeros += other.zeros
+
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+        return self
+
+    def quantile(self, q):
+
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zeros
+
+        if seen > rank:
+            return 0.0
+
+        for index in sorted(self.buckets):
+
+            seen += self.buckets[index]
+
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def histogram(self):
+
+        # (upper bound, count) pairs in increasing order, zeros first
+        histogram = [(0.0, self.zeros)] if self.zeros > 0 else []
+
+        histogram.extend(
+            (self.gamma ** index, self.buckets[index])
+            for index in sorted(self.buckets)
+        )
+
+        return histogram
+
+    def serialize(self):
+
+        return {
+            "p%d" % round(q * 100): self.quantile(q)
+            for q in QUANTILES
+        }
+
+
+class Distribution(object):
+
+    # sizes and timing of the frames of one type sent in one direction
+
+    def __init__(self):
+
+        self.count = 0
+        self.length = 0
+        self.pooled = False
+        self.last_seen = None
+        self.first_seen = None
+        self.gaps = Moments()
+        self.sizes = QuantileSketch()
+        self.gap_sketch = QuantileSketch()
+
+    @property
+    def duration(self):
+
+        return self.last_seen - self.first_seen if self.count > 0 else 0.0
+
+    @property
+    def throughput(self):
+
+        return self.length / self.duration if self.duration > 0 else 0.0
+
+    def insert(self, length, timestamp):
+
+        if self.last_seen is not None and timestamp >= self.last_seen:
+            self.gaps.insert(timestamp - self.last_seen)
+            self.gap_sketch.insert(timestamp - self.last_seen)
+
+        if self.first_seen is None or timestamp < self.first_seen:
+            self.first_seen = timestamp
+
+        if self.last_seen is None or timestamp > self.last_seen:
+            self.last_seen = timestamp
+
+        self.count += 1
+        self.length += length
+        self.sizes.insert(length)
+
+    def merge(self, other):
+
+        if other.count == 0:
+            return self
+
+        # gaps are only measured between frames of the same part, so once two
+        # parts are merged they are a pool of per-part gaps and no longer the
+        # gaps between consecutive frames of the whole
+        self.pooled = self.pooled or other.pooled or self.count > 0
+
+        if self.first_seen is None or other.first_seen < self.first_seen:
+            self.first_seen = other.first_seen
+
+        if self.last_seen is None or other.last_seen > self.last_seen:
+            self.last_seen = other.last_seen
+
+        self.count += other.count
+        self.length += other.length
+        self.gaps.merge(other.gaps)
+        self.sizes.merge(other.sizes)
+        self.gap_sketch.merge(other.gap_sketch)
+
+        return self
+
+    def serialize(self):
+
+        return {
+            "count": self.count,
+            "length": self.length,
+            "last_seen": self.last_seen,
+            "first_seen": self.first_seen,
+            "throughput": self.throughput,
+            "sizes": self.sizes.serialize(),
+            "inter_arrival": {
+                **self.gaps.serialize(),
+                **self.gap_sketch.serialize(),
+                "pooled": self.pooled
+            },
+        }
+
+
+class Statistics(object):
+
+    # streams only need the per type counters, the distributions are kept on
+    # the connection, where they are serialized
+    def __init__(self, distributions=True):
+
         self.total_count = 0
         self.total_length = 0
+        self.directions = {}
+        self.distributions = {}
+        self.keep_distributions = distributions
 
         self.mapping = {
             frame_type: dict(count=0, length=0, timestamp=0.0)
@@ -25,10 +258,65 @@ class Statistics(object):
         if frame.timestamp > self.mapping[frame.type]["timestamp"]:
             self.mapping[frame.type]["timestamp"] = frame.timestamp
 
+        if not self.keep_distributions:
+            return
+
+        key = (frame.type, frame.direction)
+
+        if key not in self.distributions:
+            self.distributions[key] = Distribution()
+
+        self.distributions[key].insert(frame.length, frame.timestamp)
+
+        # kept apart from the per type distributions, whose gaps skip the
+        # frames of other types in between
+        if frame.direction not in self.directions:
+            self.directions[frame.direction] = Distribution()
+
+        self.directions[frame.direction].insert(frame.length, frame.timestamp)
+
+    def merge(self, other):
+
+        # statistics of streams, connections or whole captures add up, so
+        # corpus aggregates can be built without keeping the frames around
+        self.total_count += other.total_count
+        self.total_length += other.total_length
+
+        for frame_type, mapping in other.mapping.items():
+
+            self.mapping[frame_type]["count"] += mapping["count"]
+            self.mapping[frame_type]["length"] += mapping["length"]
+
+            if mapping["timestamp"] > self.mapping[frame_type]["timestamp"]:
+                self.mapping[frame_type]["timestamp"] = mapping["timestamp"]
+
+        if not self.keep_distributions:
+            return self
+
+        for key, distribution in other.distributions.items():
+
+            if key not in self.distributions:
+                self.distributions[key] = Distribution()
+
+            self.distributions[key].merge(distribution)
+
+        for direction, distribution in other.directions.items():
+
+            if direction not in self.directions:
+                self.directions[direction] = Distribution()
+
+            self.directions[direction].merge(distribution)
+
+        return self
+
     def get_last_timestamp(self, frame):
 
         return self.mapping[frame.type]["timestamp"]
 
+    def get_direction(self, direction):
+
+        return self.directions.get(direction, Distribution())
+
     def get_statistics(self, mapping):
 
         total_count = self.total_count
@@ -52,3 +340,19 @@ class Statistics(object):
             k.name: self.get_statistics(v)
             for k, v in self.mapping.items()
         }
+
+    def serialize_distributions(self):
+
+        frames = {}
+
+        for (frame_type, direction), distribution in sorted(
+                self.distributions.items(), key=lambda item: (item[0][0].value, item[0][1])):
+            frames.setdefault(frame_type.name, {})[direction] = distribution.serialize()
+
+        return {
+            "frames": frames,
+            "directions": {
+                direction: self.get_direction(direction).serialize()
+                for direction in sorted(self.directions)
+            }
+        }
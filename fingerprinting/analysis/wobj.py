@@ -2,6 +2,8 @@
 
 from enum import Enum
 
+from fingerprinting.analysis.slotted import Slotted
+
 
 def integer_compare(lhs, rhs):
 
@@ -16,7 +18,9 @@ class WebObjectState(Enum):
     PAYLOAD_FINISHED = 4
 
 
-class WebObject(object):
+class WebObject(Slotted):
+
+    __slots__ = ("name", "body", "state", "length", "status", "request", "response", "finished", "transitions")
 
     def __init__(self, frame):
         self.length = 0
@@ -140,11 +144,11 @@ class WebObject(object):
     def compare_lhs_headers(this, other):
 
         comparison = [
-            integer_compare(this["timestamp"], other.request_headers["timestamp"]),
-            integer_compare(this["timestamp"], other.response_headers["timestamp"])
+            integer_compare(this["timestamp"], other.request["timestamp"]),
+            integer_compare(this["timestamp"], other.response["timestamp"])
         ]
 
-        if len(other.payload) > 0:
+        if len(other.body) > 0:
 
             if this["timestamp"] < other.payload_start["timestamp"]:
                 comparison.append(-1)
@@ -175,8 +179,8 @@ class WebObject(object):
                 overlap_lhs_data_rhs_data = 0
 
             comparison += [
-                self.compare_lhs_data_rhs_headers(other.request_headers),
-                self.compare_lhs_data_rhs_headers(other.response_headers),
+                self.compare_lhs_data_rhs_headers(other.request),
+                self.compare_lhs_data_rhs_headers(other.response),
                 overlap_lhs_data_rhs_data
             ]
 
@@ -1,21 +1,32 @@
 # -*- coding: utf-8 -*-
 
 import os
+import logging
 
 from fingerprinting.common import utils
+from fingerprinting.common import snapshot
+from fingerprinting.common.progress import Progress
 
 from fingerprinting.analysis.h2f import Frame
 from fingerprinting.analysis.h2s import Stream
 from fingerprinting.analysis.h2 import Http2Frame
 from fingerprinting.analysis.packet import Packet
-from fingerprinting.analysis.parser import XmlWrapper
+from fingerprinting.analysis.record import TlsRecordType
+from fingerprinting.analysis.fields import FieldsRow
+from fingerprinting.analysis.parser import XmlWrapper, iterate_packets
+from fingerprinting.analysis.intervals import IntervalIndex
+from fingerprinting.analysis.identifiers import Identifiers
 from fingerprinting.analysis.connection import Connection
 from fingerprinting.analysis.statistics import Statistics
 
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILENAME = "all.snapshot"
+
 
 class Application(object):
 
-    def __init__(self):
+    def __init__(self, progress=None, identifiers=None, output=None):
 
         self.frames = {}
         self.packets = {}
@@ -23,6 +34,10 @@ class Application(object):
         self.records = []
         self.connection = Connection()
         self.statistics = Statistics()
+        self.stream_index = IntervalIndex([])
+        self.progress = progress if progress else Progress()
+        self.identifiers = identifiers if identifiers else Identifiers()
+        self.output = output
 
         self.settings = {
             "ENABLE_PUSH": 1,
@@ -36,18 +51,45 @@ class Application(object):
     def parse_xml(self, capture):
 
         [self.process_layers(proto) for proto in capture.getroot()]
+        self.analyze()
+        self.progress.finish()
+
+    def parse_xml_incremental(self, capture):
+
+        [self.process_layers(packet) for packet in iterate_packets(capture)]
+        self.analyze()
+        self.progress.finish()
+
+    def parse_fields(self, capture):
+
+        [self.process_fields(FieldsRow(line)) for line in capture]
+        self.analyze()
+        self.progress.finish()
+
+    def analyze(self):
+
         self.analyze_streams()
         self.analyze_packets()
 
+        # the writer is only needed while the capture is read, dropping it
+        # keeps the analysis picklable
+        if self.output is not None:
+            self.output.finish(self)
+            self.output = None
+
     def analyze_packets(self):
 
+        self.stream_index = IntervalIndex(
+            (stream.first_seen, stream.last_seen, stream.id)
+            for stream in self.streams.values()
+        )
+
         for packet in self.packets.values():
+            packet.streams_active = self.stream_index.query(packet.time_relative)
+
+    def get_active_streams(self, timestamp):
 
-            packet.streams_active = [
-                stream.id
-                for stream in self.streams.values()
-                if stream.first_seen <= packet.time_relative <= stream.last_seen
-            ]
+        return self.stream_index.query(timestamp)
 
     def analyze_streams(self):
 
@@ -63,19 +105,29 @@ class Application(object):
             "connection": self.connection.serialize(),
         })
 
-        utils.write_yaml(os.path.join(directory, "streams.yml"), {
-            k: v.serialize() for k, v in self.streams.items()
-        })
+        utils.write_yaml(
+            os.path.join(directory, "distributions.yml"),
+            self.statistics.serialize_distributions()
+        )
 
-        utils.write_yaml(os.path.join(directory, "packets.yml"), {
-            k: v.serialize() for k, v in self.packets.items()
-        })
+        utils.write_yaml_mapping(os.path.join(directory, "streams.yml"), (
+            (k, v.serialize()) for k, v in sorted(self.streams.items())
+        ))
 
-        utils.write_yaml(os.path.join(directory, "frames.yml"), {
-            k: v.serialize() for k, v in self.frames.items()
-        })
+        utils.write_yaml_mapping(os.path.join(directory, "packets.yml"), (
+            (k, v.serialize()) for k, v in sorted(self.packets.items())
+        ))
 
-        utils.write_pickle(os.path.join(directory, "all.yml"), self)
+        utils.write_yaml_mapping(os.path.join(directory, "frames.yml"), (
+            (k, v.serialize()) for k, v in sorted(self.frames.items())
+        ))
+
+        snapshot.write_snapshot(os.path.join(directory, SNAPSHOT_FILENAME), self)
+
+    @staticmethod
+    def load(directory):
+
+        return snapshot.read_snapshot(os.path.join(directory, SNAPSHOT_FILENAME), Application)
 
     def insert_frames(self, packet, layer, layer_id):
 
@@ -92,6 +144,9 @@ class Application(object):
         if len(packet.frames) > 0:
             packet.process_mapssl2http2()
 
+        if self.output is not None:
+            self.output.insert_packet(packet)
+
         for record in packet.handshakes:
             self.connection.process_handshake(packet, record.handshake)
 
@@ -152,8 +207,7 @@ class Application(object):
     def process_layers(self, layers):
 
         relevant_packet = False
-        packet = Packet(XmlWrapper(layers))
-        print(packet.id, end="...", flush=True)
+        packet = Packet(XmlWrapper(layers), self.identifiers)
 
         for layer_id, layer in enumerate(layers):
 
@@ -168,11 +222,11 @@ class Application(object):
                     sublayer_name = sublayer.attrib["name"]
 
                     if sublayer_name == "ssl.record":
-                        print("ssl.record @ %d, %d" % (layer_id, sublayer_id))
+                        logger.debug("ssl.record @ %d, %d", layer_id, sublayer_id)
                         last_ssl_record = packet.insert_ssl_record(XmlWrapper(sublayer), layer_id, sublayer_id)
                         self.records.append(last_ssl_record)
                     elif sublayer_name == "ssl.segment.data":
-                        print("ssl.segment.data @ %d, %d" % (layer_id, sublayer_id))
+                        logger.debug("ssl.segment.data @ %d, %d", layer_id, sublayer_id)
                         last_ssl_record.insert_segment_data(int(sublayer.attrib["size"]))
 
                 relevant_packet = True
@@ -184,7 +238,7 @@ class Application(object):
                     if sublayer.attrib["name"] != "http2.stream":
                         continue
 
-                    print("http2.stream @ %d, %d" % (layer_id, sublayer_id))
+                    logger.debug("http2.stream @ %d, %d", layer_id, sublayer_id)
                     self.insert_frame(packet, XmlWrapper(sublayer), layer_id, sublayer_id)
 
                 relevant_packet = True
@@ -196,10 +250,41 @@ class Application(object):
                     if sublayer.attrib["name"] != "ssl.segments":
                         continue
 
-                    print("ssl.segments @ %d, %d" % (layer_id, sublayer_id))
+                    logger.debug("ssl.segments @ %d, %d", layer_id, sublayer_id)
                     packet.insert_fake_segment(XmlWrapper(sublayer), layer_id, sublayer_id)
 
                 relevant_packet = True
 
         if relevant_packet:
             self.insert_packet(packet)
+
+        self.progress.update(len(packet.frames), packet.length_total)
+
+    def process_fields(self, row):
+
+        records = row.records
+        frames = row.frames
+        packet = Packet(row.packet, self.identifiers)
+
+        # frames belong to the last application data record of their packet,
+        # without one there is nothing to attach them to
+        if frames and not any(
+            record.integer("ssl.record.content_type") == TlsRecordType.APPLICATION_DATA.value
+            for record in records
+        ):
+            logger.warning("[!] Skipping packet %d: HTTP/2 frames without an application data record", packet.id)
+            self.progress.update(0, packet.length_total)
+            return
+
+        # tshark -T fields does not keep the layer tree, so records and frames
+        # get one layer each and are numbered in the order they were dissected
+        for sublayer_id, record in enumerate(records):
+            self.records.append(packet.insert_ssl_record(record, 0, sublayer_id))
+
+        for sublayer_id, frame in enumerate(frames):
+            self.insert_frame(packet, frame, 1, sublayer_id)
+
+        if len(records) > 0:
+            self.insert_packet(packet)
+
+        self.progress.update(len(packet.frames), packet.length_total)
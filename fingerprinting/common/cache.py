@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import json
+import pickle
+import hashlib
+import logging
+import functools
+
+from fingerprinting.common import utils
+from fingerprinting.common import tshark
+
+logger = logging.getLogger(__name__)
+
+# the package whose classes make up a stored result
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@functools.lru_cache(maxsize=None)
+def get_schema_hash(directory=PACKAGE_DIRECTORY):
+
+    # results are pickled analysis objects, so any change to the code that
+    # builds them (slots, attributes, parsing) makes a new key, whether or
+    # not VERSION was bumped along with it
+    digest = hashlib.sha256()
+
+    for root, directories, files in os.walk(directory):
+
+        directories.sort()
+
+        for filename in sorted(files):
+
+            if not filename.endswith(".py"):
+                continue
+
+            digest.update(os.path.relpath(os.path.join(root, filename), directory).encode("utf-8"))
+
+            with open(os.path.join(root, filename), mode="rb") as fp:
+                digest.update(fp.read())
+
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+
+    # bump whenever the analysis changes in a way that invalidates stored
+    # results without touching its sources or the tshark version, e.g. new
+    # preferences passed to tshark by default
+    VERSION = 3
+
+    MAX_SIZE = 4 << 30
+
+    # files that count towards max_size: the stored results and the editcap
+    # copies of the captures they were computed from
+    EXTENSIONS = (".pickle", ".pcap")
+
+    # seconds during which a freshly written or reused file is never evicted,
+    # so another worker can still open the editcap copy it just got a hit on
+    GRACE_PERIOD = 60.0
+
+    def __init__(self, directory=None, max_size=MAX_SIZE, shared_directories=None):
+
+        self.max_size = max_size
+        self.directory = directory if directory else utils.get_cache_directory("results")
+
+        if shared_directories is None:
+            shared_directories = [] if directory else [utils.get_cache_directory("editcap")]
+
+        self.directories = [self.directory] + list(shared_directories)
+
+    def key(self, capture_hash, keylog_filename, display_filter, override_prefs, **options):
+
+        keylog_hash = None
+
+        if keylog_filename and os.path.isfile(keylog_filename):
+            keylog_hash = utils.hash_file(keylog_filename)
+
+        # the keylog is identified by its contents, not by where it is stored
+        override_prefs = {
+            k: v for k, v in override_prefs.items()
+            if k != "ssl.keylog_file"
+        }
+
+        description = json.dumps({
+            "version": self.VERSION,
+            "schema": get_schema_hash(),
+            "tshark": tshark.get_version(),
+            "capture": capture_hash,
+            "keylog": keylog_hash,
+            "display_filter": " ".join(display_filter.split()),
+            "override_prefs": override_prefs,
+            "options": options,
+        }, sort_keys=True)
+
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    def get_filename(self, key):
+
+        return os.path.join(self.directory, key + ".pickle")
+
+    def load(self, key):
+
+        filename = self.get_filename(key)
+
+        if not os.path.isfile(filename):
+            return None
+
+        # besides truncated files, pickles of classes that were renamed or
+        # moved since they were stored fail with AttributeError or ImportError
+        try:
+            with open(filename, mode="rb") as fp:
+                state = pickle.load(fp)
+        except Exception as exception:
+            logger.warning("[!] Discarding unreadable cache entry %s: %s", key, exception)
+            os.remove(filename)
+            return None
+
+        # the modification time doubles as the last access time for eviction
+        os.utime(filename)
+        logger.info("[>] Reusing cached analysis %s", key)
+
+        return state
+
+    def store(self, key, state):
+
+        filename = self.get_filename(key)
+        temporary_filename = "%s.%d.tmp" % (filename, os.getpid())
+
+        with open(temporary_filename, mode="wb") as fp:
+            pickle.dump(state, fp, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temporary_filename, filename)
+        self.evict()
+
+    def evict(self):
+
+        entries = []
+        deadline = time.time() - self.GRACE_PERIOD
+
+        for directory in self.directories:
+            for filename in os.listdir(directory):
+
+                if not filename.endswith(self.EXTENSIONS):
+                    continue
+
+                filename = os.path.join(directory, filename)
+
+                try:
+                    status = os.stat(filename)
+                except FileNotFoundError:
+                    continue
+
+                entries.append((status.st_mtime, status.st_size, filename))
+
+        total_size = sum(size for _, size, _ in entries)
+
+        for timestamp, size, filename in sorted(entries):
+
+            if total_size <= self.max_size or timestamp > deadline:
+                break
+
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+
+            total_size -= size
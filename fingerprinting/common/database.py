@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+
+import json
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+# every table is keyed by the capture it came from, so any number of captures
+# can be appended to one database and queried together; a capture is one
+# analysis variant (test name, keys or not, tcp stream) of one file
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    variant TEXT NOT NULL DEFAULT '',
+    hash TEXT,
+    UNIQUE (name, variant)
+);
+
+CREATE TABLE IF NOT EXISTS connections (
+    capture INTEGER NOT NULL REFERENCES captures(id),
+    tcp_stream INTEGER NOT NULL,
+    client_address TEXT,
+    server_address TEXT,
+    first_stream INTEGER,
+    last_stream INTEGER,
+    terminated INTEGER,
+    error TEXT,
+    PRIMARY KEY (capture, tcp_stream)
+);
+
+CREATE TABLE IF NOT EXISTS settings (
+    capture INTEGER NOT NULL REFERENCES captures(id),
+    tcp_stream INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value INTEGER,
+    PRIMARY KEY (capture, tcp_stream, name)
+);
+
+CREATE TABLE IF NOT EXISTS packets (
+    capture INTEGER NOT NULL REFERENCES captures(id),
+    id INTEGER NOT NULL,
+    tcp_stream INTEGER NOT NULL,
+    timestamp REAL,
+    time_delta REAL,
+    source TEXT,
+    destination TEXT,
+    source_port INTEGER,
+    destination_port INTEGER,
+    direction TEXT,
+    length INTEGER,
+    length_frames INTEGER,
+    length_records INTEGER,
+    PRIMARY KEY (capture, id)
+);
+
+CREATE TABLE IF NOT EXISTS records (
+    capture INTEGER NOT NULL REFERENCES captures(id),
+    id INTEGER NOT NULL,
+    packet INTEGER NOT NULL,
+    tcp_stream INTEGER NOT NULL,
+    type TEXT,
+    direction TEXT,
+    length INTEGER,
+    content_length INTEGER,
+    bytecount_index INTEGER,
+    timestamp REAL,
+    PRIMARY KEY (capture, id)
+);
+
+CREATE TABLE IF NOT EXISTS frames (
+    capture INTEGER NOT NULL REFERENCES captures(id),
+    id INTEGER NOT NULL,
+    packet INTEGER NOT NULL,
+    record INTEGER,
+    tcp_stream INTEGER NOT NULL,
+    stream INTEGER NOT NULL,
+    type TEXT,
+    direction TEXT,
+    length INTEGER,
+    body INTEGER,
+    timestamp REAL,
+    http_method TEXT,
+    http_status INTEGER,
+    http_resource TEXT,
+    attributes TEXT,
+    PRIMARY KEY (capture, id)
+);
+
+CREATE TABLE IF NOT EXISTS streams (
+    capture INTEGER NOT NULL REFERENCES captures(id),
+    tcp_stream INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    parent INTEGER,
+    direction TEXT,
+    state TEXT,
+    error TEXT,
+    weight INTEGER,
+    length INTEGER,
+    window_size INTEGER,
+    first_seen REAL,
+    last_seen REAL,
+    PRIMARY KEY (capture, tcp_stream, id)
+);
+
+CREATE TABLE IF NOT EXISTS objects (
+    capture INTEGER NOT NULL REFERENCES captures(id),
+    tcp_stream INTEGER NOT NULL,
+    stream INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    status INTEGER,
+    length INTEGER,
+    finished INTEGER,
+    request_timestamp REAL,
+    response_timestamp REAL,
+    payload_start REAL,
+    payload_finish REAL,
+    body TEXT,
+    PRIMARY KEY (capture, tcp_stream, stream, position)
+);
+
+CREATE INDEX IF NOT EXISTS packets_timestamp ON packets (timestamp);
+CREATE INDEX IF NOT EXISTS records_packet ON records (capture, packet);
+CREATE INDEX IF NOT EXISTS records_type ON records (type, direction);
+CREATE INDEX IF NOT EXISTS frames_stream ON frames (capture, tcp_stream, stream);
+CREATE INDEX IF NOT EXISTS frames_type ON frames (type, direction);
+CREATE INDEX IF NOT EXISTS frames_timestamp ON frames (timestamp);
+CREATE INDEX IF NOT EXISTS frames_resource ON frames (http_resource);
+CREATE INDEX IF NOT EXISTS streams_direction ON streams (direction);
+CREATE INDEX IF NOT EXISTS streams_first_seen ON streams (first_seen);
+CREATE INDEX IF NOT EXISTS objects_name ON objects (name, length);
+CREATE INDEX IF NOT EXISTS objects_length ON objects (length);
+"""
+
+TABLES = ("connections", "settings", "packets", "records", "frames", "streams", "objects")
+
+# frame attributes that get their own column, the rest of Frame.serialize()
+# is kept as JSON in frames.attributes
+FRAME_COLUMNS = {
+    "body", "length", "type", "packet", "stream", "record", "direction",
+    "timestamp", "http_method", "http_status", "http_resource"
+}
+
+
+def packet_direction(packet):
+    return "S2C" if packet.source_port == 443 else "C2S"
+
+
+class Database(object):
+
+    def __init__(self, filename):
+
+        self.filename = filename
+        # parallel workers append to the same file, so wait for their locks
+        self.connection = sqlite3.connect(filename, timeout=60.0)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def insert_capture(self, name, capture_hash=None, variant=""):
+
+        # exporting a capture again replaces whatever was stored for it
+        cursor = self.connection.execute(
+            "SELECT id FROM captures WHERE name = ? AND variant = ?",
+            (name, variant)
+        )
+        row = cursor.fetchone()
+
+        if row is not None:
+
+            for table in TABLES:
+                self.connection.execute("DELETE FROM %s WHERE capture = ?" % table, (row[0],))
+
+            self.connection.execute("UPDATE captures SET hash = ? WHERE id = ?", (capture_hash, row[0]))
+
+            return row[0]
+
+        cursor = self.connection.execute(
+            "INSERT INTO captures (name, variant, hash) VALUES (?, ?, ?)",
+            (name, variant, capture_hash)
+        )
+
+        return cursor.lastrowid
+
+    def export(self, name, state, capture_hash=None, variant=""):
+
+        # state is an Application or a ConnectionDemultiplexer
+        if hasattr(state, "applications"):
+            applications = sorted(state.applications.items())
+        else:
+            applications = [(0, state)]
+
+        with self.connection:
+
+            capture = self.insert_capture(name, capture_hash, variant)
+
+            for tcp_stream, application in applications:
+                self.insert_application(capture, tcp_stream, application)
+
+        logger.info("[<] Exported %s %s to %s", name, variant, self.filename)
+
+        return capture
+
+    def insert_application(self, capture, tcp_stream, application):
+
+        connection = application.connection
+
+        self.connection.execute(
+            "INSERT INTO connections VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (
+                capture, tcp_stream,
+                connection.client_address,
+                connection.server_address,
+                connection.first_stream,
+                connection.last_stream,
+                connection.terminated,
+                connection.error.name
+            )
+        )
+
+        self.connection.executemany(
+            "INSERT INTO settings VALUES (?, ?, ?, ?)", (
+                (capture, tcp_stream, name, value)
+                for name, value in sorted(application.settings.items())
+            )
+        )
+
+        self.connection.executemany(
+            "INSERT INTO packets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                (
+                    capture, packet.id, tcp_stream,
+                    packet.time_relative,
+                    packet.time_delta,
+                    packet.source,
+                    packet.destination,
+                    packet.source_port,
+                    packet.destination_port,
+                    packet_direction(packet),
+                    packet.length_total,
+                    packet.length_frames,
+                    packet.length_records
+                )
+                for packet in application.packets.values()
+            )
+        )
+
+        self.connection.executemany(
+            "INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                (
+                    capture, record.id, record.packet.id, tcp_stream,
+                    record.type.name,
+                    packet_direction(record.packet),
+                    record.length,
+                    record.content_length,
+                    record.bytecount_index,
+                    record.packet.time_relative
+                )
+                for record in application.records
+            )
+        )
+
+        self.connection.executemany(
+            "INSERT INTO frames VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                self.get_frame_row(capture, tcp_stream, frame)
+                for frame in application.frames.values()
+            )
+        )
+
+        self.connection.executemany(
+            "INSERT INTO streams VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                (
+                    capture, tcp_stream, stream.id,
+                    None if stream.parent is None else stream.parent.id,
+                    stream.direction,
+                    stream.state.name,
+                    stream.error.name,
+                    stream.weight,
+                    stream.length,
+                    stream.window_size,
+                    stream.first_seen,
+                    stream.last_seen
+                )
+                for stream in application.streams.values()
+            )
+        )
+
+        self.connection.executemany(
+            "INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                self.get_object_row(capture, tcp_stream, stream.id, position, web_object)
+                for stream in application.streams.values()
+                for position, web_object in enumerate(stream.objects)
+            )
+        )
+
+    @staticmethod
+    def get_frame_row(capture, tcp_stream, frame):
+
+        contents = frame.serialize()
+
+        attributes = {
+            k: v for k, v in contents.items()
+            if k not in FRAME_COLUMNS
+        }
+
+        return (
+            capture, frame.id, frame.packet.id,
+            contents["record"],
+            tcp_stream,
+            frame.stream_id,
+            frame.type.name,
+            frame.direction,
+            frame.length,
+            frame.body,
+            frame.timestamp,
+            contents.get("http_method"),
+            contents.get("http_status"),
+            contents.get("http_resource"),
+            json.dumps(attributes, sort_keys=True) if attributes else None
+        )
+
+    @staticmethod
+    def get_object_row(capture, tcp_stream, stream_id, position, web_object):
+
+        return (
+            capture, tcp_stream, stream_id, position,
+            web_object.name,
+            web_object.status,
+            web_object.length,
+            web_object.finished,
+            web_object.request["timestamp"],
+            web_object.response.get("timestamp"),
+            web_object.body[0]["timestamp"] if web_object.body else None,
+            web_object.body[-1]["timestamp"] if web_object.body else None,
+            json.dumps([entry["length"] for entry in web_object.body])
+        )
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+
+
+class NdjsonWriter(object):
+
+    # appends one JSON object per line while the capture is being analysed:
+    # packets and their frames as soon as the packet has been mapped, streams,
+    # connection, settings and statistics once the analysis is finished
+
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, fp, **fields):
+
+        self.fp = fp
+        self.fields = fields
+        self.last_flush = time.monotonic()
+
+    def bind(self, **fields):
+
+        # a writer sharing the same file that tags every record with fields,
+        # e.g. the tcp stream of a demultiplexed connection
+        return NdjsonWriter(self.fp, **self.fields, **fields)
+
+    def write(self, kind, identifier, contents):
+
+        record = dict(self.fields, kind=kind, id=identifier)
+        record.update(contents)
+
+        self.fp.write(json.dumps(record, separators=(",", ":")))
+        self.fp.write("\n")
+
+    def flush(self):
+
+        self.fp.flush()
+        self.last_flush = time.monotonic()
+
+    def insert_packet(self, packet):
+
+        contents = packet.serialize()
+
+        # which streams are active at or closed by this packet is only known
+        # once the streams have been analysed, the stream records carry
+        # first_seen/last_seen and the closing packet instead
+        del contents["streams_active"]
+        del contents["streams_closed"]
+
+        self.write("packet", packet.id, contents)
+
+        for frame in packet.frames:
+            self.write("frame", frame.id, frame.serialize())
+
+        if time.monotonic() - self.last_flush >= self.FLUSH_INTERVAL:
+            self.flush()
+
+    def finish(self, application):
+
+        for stream_id, stream in sorted(application.streams.items()):
+
+            contents = stream.serialize()
+            contents["closed_packet"] = stream.frames[-1].packet.id if stream.frames else None
+
+            self.write("stream", stream_id, contents)
+
+        self.write("connection", None, {
+            "settings": application.settings,
+            "frames": application.statistics.serialize(),
+            "connection": application.connection.serialize(),
+        })
+
+        self.flush()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Progress(object):
+
+    # the clock is only read every CHECK_INTERVAL packets to keep update() cheap
+    CHECK_INTERVAL = 1024
+
+    def __init__(self, interval=10.0, clock=time.monotonic):
+
+        self.frames = 0
+        self.length = 0
+        self.packets = 0
+        self.clock = clock
+        self.interval = interval
+        self.start = clock()
+        self.last_report = self.start
+
+    def update(self, frames, length):
+
+        self.packets += 1
+        self.frames += frames
+        self.length += length
+
+        if self.packets % self.CHECK_INTERVAL != 0:
+            return
+
+        now = self.clock()
+
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(now)
+
+    def report(self, now):
+
+        elapsed = max(now - self.start, 1e-9)
+
+        logger.info(
+            "[>] %d packets (%.0f/s), %d frames (%.0f/s), %d bytes (%.0f/s)",
+            self.packets, self.packets / elapsed,
+            self.frames, self.frames / elapsed,
+            self.length, self.length / elapsed
+        )
+
+    def finish(self):
+
+        self.report(self.clock())
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import os
+import pickle
+import struct
+import logging
+
+logger = logging.getLogger(__name__)
+
+# a snapshot is a fixed header followed by the pickled object graph; bump
+# VERSION whenever the analysis classes change in a way that breaks reloading
+MAGIC = b"H2SNAP"
+VERSION = 2
+
+HEADER = struct.Struct("!6sH")
+
+PROTOCOL = min(5, pickle.HIGHEST_PROTOCOL)
+
+
+def write_snapshot(filename, contents):
+
+    logger.info("[<] Writing output %s...", os.path.basename(filename))
+
+    with open(filename, mode="wb") as fp:
+        fp.write(HEADER.pack(MAGIC, VERSION))
+        pickle.dump(contents, fp, protocol=PROTOCOL)
+
+
+def read_snapshot(filename, classname):
+
+    with open(filename, mode="rb") as fp:
+
+        header = fp.read(HEADER.size)
+
+        if len(header) != HEADER.size or header[0:len(MAGIC)] != MAGIC:
+            raise Exception("[E] %s is not an analysis snapshot!" % filename)
+
+        _, version = HEADER.unpack(header)
+
+        if version != VERSION:
+            raise Exception("[E] Snapshot %s has version %d, expected %d!" % (filename, version, VERSION))
+
+        contents = pickle.load(fp)
+
+    if isinstance(contents, classname):
+        return contents
+    else:
+        raise Exception("[E] Serialized object not an instance of <%s>" % classname.__name__)
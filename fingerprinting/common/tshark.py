@@ -2,6 +2,7 @@
 
 import os
 import sys
+import functools
 import subprocess
 
 
@@ -29,6 +30,24 @@ def get_process_path():
     raise Exception("TShark executable not found.")
 
 
+@functools.lru_cache(maxsize=None)
+def get_version():
+
+    # first line of tshark -v, None when there is no tshark to ask
+    try:
+        output = subprocess.run(
+            [get_process_path(), "-v"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        ).stdout
+    except Exception:
+        return None
+
+    lines = output.decode("utf-8", "replace").splitlines()
+
+    return lines[0].strip() if lines else None
+
+
 class FileCapture(object):
 
     def __init__(self, input_filename, display_filter=None, disable_protocol=None, override_prefs=None):
@@ -83,3 +102,20 @@ class TSharkEnumerateTCPStreams(FileCapture):
 
     def param_output(self):
         return ["-T", "fields", "-e", "ip.src", "-e", "ip.dst", "-e", "tcp.stream"]
+
+
+class TSharkFields(FileCapture):
+
+    def __init__(self, input_filename, fields, aggregator, display_filter=None, disable_protocol=None, override_prefs=None):
+        FileCapture.__init__(self, input_filename, display_filter, disable_protocol, override_prefs)
+        self._fields = fields
+        self._aggregator = aggregator
+
+    def param_output(self):
+
+        parameters = ["-T", "fields", "-E", "occurrence=a", "-E", "aggregator=" + self._aggregator]
+
+        for field in self._fields:
+            parameters += ["-e", field]
+
+        return parameters
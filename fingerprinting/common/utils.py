@@ -2,6 +2,18 @@
 
 import os
 import yaml
+import logging
+import hashlib
+
+logger = logging.getLogger(__name__)
+
+# libyaml emits and parses the same documents as the pure Python
+# implementation, several times faster
+YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
+YAML_LOADER = getattr(yaml, "CLoader", yaml.Loader)
+
+# entries of a streamed mapping are dumped this many at a time
+YAML_CHUNK_SIZE = 1024
 
 
 def delete_output_directory(output_directory):
@@ -30,7 +42,7 @@ def create_output_directory(output_directory):
         os.mkdir(output_directory)
 
 
-def walk_directory(pcap_directory_or_file, handler):
+def find_captures(pcap_directory_or_file):
 
     base_directory = os.getcwd()
 
@@ -43,14 +55,22 @@ def walk_directory(pcap_directory_or_file, handler):
             if not validate_extension(os.path.join(current, filename), "pcap"):
                 continue
 
-            handler(os.path.join(current, filename))
+            yield os.path.join(current, filename)
+
+
+def walk_directory(pcap_directory_or_file, handler):
+
+    for filename in find_captures(pcap_directory_or_file):
+        handler(filename)
 
 
 def read_pickle(filename, classname):
 
+    # reads the all.yml object dumps written by earlier versions, new runs
+    # write binary snapshots instead (see fingerprinting.common.snapshot)
     with open(filename, mode="rb") as fp:
 
-        contents = yaml.load(fp)
+        contents = yaml.load(fp, Loader=YAML_LOADER)
 
         if isinstance(contents, classname):
             return contents
@@ -58,20 +78,59 @@ def read_pickle(filename, classname):
             raise Exception("[E] Serialized object not an instance of <Application>")
 
 
-def write_pickle(filename, contents):
+def write_yaml(filename, contents):
 
-    print("\n[<] Writing output %s..." % os.path.basename(filename))
+    logger.info("[<] Writing output %s...", os.path.basename(filename))
 
     with open(filename, "w") as fp:
-        yaml.dump(contents, fp, default_flow_style=None)
+        yaml.dump(contents, fp, default_flow_style=None, Dumper=YAML_DUMPER)
 
 
-def write_yaml(filename, contents):
+def write_yaml_mapping(filename, items):
 
-    print("\n[<] Writing output %s..." % os.path.basename(filename))
+    # writes the same document as write_yaml(filename, dict(items)) without
+    # building the whole mapping: the top-level entries of a block mapping are
+    # independent, so they can be dumped in chunks as long as the (key, value)
+    # pairs arrive sorted by key
+
+    logger.info("[<] Writing output %s...", os.path.basename(filename))
 
     with open(filename, "w") as fp:
-        yaml.dump(contents, fp, default_flow_style=None)
+
+        chunk = {}
+        written = False
+
+        for key, value in items:
+
+            chunk[key] = value
+
+            if len(chunk) >= YAML_CHUNK_SIZE:
+                yaml.dump(chunk, fp, default_flow_style=None, Dumper=YAML_DUMPER)
+                chunk = {}
+                written = True
+
+        if len(chunk) > 0 or not written:
+            yaml.dump(chunk, fp, default_flow_style=None, Dumper=YAML_DUMPER)
+
+
+def get_cache_directory(name):
+
+    default_directory = os.path.join(os.path.expanduser("~"), ".cache", "http2-sidechannel")
+    cache_directory = os.path.join(os.getenv("HTTP2_SIDECHANNEL_CACHE", default_directory), name)
+    os.makedirs(cache_directory, exist_ok=True)
+
+    return cache_directory
+
+
+def hash_file(filename, block_size=1 << 20):
+
+    digest = hashlib.sha256()
+
+    with open(filename, mode="rb") as fp:
+        for block in iter(lambda: fp.read(block_size), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
 
 
 def replace_extension(filename, extension):
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from fingerprinting.common import utils
+from fingerprinting.common.progress import Progress
+from fingerprinting.application import Application
+
+from fingerprinting.analysis.fields import FieldsRow
+from fingerprinting.analysis.parser import XmlWrapper, iterate_packets
+from fingerprinting.analysis.identifiers import Identifiers
+
+
+class ConnectionDemultiplexer(object):
+
+    def __init__(self, output=None):
+
+        self.output = output
+        self.applications = {}
+        self.progress = Progress()
+        self.identifiers = Identifiers()
+
+    def get_application(self, tcp_stream):
+
+        if tcp_stream not in self.applications:
+
+            output = None
+
+            if self.output is not None:
+                output = self.output.bind(tcp_stream=tcp_stream)
+
+            self.applications[tcp_stream] = Application(self.progress, self.identifiers, output)
+
+        return self.applications[tcp_stream]
+
+    def parse_xml_incremental(self, capture):
+
+        for packet in iterate_packets(capture):
+            tcp_stream = XmlWrapper(packet).proto("tcp").integer("tcp.stream")
+            self.get_application(tcp_stream).process_layers(packet)
+
+        self.analyze()
+
+    def parse_fields(self, capture):
+
+        for line in capture:
+            row = FieldsRow(line)
+            self.get_application(int(row.first("tcp.stream"))).process_fields(row)
+
+        self.analyze()
+
+    def analyze(self):
+
+        [application.analyze() for application in self.applications.values()]
+        self.progress.finish()
+
+    def serialize(self, directory):
+
+        for tcp_stream, application in sorted(self.applications.items()):
+
+            if len(application.packets) == 0:
+                continue
+
+            output_directory = os.path.join(directory, "tcpstream_%d" % tcp_stream)
+            utils.create_output_directory(output_directory)
+            application.serialize(output_directory)
@@ -3,6 +3,9 @@
 
 import os
 import sys
+import logging
+import argparse
+import functools
 import subprocess
 
 from xml.etree import ElementTree
@@ -11,13 +14,60 @@ from fingerprinting.common import utils
 from fingerprinting.application import Application
 from fingerprinting.common.tshark import FileCapture
 
+from processpcaps.analyze import process_corpus
 from processpcaps.analyze import process_single_capture
+from processpcaps.dataset import build_dataset
+
+
+def get_parser():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="pcap file or directory of pcap files")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="captures analysed in parallel")
+    parser.add_argument("-v", "--verbose", action="count", default=0, help="log every dissected element")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log errors")
+    parser.add_argument("--no-cache", action="store_true", help="always re-run tshark instead of reusing cached results")
+    parser.add_argument("--ndjson", action="store_true", help="stream the results to analysis.ndjson while the capture is read")
+    parser.add_argument("--sqlite", metavar="DATABASE", help="also append the results to a SQLite database")
+    parser.add_argument("--dataset", metavar="FILE", help="add the features of new captures to a .npz training set")
+
+    return parser
+
+
+def get_log_level(arguments):
+
+    if arguments.quiet:
+        return logging.ERROR
+    elif arguments.verbose > 0:
+        return logging.DEBUG
+    else:
+        return logging.INFO
+
 
 if __name__ == "__main__":
 
-    if len(sys.argv) == 2 and os.path.isdir(sys.argv[1]):
-        utils.walk_directory(sys.argv[1], process_single_capture)
-    elif len(sys.argv) == 2 and utils.validate_extension(sys.argv[1], "pcap"):
-        process_single_capture(os.path.abspath(sys.argv[1]))
+    parser = get_parser()
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=get_log_level(arguments), format="%(message)s")
+
+    handler = functools.partial(
+        process_single_capture,
+        use_cache=not arguments.no_cache,
+        ndjson=arguments.ndjson,
+        database=os.path.abspath(arguments.sqlite) if arguments.sqlite else None
+    )
+
+    if arguments.dataset:
+        build_dataset(
+            arguments.path, os.path.abspath(arguments.dataset), arguments.jobs,
+            use_cache=not arguments.no_cache
+        )
+    elif os.path.isdir(arguments.path):
+        # a corpus run with failed captures must not look successful
+        if process_corpus(arguments.path, arguments.jobs, handler):
+            sys.exit(1)
+    elif utils.validate_extension(arguments.path, "pcap"):
+        handler(os.path.abspath(arguments.path))
     else:
-        print("usage: %s [<pcap_directory_or_file>]" % sys.argv[0])
+        parser.print_usage()
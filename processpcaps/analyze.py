@@ -1,16 +1,29 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import io
 import os
 import sys
+import logging
 import subprocess
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from xml.etree import ElementTree
 
 from fingerprinting.common import utils
+from fingerprinting.common.cache import ResultCache
+from fingerprinting.common.ndjson import NdjsonWriter
+from fingerprinting.common.database import Database
 from fingerprinting.application import Application
+from fingerprinting.demultiplexer import ConnectionDemultiplexer
 from fingerprinting.common.tshark import FileCapture
+from fingerprinting.common.tshark import TSharkFields
 from fingerprinting.common.tshark import TSharkEnumerateTCPStreams
+from fingerprinting.analysis import fields
+from fingerprinting.analysis.inference import FrameInference
+
+logger = logging.getLogger(__name__)
 
 # configure tshark helper functions
 
@@ -23,6 +36,10 @@ def display_filter_tcpstream(tcpstream_id):
     return "ssl && \
         tcp.stream == {id}".format(id=tcpstream_id)
 
+def display_filter_tcpstreams(tcpstream_ids):
+    return "ssl && \
+        tcp.stream in {{{ids}}}".format(ids=" ".join(str(i) for i in tcpstream_ids))
+
 def override_prefs_baseline():
     return {
         "tcp.desegment_tcp_streams": "TRUE",
@@ -30,17 +47,40 @@ def override_prefs_baseline():
         "ssl.desegment_ssl_application_data": "TRUE",
     }
 
-def stitch_last_record_with_editpcap(filename):
-    editcap_filename = filename + ".tmp"
-    subprocess.Popen(
-        ["editcap", "-d", "-F", "pcap", filename, editcap_filename],
+def stitch_last_record_with_editpcap(filename, capture_hash=None):
+    # editcap output only depends on the capture contents, so the deduplicated
+    # copy is cached under the capture's hash and shared by every analysis;
+    # ResultCache.evict keeps it under the same size limit as the results
+    if capture_hash is None:
+        capture_hash = utils.hash_file(filename)
+
+    editcap_directory = utils.get_cache_directory("editcap")
+    editcap_filename = os.path.join(editcap_directory, capture_hash + ".pcap")
+
+    if os.path.isfile(editcap_filename):
+        # the modification time doubles as the last access time for eviction
+        os.utime(editcap_filename)
+        return editcap_filename
+
+    temporary_filename = "%s.%d.tmp" % (editcap_filename, os.getpid())
+    returncode = subprocess.Popen(
+        ["editcap", "-d", "-F", "pcap", filename, temporary_filename],
         stderr=subprocess.DEVNULL,
         stdout=subprocess.DEVNULL
     ).wait()
 
+    if returncode != 0:
+        if os.path.exists(temporary_filename):
+            os.remove(temporary_filename)
+        raise Exception("[E] editcap failed on %s" % filename)
+
+    os.replace(temporary_filename, editcap_filename)
     return editcap_filename
 
-def analyze_single_capture(display_filter, override_prefs, editcap_filename):
+def analyze_single_capture(display_filter, override_prefs, editcap_filename, incremental=True, columnar=False, output=None):
+
+    if columnar:
+        return analyze_single_capture_fields(display_filter, override_prefs, editcap_filename, output)
 
     capture = FileCapture(
         display_filter=display_filter,
@@ -48,15 +88,96 @@ def analyze_single_capture(display_filter, override_prefs, editcap_filename):
         input_filename=editcap_filename
     ).get_tshark_process().stdout
 
-    state = Application()
-    state.parse_xml(ElementTree.parse(capture))
-    os.remove(editcap_filename)
+    state = Application(output=output)
+
+    if incremental:
+        state.parse_xml_incremental(capture)
+    else:
+        state.parse_xml(ElementTree.parse(capture))
+
+    return state
+
+def analyze_single_capture_fields(display_filter, override_prefs, editcap_filename, output=None):
+
+    capture = TSharkFields(
+        fields=fields.FIELDS,
+        aggregator=fields.AGGREGATOR,
+        display_filter=display_filter,
+        override_prefs=override_prefs,
+        input_filename=editcap_filename
+    ).get_tshark_process().stdout
+
+    state = Application(output=output)
+    state.parse_fields(io.TextIOWrapper(capture, encoding="utf-8"))
+    return state
+
+def analyze_capture(filename, display_filter, override_prefs, analyzer, use_cache=True, capture_hash=None, **options):
+
+    # the hash keys the result cache, the editcap copy and the database export,
+    # so callers that need it too hash the capture once and pass it in
+    if capture_hash is None:
+        capture_hash = utils.hash_file(filename)
+
+    cache = ResultCache()
+
+    if use_cache:
+
+        key = cache.key(
+            capture_hash,
+            override_prefs.get("ssl.keylog_file"),
+            display_filter,
+            override_prefs,
+            analyzer=analyzer.__name__,
+            **options
+        )
+
+        state = cache.load(key)
+
+        if state is not None:
+            return state
+
+    editcap_filename = stitch_last_record_with_editpcap(filename, capture_hash)
+    state = analyzer(display_filter, override_prefs, editcap_filename, **options)
+
+    # storing evicts too, without it the editcap copy still has to fit
+    if use_cache:
+        cache.store(key, state)
+    else:
+        cache.evict()
+
     return state
 
 def save_analysis(state, output_directory):
     state.serialize(output_directory)
 
-def process_single_capture(filename, testname = ""):
+def save_inference(state, output_directory):
+    # without the keys there are no frames, so estimate them from the records
+    utils.write_yaml(
+        os.path.join(output_directory, "inference.yml"),
+        FrameInference.from_application(state).serialize()
+    )
+
+def get_variant(testname, *qualifiers):
+    # analyses of one capture that are exported side by side
+    return ":".join(value for value in (testname,) + qualifiers if value)
+
+def export_analysis(state, filename, database, capture_hash=None, variant=""):
+    if capture_hash is None:
+        capture_hash = utils.hash_file(filename)
+
+    with Database(database) as db:
+        db.export(filename, state, capture_hash, variant)
+
+def analyze_capture_ndjson(filename, display_filter, override_prefs, analyzer, output_directory, capture_hash=None, **options):
+    # records are written while tshark is still running, so there is nothing
+    # to reuse from or store into the result cache
+    with open(os.path.join(output_directory, "analysis.ndjson"), "w") as fp:
+        return analyze_capture(
+            filename, display_filter, override_prefs, analyzer,
+            use_cache=False, capture_hash=capture_hash, output=NdjsonWriter(fp), **options
+        )
+
+def process_single_capture(filename, testname = "", columnar = False, use_cache = True, ndjson = False, database = None, capture_hash = None):
     # tshark configs
     # 1
     display_filter = display_filter_iprange("172.18.0.0", "172.18.0.255")
@@ -64,16 +185,31 @@ def process_single_capture(filename, testname = ""):
     override_prefs = override_prefs_baseline()
     override_prefs["ssl.keylog_file"] = utils.replace_extension(filename, "log")
     # 3
-    editcap_filename = stitch_last_record_with_editpcap(filename)
-
-    state = analyze_single_capture(display_filter, override_prefs, editcap_filename)
-
     output_directory = utils.get_output_directory(filename) + "_" + testname
     utils.create_output_directory(output_directory)
-    save_analysis(state, output_directory)
 
+    if capture_hash is None:
+        capture_hash = utils.hash_file(filename)
+
+    if ndjson:
+        state = analyze_capture_ndjson(
+            filename, display_filter, override_prefs, analyze_single_capture,
+            output_directory, capture_hash=capture_hash, columnar=columnar
+        )
+    else:
+        state = analyze_capture(
+            filename, display_filter, override_prefs, analyze_single_capture,
+            use_cache=use_cache, capture_hash=capture_hash, columnar=columnar
+        )
+        save_analysis(state, output_directory)
 
-def process_single_capture_notlskeys(filename, testname = ""):
+    if database:
+        export_analysis(state, filename, database, capture_hash, get_variant(testname))
+
+    return state
+
+
+def process_single_capture_notlskeys(filename, testname = "", columnar = False, use_cache = True, ndjson = False, database = None, capture_hash = None):
 
     # tshark configs
     # 1
@@ -81,13 +217,30 @@ def process_single_capture_notlskeys(filename, testname = ""):
     # 2
     override_prefs = override_prefs_baseline()
     # 3
-    editcap_filename = stitch_last_record_with_editpcap(filename)
-
-    state = analyze_single_capture(display_filter, override_prefs, editcap_filename)
-
     output_directory = utils.get_output_directory(filename) + "_" + testname
     utils.create_output_directory(output_directory)
-    save_analysis(state, output_directory)
+
+    if capture_hash is None:
+        capture_hash = utils.hash_file(filename)
+
+    if ndjson:
+        state = analyze_capture_ndjson(
+            filename, display_filter, override_prefs, analyze_single_capture,
+            output_directory, capture_hash=capture_hash, columnar=columnar
+        )
+    else:
+        state = analyze_capture(
+            filename, display_filter, override_prefs, analyze_single_capture,
+            use_cache=use_cache, capture_hash=capture_hash, columnar=columnar
+        )
+        save_analysis(state, output_directory)
+
+    save_inference(state, output_directory)
+
+    if database:
+        export_analysis(state, filename, database, capture_hash, get_variant(testname, "notlskeys"))
+
+    return state
 
 def enumerate_tcpstreams_in_capture(filename, testname = ""):
 
@@ -110,11 +263,11 @@ def enumerate_tcpstreams_in_capture(filename, testname = ""):
         stream = {'id':vs[2], 'client': vs[0], 'server': vs[1]}
         streams.append(stream)
 
-    print (streams)
+    logger.info("[>] HTTP/2 tcp streams: %s", streams)
     
     return streams
 
-def process_single_capture_tcpstream(filename, tcpstream_id, testname = ""):
+def process_single_capture_tcpstream(filename, tcpstream_id, testname = "", columnar = False, use_cache = True, ndjson = False, database = None, capture_hash = None):
     # tshark configs
     # 1
     display_filter = display_filter_tcpstream(tcpstream_id)
@@ -122,10 +275,117 @@ def process_single_capture_tcpstream(filename, tcpstream_id, testname = ""):
     override_prefs = override_prefs_baseline()
     override_prefs["ssl.keylog_file"] = utils.replace_extension(filename, "log")
     # 3
-    editcap_filename = stitch_last_record_with_editpcap(filename)
+    output_directory = utils.get_output_directory(filename) + "_" + testname
+    utils.create_output_directory(output_directory)
 
-    state = analyze_single_capture(display_filter, override_prefs, editcap_filename)
+    if capture_hash is None:
+        capture_hash = utils.hash_file(filename)
 
+    if ndjson:
+        state = analyze_capture_ndjson(
+            filename, display_filter, override_prefs, analyze_single_capture,
+            output_directory, capture_hash=capture_hash, columnar=columnar
+        )
+    else:
+        state = analyze_capture(
+            filename, display_filter, override_prefs, analyze_single_capture,
+            use_cache=use_cache, capture_hash=capture_hash, columnar=columnar
+        )
+        save_analysis(state, output_directory)
+
+    if database:
+        export_analysis(state, filename, database, capture_hash, get_variant(testname, "tcp.stream==%s" % tcpstream_id))
+
+    return state
+
+def analyze_capture_tcpstreams(display_filter, override_prefs, editcap_filename, columnar=False, output=None):
+
+    if columnar:
+        capture = TSharkFields(
+            fields=fields.FIELDS,
+            aggregator=fields.AGGREGATOR,
+            display_filter=display_filter,
+            override_prefs=override_prefs,
+            input_filename=editcap_filename
+        ).get_tshark_process().stdout
+    else:
+        capture = FileCapture(
+            display_filter=display_filter,
+            override_prefs=override_prefs,
+            input_filename=editcap_filename
+        ).get_tshark_process().stdout
+
+    state = ConnectionDemultiplexer(output)
+
+    if columnar:
+        state.parse_fields(io.TextIOWrapper(capture, encoding="utf-8"))
+    else:
+        state.parse_xml_incremental(capture)
+
+    return state
+
+def process_single_capture_tcpstreams(filename, tcpstream_ids=None, testname = "", columnar = False, use_cache = True, ndjson = False, database = None, capture_hash = None):
+    # tshark configs
+    # 1
+    if tcpstream_ids:
+        display_filter = display_filter_tcpstreams(tcpstream_ids)
+    else:
+        display_filter = "ssl"
+    # 2
+    override_prefs = override_prefs_baseline()
+    override_prefs["ssl.keylog_file"] = utils.replace_extension(filename, "log")
+    # 3
     output_directory = utils.get_output_directory(filename) + "_" + testname
     utils.create_output_directory(output_directory)
-    save_analysis(state, output_directory)
+
+    if capture_hash is None:
+        capture_hash = utils.hash_file(filename)
+
+    if ndjson:
+        state = analyze_capture_ndjson(
+            filename, display_filter, override_prefs, analyze_capture_tcpstreams,
+            output_directory, capture_hash=capture_hash, columnar=columnar
+        )
+    else:
+        state = analyze_capture(
+            filename, display_filter, override_prefs, analyze_capture_tcpstreams,
+            use_cache=use_cache, capture_hash=capture_hash, columnar=columnar
+        )
+        save_analysis(state, output_directory)
+
+    if database:
+        export_analysis(state, filename, database, capture_hash, get_variant(testname, "tcpstreams"))
+
+    return state
+
+def process_corpus(directory, jobs=1, handler=process_single_capture):
+
+    failures = {}
+    filenames = sorted(utils.find_captures(directory))
+
+    if jobs <= 1:
+
+        for filename in filenames:
+            try:
+                handler(filename)
+            except Exception as exception:
+                failures[filename] = exception
+
+    else:
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+
+            futures = {executor.submit(handler, filename): filename for filename in filenames}
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as exception:
+                    failures[futures[future]] = exception
+
+    logger.info("[>] Processed %d captures, %d failed", len(filenames), len(failures))
+
+    for filename, exception in sorted(failures.items()):
+        logger.error("[E] %s: %s", filename, exception)
+
+    return failures
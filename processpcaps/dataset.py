@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import logging
+import functools
+
+import numpy
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from fingerprinting.common import utils
+from fingerprinting.analysis import features
+from fingerprinting.application import Application, SNAPSHOT_FILENAME
+
+from processpcaps.analyze import process_single_capture
+
+logger = logging.getLogger(__name__)
+
+# bump whenever the layout of the dataset file changes
+VERSION = 1
+
+# the dataset is written out every so many new captures, so an interrupted
+# build picks up where it stopped
+CHECKPOINT_INTERVAL = 100
+
+
+def get_label(filename):
+
+    # captures of one page are kept in a directory named after it
+    return os.path.basename(os.path.dirname(filename))
+
+
+class Dataset(object):
+
+    def __init__(self):
+
+        self.index = {}
+        self.captures = []
+        self.hashes = []
+        self.labels = []
+        self.connections = numpy.zeros((0, len(features.CONNECTION_COLUMNS)))
+        self.objects = numpy.zeros((0, len(features.OBJECT_COLUMNS)))
+        self.connection_captures = numpy.zeros(0, dtype=numpy.int64)
+        self.object_captures = numpy.zeros(0, dtype=numpy.int64)
+        self.pending = []
+
+    def __len__(self):
+        return len(self.captures)
+
+    @staticmethod
+    def load(filename):
+
+        dataset = Dataset()
+
+        if not os.path.exists(filename):
+            return dataset
+
+        with numpy.load(filename, allow_pickle=False) as contents:
+
+            # a dataset with another schema is rebuilt from scratch
+            if int(contents["version"]) != VERSION or \
+                    tuple(contents["connection_columns"]) != features.CONNECTION_COLUMNS or \
+                    tuple(contents["object_columns"]) != features.OBJECT_COLUMNS:
+                logger.info("[>] %s has an outdated schema, rebuilding it", filename)
+                return dataset
+
+            dataset.captures = contents["captures"].tolist()
+            dataset.hashes = contents["hashes"].tolist()
+            dataset.labels = contents["labels"].tolist()
+            dataset.connections = contents["connections"]
+            dataset.objects = contents["objects"]
+            dataset.connection_captures = contents["connection_captures"]
+            dataset.object_captures = contents["object_captures"]
+
+        dataset.index = {capture: i for i, capture in enumerate(dataset.captures)}
+
+        return dataset
+
+    def get_hash(self, capture):
+
+        return self.hashes[self.index[capture]] if capture in self.index else None
+
+    def relabel(self, capture, label):
+
+        # labels are not part of the features, so no rows are extracted again
+        if capture in self.index:
+            self.labels[self.index[capture]] = label
+
+    def insert(self, capture, capture_hash, label, connections, objects):
+
+        self.remove(capture)
+        self.pending.append((capture, capture_hash, label, connections, objects))
+
+    def remove(self, capture):
+
+        if capture not in self.index:
+            return
+
+        index = self.index[capture]
+
+        del self.captures[index]
+        del self.hashes[index]
+        del self.labels[index]
+
+        keep = self.connection_captures != index
+        self.connections = self.connections[keep]
+        self.connection_captures = self.connection_captures[keep]
+        self.connection_captures[self.connection_captures > index] -= 1
+
+        keep = self.object_captures != index
+        self.objects = self.objects[keep]
+        self.object_captures = self.object_captures[keep]
+        self.object_captures[self.object_captures > index] -= 1
+
+        self.index = {capture: i for i, capture in enumerate(self.captures)}
+
+    def merge(self):
+
+        if len(self.pending) == 0:
+            return
+
+        connections = [self.connections]
+        objects = [self.objects]
+        connection_captures = [self.connection_captures]
+        object_captures = [self.object_captures]
+
+        for capture, capture_hash, label, capture_connections, capture_objects in self.pending:
+
+            index = len(self.captures)
+            self.index[capture] = index
+            self.captures.append(capture)
+            self.hashes.append(capture_hash)
+            self.labels.append(label)
+
+            connections.append(capture_connections)
+            objects.append(capture_objects)
+            connection_captures.append(numpy.full(len(capture_connections), index, dtype=numpy.int64))
+            object_captures.append(numpy.full(len(capture_objects), index, dtype=numpy.int64))
+
+        self.pending = []
+        self.connections = numpy.concatenate(connections)
+        self.objects = numpy.concatenate(objects)
+        self.connection_captures = numpy.concatenate(connection_captures)
+        self.object_captures = numpy.concatenate(object_captures)
+
+    def save(self, filename):
+
+        self.merge()
+
+        labels = numpy.array(self.labels, dtype=str)
+        temporary = filename + ".tmp"
+
+        # written next to the old file and swapped in, so a crash never
+        # leaves a truncated dataset behind
+        with open(temporary, mode="wb") as fp:
+            numpy.savez_compressed(
+                fp,
+                version=VERSION,
+                captures=numpy.array(self.captures, dtype=str),
+                hashes=numpy.array(self.hashes, dtype=str),
+                labels=labels,
+                connection_columns=numpy.array(features.CONNECTION_COLUMNS, dtype=str),
+                object_columns=numpy.array(features.OBJECT_COLUMNS, dtype=str),
+                connections=self.connections,
+                objects=self.objects,
+                connection_captures=self.connection_captures,
+                object_captures=self.object_captures,
+                connection_labels=labels[self.connection_captures] if len(labels) else labels,
+                object_labels=labels[self.object_captures] if len(labels) else labels
+            )
+
+        os.replace(temporary, filename)
+
+        logger.info("[<] Saved %d captures to %s", len(self.captures), filename)
+
+
+def load_analysis(filename, testname="", use_cache=True, capture_hash=None):
+
+    # reuse the snapshot of an earlier run unless the capture is newer
+    snapshot_filename = os.path.join(utils.get_output_directory(filename) + "_" + testname, SNAPSHOT_FILENAME)
+
+    if os.path.exists(snapshot_filename) and os.path.getmtime(snapshot_filename) >= os.path.getmtime(filename):
+        try:
+            return Application.load(os.path.dirname(snapshot_filename))
+        except Exception as exception:
+            logger.info("[>] Analysing %s again: %s", filename, exception)
+
+    return process_single_capture(filename, testname, use_cache=use_cache, capture_hash=capture_hash)
+
+
+def extract_capture(filename, known_hash=None, testname="", use_cache=True):
+
+    capture_hash = utils.hash_file(filename)
+
+    if capture_hash == known_hash:
+        return capture_hash, None
+
+    return capture_hash, features.extract_features(load_analysis(filename, testname, use_cache, capture_hash))
+
+
+def build_dataset(path, dataset_filename, jobs=1, label=get_label, testname="", use_cache=True):
+
+    dataset = Dataset.load(dataset_filename)
+
+    if os.path.isdir(path):
+        filenames = sorted(utils.find_captures(path))
+    else:
+        filenames = [os.path.abspath(path)]
+
+    # captures deleted from the corpus since the last build
+    for capture in [capture for capture in dataset.captures if not os.path.exists(capture)]:
+        logger.info("[>] Removing %s from the dataset, it no longer exists", capture)
+        dataset.remove(capture)
+
+    handler = functools.partial(extract_capture, testname=testname, use_cache=use_cache)
+    failures = {}
+    inserted = 0
+
+    def insert(filename, result):
+
+        nonlocal inserted
+
+        capture_hash, contents = result
+
+        if contents is None:
+            dataset.relabel(filename, label(filename))
+            return
+
+        dataset.insert(filename, capture_hash, label(filename), *contents)
+        inserted += 1
+
+        if inserted % CHECKPOINT_INTERVAL == 0:
+            dataset.save(dataset_filename)
+
+    if jobs <= 1:
+
+        for filename in filenames:
+            try:
+                insert(filename, handler(filename, dataset.get_hash(filename)))
+            except Exception as exception:
+                failures[filename] = exception
+
+    else:
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+
+            futures = {
+                executor.submit(handler, filename, dataset.get_hash(filename)): filename
+                for filename in filenames
+            }
+
+            for future in as_completed(futures):
+                try:
+                    insert(futures[future], future.result())
+                except Exception as exception:
+                    failures[futures[future]] = exception
+
+    dataset.save(dataset_filename)
+
+    logger.info("[>] Added %d of %d captures to the dataset, %d failed", inserted, len(filenames), len(failures))
+
+    for filename, exception in sorted(failures.items()):
+        logger.error("[E] %s: %s", filename, exception)
+
+    return dataset
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+
+import numpy
+
+from fingerprinting.application import Application
+from fingerprinting.analysis.columns import DIRECTIONS, FrameStore
+from fingerprinting.analysis.inference import FrameInference
+
+from test.benchmark_memory import open_capture
+
+# usage: python3 -m test.benchmark_inference <capture.pcap | capture.pdml> [tolerance]
+#
+# analyses a capture with its TLS keys, infers the frames and objects again
+# from the record lengths alone and reports how close the inference gets
+
+
+def get_boundaries(lengths):
+
+    return set(numpy.cumsum(lengths).tolist())
+
+
+def compare_frames(state, inference):
+
+    frames = FrameStore.from_application(state).sort("id")
+
+    for direction in DIRECTIONS:
+
+        expected = frames.select(direction=direction)
+        inferred = inference.frames.select(direction=direction)
+
+        expected_boundaries = get_boundaries(expected["length"])
+        inferred_boundaries = get_boundaries(inferred["length"])
+        matched = len(expected_boundaries & inferred_boundaries)
+
+        print("%s frames: %d keyed, %d inferred, boundary precision %.3f, recall %.3f, bytes %d/%d" % (
+            direction, len(expected), len(inferred),
+            matched / max(len(inferred_boundaries), 1),
+            matched / max(len(expected_boundaries), 1),
+            int(inferred["length"].sum()), int(expected["length"].sum())
+        ))
+
+
+def compare_objects(state, inference, tolerance):
+
+    expected = numpy.array(sorted(
+        web_object.length
+        for stream in state.streams.values()
+        for web_object in stream.objects
+        if web_object.length > 0
+    ), dtype=numpy.int64)
+
+    inferred = numpy.sort(inference.objects["length"])
+
+    # an object is recovered when an inferred object is within tolerance bytes
+    start = numpy.searchsorted(inferred, expected - tolerance, side="left")
+    finish = numpy.searchsorted(inferred, expected + tolerance, side="right")
+    recovered = int((finish > start).sum())
+
+    requests = sum(
+        1 for frame in state.frames.values()
+        if frame.direction == "C2S" and frame.type.name == "HEADERS"
+    )
+
+    print("requests: %d keyed, %d inferred" % (requests, inference.requests))
+    print("objects: %d keyed, %d inferred, %d recovered within %d bytes" % (
+        len(expected), len(inferred), recovered, tolerance
+    ))
+    print("object bytes: %d keyed, %d inferred" % (int(expected.sum()), int(inferred.sum())))
+
+
+def benchmark_inference(filename, tolerance):
+
+    started = time.perf_counter()
+    state = Application()
+    state.parse_xml_incremental(open_capture(filename))
+    keyed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    inference = FrameInference.from_application(state)
+    inferred = time.perf_counter() - started
+
+    print("records: %d, keyed analysis: %.3f s, inference: %.3f ms" % (
+        len(state.records), keyed, inferred * 1000
+    ))
+
+    compare_frames(state, inference)
+    compare_objects(state, inference, tolerance)
+
+
+if __name__ == "__main__":
+    benchmark_inference(
+        os.path.abspath(sys.argv[1]),
+        int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    )
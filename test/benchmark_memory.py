@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gc
+import os
+import sys
+import tracemalloc
+
+from fingerprinting.common import utils
+from fingerprinting.application import Application
+from fingerprinting.common.tshark import FileCapture
+
+from processpcaps.analyze import override_prefs_baseline
+from processpcaps.analyze import stitch_last_record_with_editpcap
+
+# usage: python3 -m test.benchmark_memory <capture.pcap | capture.pdml>
+
+
+def open_capture(filename):
+
+    if utils.validate_extension(filename, "pdml"):
+        return open(filename, mode="rb")
+
+    override_prefs = override_prefs_baseline()
+    override_prefs["ssl.keylog_file"] = utils.replace_extension(filename, "log")
+
+    return FileCapture(
+        display_filter="ssl",
+        override_prefs=override_prefs,
+        input_filename=stitch_last_record_with_editpcap(filename)
+    ).get_tshark_process().stdout
+
+
+def benchmark_memory(filename):
+
+    capture = open_capture(filename)
+
+    gc.collect()
+    tracemalloc.start()
+
+    state = Application()
+    state.parse_xml_incremental(capture)
+
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("packets: %d, frames: %d" % (len(state.packets), len(state.frames)))
+    print("retained: %d bytes, peak: %d bytes" % (retained, peak))
+
+    if len(state.packets) > 0:
+        print("bytes/packet: %.0f" % (retained / len(state.packets)))
+
+    if len(state.frames) > 0:
+        print("bytes/frame: %.0f" % (retained / len(state.frames)))
+
+
+if __name__ == "__main__":
+    benchmark_memory(os.path.abspath(sys.argv[1]))
@@ -3,6 +3,7 @@
 
 import os
 import sys
+import yaml
 import subprocess
 
 from xml.etree import ElementTree
@@ -11,13 +12,48 @@ from fingerprinting.common import utils
 from fingerprinting.application import Application
 from fingerprinting.common.tshark import FileCapture
 
+from processpcaps.analyze import analyze_capture
+from processpcaps.analyze import analyze_single_capture
+from processpcaps.analyze import display_filter_iprange
+from processpcaps.analyze import override_prefs_baseline
 from processpcaps.analyze import process_single_capture
 from processpcaps.analyze import process_single_capture_notlskeys
 from processpcaps.analyze import enumerate_tcpstreams_in_capture
+from processpcaps.analyze import process_single_capture_tcpstreams
 
 def firefox1 ():
     filename = os.path.abspath("./test/firefox-1.pcap")
     print (filename)
     process_single_capture(filename, "withtlskeys")
     process_single_capture_notlskeys(os.path.abspath("./test/firefox-1.pcap"), "withouttlskeys")
-    enumerate_tcpstreams_in_capture(filename)
+    streams = enumerate_tcpstreams_in_capture(filename)
+    process_single_capture_tcpstreams(filename, [stream["id"] for stream in streams], "tcpstreams")
+
+def firefox1_mapping ():
+    # pins the TLS record every HTTP2 frame is mapped to by process_mapssl2http2
+    # against the reference output in test_output/frames.yml
+    filename = os.path.abspath("./test/firefox-1.pcap")
+    override_prefs = override_prefs_baseline()
+    override_prefs["ssl.keylog_file"] = utils.replace_extension(filename, "log")
+
+    state = analyze_capture(
+        filename, display_filter_iprange("172.18.0.0", "172.18.0.255"),
+        override_prefs, analyze_single_capture, use_cache=False
+    )
+
+    with open(os.path.abspath("./test_output/frames.yml")) as fp:
+        expected = yaml.safe_load(fp)
+
+    if len(expected) != len(state.frames):
+        raise Exception("[E] Expected %d frames, found %d" % (len(expected), len(state.frames)))
+
+    for frame_id, frame in state.frames.items():
+
+        record = frame.last_ssl_record.id if frame.last_ssl_record else None
+
+        if (frame.packet.id, record) != (expected[frame_id]["packet"], expected[frame_id]["record"]):
+            raise Exception("[E] Frame %d mapped to packet %d record %s, expected packet %d record %s" % (
+                frame_id, frame.packet.id, record, expected[frame_id]["packet"], expected[frame_id]["record"]
+            ))
+
+    print ("mapping of %d frames matches" % len(state.frames))
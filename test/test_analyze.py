@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from fingerprinting.application import Application
+from fingerprinting.common.cache import ResultCache
+from fingerprinting.common.database import Database
+
+from processpcaps.analyze import analyze_capture, export_analysis, get_variant, process_corpus
+
+
+def failing_analyzer(display_filter, override_prefs, editcap_filename, **options):
+    raise AssertionError("the cached analysis should have been used")
+
+
+def failing_handler(filename):
+
+    # handlers run in worker processes, so this one is a module function
+    if os.path.basename(filename) == "broken.pcap":
+        raise ValueError("broken capture")
+
+    return filename
+
+
+class AnalyzeTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.environment = mock.patch.dict(os.environ, {"HTTP2_SIDECHANNEL_CACHE": self.directory.name})
+        self.environment.start()
+
+        # none of the tests below may read the capture, it does not exist
+        self.filename = os.path.join(self.directory.name, "missing.pcap")
+
+    def tearDown(self):
+
+        self.environment.stop()
+        self.directory.cleanup()
+
+    def test_get_variant(self):
+
+        self.assertEqual(get_variant(""), "")
+        self.assertEqual(get_variant("withtlskeys"), "withtlskeys")
+        self.assertEqual(get_variant("", "notlskeys"), "notlskeys")
+        self.assertEqual(get_variant("test", "tcp.stream==3"), "test:tcp.stream==3")
+
+    def test_export_analysis_uses_known_hash(self):
+
+        database = os.path.join(self.directory.name, "corpus.db")
+
+        export_analysis(Application(), self.filename, database, "0123", "withtlskeys")
+        export_analysis(Application(), self.filename, database, "4567", "withouttlskeys")
+
+        with Database(database) as db:
+            rows = db.connection.execute("SELECT name, variant, hash FROM captures ORDER BY id").fetchall()
+
+        self.assertEqual(rows, [
+            (self.filename, "withtlskeys", "0123"),
+            (self.filename, "withouttlskeys", "4567"),
+        ])
+
+    def test_analyze_capture_uses_known_hash(self):
+
+        state = {"frames": []}
+        override_prefs = {"ssl.desegment_ssl_records": "TRUE"}
+
+        cache = ResultCache()
+        cache.store(cache.key("0123", None, "ssl", override_prefs, analyzer=failing_analyzer.__name__), state)
+
+        self.assertEqual(
+            analyze_capture(self.filename, "ssl", override_prefs, failing_analyzer, capture_hash="0123"),
+            state
+        )
+
+    def test_process_corpus(self):
+
+        for name in ("a.pcap", "broken.pcap", "notes.txt"):
+            with open(os.path.join(self.directory.name, name), "w"):
+                pass
+
+        broken = os.path.join(self.directory.name, "broken.pcap")
+
+        for jobs in (1, 2):
+
+            with self.assertLogs("processpcaps.analyze", level="INFO") as logs:
+                failures = process_corpus(self.directory.name, jobs, failing_handler)
+
+            self.assertEqual(list(failures), [broken])
+            self.assertIsInstance(failures[broken], ValueError)
+            self.assertIn("[>] Processed 2 captures, 1 failed", logs.output[0])
+            self.assertIn("[E] %s: broken capture" % broken, logs.output[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy
+
+from fingerprinting.analysis.h2 import Http2Frame
+from fingerprinting.analysis.record import TlsRecordType
+from fingerprinting.analysis.byterange import ByteRangeIndex, NOT_FOUND
+from fingerprinting.analysis.columns import FrameStore, RecordStore, encode_direction
+
+HANDSHAKE = TlsRecordType.HANDSHAKE
+APPLICATION_DATA = TlsRecordType.APPLICATION_DATA
+
+
+def make_records(direction, records):
+
+    # (id, type, length) in the order they were sent
+    return RecordStore(numpy.array([
+        (record_id, record_id, record_type.value, encode_direction(direction), length, 0, 0, 0.0)
+        for record_id, record_type, length in records
+    ], dtype=RecordStore.DTYPE))
+
+
+def make_frames(direction, frames):
+
+    # (id, record, stream, type, length including the frame header)
+    return FrameStore(numpy.array([
+        (frame_id, record_id, stream, record_id, frame_type.value, encode_direction(direction),
+         length - 9, length, 0.0, 0.0, 0.0)
+        for frame_id, record_id, stream, frame_type, length in frames
+    ], dtype=FrameStore.DTYPE))
+
+
+# TLS 1.2 with AES-GCM: the client Finished is a handshake record, the
+# frames follow in application data records with an explicit nonce
+TLS12_RECORDS = [(0, HANDSHAKE, 100), (1, TlsRecordType.CHANGE_CIPHER_SPEC, 1), (2, HANDSHAKE, 40),
+                 (3, APPLICATION_DATA, 24 + 27 + 24), (4, APPLICATION_DATA, 60 + 24)]
+TLS12_FRAMES = [(0, 3, 0, Http2Frame.MAGIC, 24), (1, 3, 0, Http2Frame.SETTINGS, 27), (2, 4, 1, Http2Frame.HEADERS, 60)]
+
+# TLS 1.3: the encrypted handshake is an application data record that
+# carries no HTTP/2
+TLS13_RECORDS = [(0, HANDSHAKE, 90), (1, APPLICATION_DATA, 2000),
+                 (2, APPLICATION_DATA, 27 + 17), (3, APPLICATION_DATA, 100 + 59 + 17)]
+TLS13_FRAMES = [(0, 2, 0, Http2Frame.SETTINGS, 27), (1, 3, 1, Http2Frame.HEADERS, 100), (2, 3, 1, Http2Frame.DATA, 59)]
+
+
+class ByteRangeIndexTest(unittest.TestCase):
+
+    def test_tls12(self):
+
+        index = ByteRangeIndex(
+            make_records("C2S", TLS12_RECORDS), make_frames("C2S", TLS12_FRAMES), {2: 0}
+        )
+
+        self.assertEqual(index.overhead, 24)
+        self.assertEqual(index.length("C2S"), 325)
+        self.assertEqual(index.length("S2C"), 0)
+
+        frames = index.frames["C2S"]
+        self.assertEqual(frames["start"].tolist(), [169, 193, 249])
+        self.assertEqual(frames["finish"].tolist(), [193, 220, 309])
+        self.assertEqual(frames["record"].tolist(), [3, 3, 4])
+
+        offsets = [0, 168, 169, 192, 193, 219, 220, 249, 308, 309, 1000]
+        self.assertEqual(index.frames_at("C2S", offsets).tolist(), [-1, -1, 0, 0, 1, 1, -1, 2, 2, -1, -1])
+        self.assertEqual(index.records_at("C2S", offsets).tolist(), [0, 3, 3, 3, 3, 3, 3, 4, 4, 4, -1])
+        self.assertEqual(index.streams_at("C2S", [170, 250]).tolist(), [0, 1])
+        self.assertEqual([a.tolist() for a in index.objects_at("C2S", [170, 250])], [[NOT_FOUND, 1], [NOT_FOUND, 0]])
+
+        self.assertEqual(index.frames_between("C2S", 0, 200)["id"].tolist(), [0, 1])
+        self.assertEqual(index.records_between("C2S", 104, 112)["id"].tolist(), [0, 1, 2])
+        self.assertEqual(len(index.frames_between("S2C", 0, 1000)), 0)
+        self.assertEqual(index.frames_at("S2C", [0]).tolist(), [NOT_FOUND])
+
+    def test_tls13(self):
+
+        # frames start after the encrypted handshake, not in it
+        index = ByteRangeIndex(
+            make_records("S2C", TLS13_RECORDS), make_frames("S2C", TLS13_FRAMES), overhead=17
+        )
+
+        frames = index.frames["S2C"]
+
+        self.assertEqual(index.prefix, 0)
+        self.assertEqual(frames["start"].tolist(), [2105, 2154, 2254])
+        self.assertEqual(frames["finish"].tolist(), [2132, 2254, 2313])
+        self.assertEqual(frames["record"].tolist(), [2, 3, 3])
+        self.assertEqual(index.frames_at("S2C", [1000, 2105, 2260]).tolist(), [NOT_FOUND, 0, 2])
+
+    def test_brute_force(self):
+
+        # point queries agree with a scan over the placed records and frames
+        index = ByteRangeIndex(make_records("C2S", TLS12_RECORDS), make_frames("C2S", TLS12_FRAMES))
+        offsets = numpy.arange(-5, index.length("C2S") + 5)
+
+        for entries, found in ((index.records["C2S"], index.records_at("C2S", offsets)),
+                               (index.frames["C2S"], index.frames_at("C2S", offsets))):
+
+            expected = [
+                next((int(e["id"]) for e in entries if e["start"] <= offset < e["finish"]), NOT_FOUND)
+                for offset in offsets
+            ]
+
+            self.assertEqual(found.tolist(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import tempfile
+import unittest
+
+from unittest import mock
+
+from fingerprinting.common import cache
+from fingerprinting.common import tshark
+from fingerprinting.common.cache import ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.results = os.path.join(self.directory.name, "results")
+        self.editcap = os.path.join(self.directory.name, "editcap")
+
+        os.makedirs(self.results)
+        os.makedirs(self.editcap)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, filename, size, age):
+
+        with open(filename, mode="wb") as fp:
+            fp.write(b"\0" * size)
+
+        timestamp = time.time() - age
+        os.utime(filename, (timestamp, timestamp))
+
+    def test_evict_shared_directories(self):
+
+        # the oldest files go first, whichever directory they are in
+        self.write(os.path.join(self.editcap, "old.pcap"), 100, 300)
+        self.write(os.path.join(self.results, "old.pickle"), 100, 200)
+        self.write(os.path.join(self.editcap, "new.pcap"), 100, 100)
+        self.write(os.path.join(self.editcap, "partial.pcap.1.tmp"), 1000, 400)
+
+        cache = ResultCache(self.results, max_size=150, shared_directories=[self.editcap])
+        cache.store("new", None)
+
+        self.assertEqual(sorted(os.listdir(self.results)), ["new.pickle"])
+        self.assertEqual(sorted(os.listdir(self.editcap)), ["new.pcap", "partial.pcap.1.tmp"])
+
+    def test_evict_grace_period(self):
+
+        # a copy another worker just reused stays, even over the limit
+        self.write(os.path.join(self.editcap, "old.pcap"), 100, 300)
+        self.write(os.path.join(self.editcap, "reused.pcap"), 100, 1)
+
+        cache = ResultCache(self.results, max_size=50, shared_directories=[self.editcap])
+        cache.store("new", None)
+
+        self.assertEqual(sorted(os.listdir(self.results)), ["new.pickle"])
+        self.assertEqual(sorted(os.listdir(self.editcap)), ["reused.pcap"])
+
+    def test_store_and_load(self):
+
+        cache = ResultCache(self.results)
+        key = cache.key("capture", None, "ssl", {"ssl.keylog_file": "a.log"})
+
+        self.assertIsNone(cache.load(key))
+
+        cache.store(key, {"frames": [1, 2]})
+        self.assertEqual(cache.load(key), {"frames": [1, 2]})
+        self.assertEqual(key, cache.key("capture", None, "ssl", {"ssl.keylog_file": "b.log"}))
+
+    def test_key_follows_schema(self):
+
+        # results stored by other analysis code are never reused
+        results = ResultCache(self.results)
+        key = results.key("capture", None, "ssl", {})
+
+        with mock.patch.object(cache, "get_schema_hash", return_value="other"):
+            self.assertNotEqual(results.key("capture", None, "ssl", {}), key)
+
+        self.assertEqual(cache.get_schema_hash(), cache.get_schema_hash(cache.PACKAGE_DIRECTORY))
+
+    def test_key_follows_tshark(self):
+
+        results = ResultCache(self.results)
+
+        with mock.patch.object(tshark, "get_version", return_value="TShark (Wireshark) 2.6.0"):
+            key = results.key("capture", None, "ssl", {})
+
+        with mock.patch.object(tshark, "get_version", return_value="TShark (Wireshark) 3.0.0"):
+            self.assertNotEqual(results.key("capture", None, "ssl", {}), key)
+
+    def test_load_discards_stale_entries(self):
+
+        results = ResultCache(self.results)
+
+        # a truncated file, a class that is gone and a module that is gone
+        contents = {
+            "truncated": b"\x80\x04",
+            "attribute": b"cfingerprinting.common.cache\nMissingClass\n.",
+            "module": b"cfingerprinting.missing\nMissingClass\n.",
+        }
+
+        for key, content in contents.items():
+
+            with open(results.get_filename(key), mode="wb") as fp:
+                fp.write(content)
+
+            with self.assertLogs("fingerprinting.common.cache", level="WARNING"):
+                self.assertIsNone(results.load(key))
+
+            self.assertFalse(os.path.exists(results.get_filename(key)))
+
+    def test_schema_hash(self):
+
+        package = os.path.join(self.directory.name, "package")
+        os.makedirs(os.path.join(package, "analysis"))
+
+        with open(os.path.join(package, "analysis", "frame.py"), "w") as fp:
+            fp.write("__slots__ = ('id',)\n")
+
+        first = cache.get_schema_hash(package)
+
+        with open(os.path.join(package, "analysis", "frame.py"), "w") as fp:
+            fp.write("__slots__ = ('id', 'length')\n")
+
+        cache.get_schema_hash.cache_clear()
+        self.assertNotEqual(cache.get_schema_hash(package), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
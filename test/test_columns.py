@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy
+
+from fingerprinting.analysis.h2 import Http2Frame
+from fingerprinting.analysis.columns import FrameStore, encode_direction
+
+# (id, stream, type, direction, length, timestamp)
+FRAMES = [
+    (0, 0, Http2Frame.MAGIC, "C2S", 24, 0.0),
+    (1, 0, Http2Frame.SETTINGS, "C2S", 27, 0.0),
+    (2, 0, Http2Frame.SETTINGS, "S2C", 27, 0.1),
+    (3, 1, Http2Frame.HEADERS, "C2S", 60, 0.2),
+    (4, 1, Http2Frame.HEADERS, "S2C", 120, 0.4),
+    (5, 1, Http2Frame.DATA, "S2C", 16393, 0.5),
+    (6, 3, Http2Frame.HEADERS, "C2S", 40, 0.3),
+    (7, 1, Http2Frame.DATA, "S2C", 1009, 0.6),
+    (8, 3, Http2Frame.HEADERS, "S2C", 80, 0.6),
+    (9, 3, Http2Frame.DATA, "S2C", 509, 0.7),
+]
+
+
+def make_store():
+
+    return FrameStore(numpy.array([
+        (frame_id, frame_id, stream, -1, frame_type.value, encode_direction(direction),
+         length - 9, length, timestamp, 0.0, 0.0)
+        for frame_id, stream, frame_type, direction, length, timestamp in FRAMES
+    ], dtype=FrameStore.DTYPE))
+
+
+def scan(**conditions):
+
+    # ids of the frames matching every condition, the way select should
+    names = ("id", "stream", "type", "direction", "length", "timestamp")
+
+    return [
+        frame[0] for frame in FRAMES
+        if all(
+            dict(zip(names, frame))[column] in (value if isinstance(value, (list, tuple)) else [value])
+            for column, value in conditions.items()
+        )
+    ]
+
+
+class ColumnStoreTest(unittest.TestCase):
+
+    def test_select(self):
+
+        store = make_store()
+
+        for conditions in (
+            {"type": Http2Frame.HEADERS},
+            {"direction": "S2C"},
+            {"type": Http2Frame.DATA, "direction": "S2C", "stream": 1},
+            {"type": [Http2Frame.HEADERS, Http2Frame.SETTINGS], "direction": "C2S"},
+            {"stream": (1, 3)},
+            {"type": Http2Frame.PING},
+        ):
+            self.assertEqual(store.select(**conditions)["id"].tolist(), scan(**conditions), msg=conditions)
+
+        self.assertEqual(len(store.select()), len(FRAMES))
+        self.assertIsInstance(store.select(stream=1), FrameStore)
+
+    def test_between(self):
+
+        self.assertEqual(make_store().between("timestamp", 0.3, 0.6)["id"].tolist(), [4, 5, 6])
+
+    def test_sort(self):
+
+        store = make_store().sort("timestamp")
+
+        # ties keep their original order
+        self.assertEqual(store["id"].tolist(), [0, 1, 2, 3, 6, 4, 5, 7, 8, 9])
+        self.assertEqual(store.sort("stream")["id"].tolist(), [0, 1, 2, 3, 4, 5, 7, 6, 8, 9])
+        self.assertEqual(store.types()[0:2], [Http2Frame.MAGIC, Http2Frame.SETTINGS])
+
+    def test_group(self):
+
+        store = make_store()
+
+        streams, lengths = store.group_sum("stream", "length")
+        self.assertEqual(streams.tolist(), [0, 1, 3])
+        self.assertEqual(lengths.tolist(), [78, 17582, 629])
+
+        types, counts = store.select(direction="S2C").group_count("type")
+        self.assertEqual(
+            dict(zip(types.tolist(), counts.tolist())),
+            {Http2Frame.DATA.value: 3, Http2Frame.HEADERS.value: 2, Http2Frame.SETTINGS.value: 1}
+        )
+
+        streams, lengths = store.select(stream=7).group_sum("stream", "length")
+        self.assertEqual((len(streams), len(lengths)), (0, 0))
+
+    def test_inter_arrival(self):
+
+        gaps = make_store().select(direction="S2C").inter_arrival()
+        self.assertTrue(numpy.allclose(gaps, [0.3, 0.1, 0.1, 0.0, 0.1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
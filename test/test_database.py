@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import unittest
+import contextlib
+
+from fingerprinting.application import Application
+from fingerprinting.demultiplexer import ConnectionDemultiplexer
+from fingerprinting.common.database import Database, TABLES
+
+from test.test_snapshot import CAPTURE, CONNECTIONS
+
+
+def parse(state, capture):
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        state.parse_fields(capture)
+
+    return state
+
+
+class DatabaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.database = Database(":memory:")
+
+    def tearDown(self):
+        self.database.close()
+
+    def get_captures(self):
+
+        return self.database.connection.execute(
+            "SELECT id, name, variant, hash FROM captures ORDER BY id"
+        ).fetchall()
+
+    def select(self, query, *parameters):
+
+        return self.database.connection.execute(query, parameters).fetchall()
+
+    def count(self, table, capture):
+
+        return self.select("SELECT COUNT(*) FROM %s WHERE capture = ?" % table, capture)[0][0]
+
+    def test_export(self):
+
+        capture = self.database.export("a.pcap", parse(Application(), CAPTURE), "1")
+
+        self.assertEqual(
+            {table: self.count(table, capture) for table in TABLES},
+            {"connections": 1, "settings": 6, "packets": 4, "records": 4, "frames": 6, "streams": 2, "objects": 1}
+        )
+
+        self.assertEqual(
+            self.select("SELECT client_address, server_address, last_stream, error FROM connections"),
+            [("10.0.0.1", "10.0.0.2", 1, "NO_ERROR")]
+        )
+        self.assertEqual(
+            self.select("SELECT value FROM settings WHERE name = 'MAX_CONCURRENT_STREAMS'"),
+            [(100,)]
+        )
+        self.assertEqual(
+            self.select("SELECT id, direction, length, length_frames, length_records FROM packets ORDER BY id"),
+            [(1, "C2S", 200, 0, 200), (2, "S2C", 200, 0, 80), (3, "C2S", 200, 111, 135), (4, "S2C", 200, 158, 182)]
+        )
+        self.assertEqual(
+            self.select("SELECT packet, type, direction, length FROM records ORDER BY id"),
+            [(1, "HANDSHAKE", "C2S", 200), (2, "HANDSHAKE", "S2C", 80),
+             (3, "APPLICATION_DATA", "C2S", 135), (4, "APPLICATION_DATA", "S2C", 182)]
+        )
+        self.assertEqual(
+            self.select("SELECT record, stream, type, direction, body, http_method, http_status, http_resource "
+                        "FROM frames WHERE type IN ('HEADERS', 'DATA') ORDER BY id"),
+            [(3, 1, "HEADERS", "C2S", 51, "GET", None, "/index.html"),
+             (4, 1, "HEADERS", "S2C", 31, None, 200, None),
+             (4, 1, "DATA", "S2C", 100, None, None, None)]
+        )
+        self.assertEqual(
+            self.select("SELECT attributes FROM frames WHERE type = 'SETTINGS' ORDER BY id"),
+            [('{"flags_ack": false}',), ('{"flags_ack": true}',)]
+        )
+        self.assertEqual(
+            self.select("SELECT id, state, length FROM streams ORDER BY id"),
+            [(0, "IDLE", 60), (1, "CLOSED", 209)]
+        )
+        self.assertEqual(
+            self.select("SELECT stream, position, name, status, length, finished, body FROM objects"),
+            [(1, 0, "/index.html", 200, 100, 1, "[100]")]
+        )
+
+    def test_export_demultiplexer(self):
+
+        capture = self.database.export("b.pcap", parse(ConnectionDemultiplexer(), CONNECTIONS), "2")
+
+        self.assertEqual(self.select("SELECT tcp_stream FROM connections WHERE capture = ?", capture), [(0,), (1,)])
+        self.assertEqual(self.count("settings", capture), 12)
+
+        for table in ("packets", "records", "frames"):
+            self.assertEqual(
+                self.select("SELECT tcp_stream, COUNT(*) FROM %s GROUP BY tcp_stream" % table),
+                [(0, self.count(table, capture) // 2), (1, self.count(table, capture) // 2)],
+                msg=table
+            )
+
+        # the packets alternate between the connections
+        self.assertEqual(
+            self.select("SELECT tcp_stream FROM packets ORDER BY id"),
+            [(0,), (1,), (0,), (1,), (0,), (1,), (0,), (1,)]
+        )
+        self.assertEqual(
+            self.select("SELECT tcp_stream, name FROM objects ORDER BY tcp_stream"),
+            [(0, "/index.html"), (1, "/app.js")]
+        )
+
+    def test_variants_are_separate_captures(self):
+
+        first = self.database.export("a.pcap", Application(), "1", "withtlskeys")
+        second = self.database.export("a.pcap", Application(), "1", "withouttlskeys:notlskeys")
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.get_captures(), [
+            (first, "a.pcap", "withtlskeys", "1"),
+            (second, "a.pcap", "withouttlskeys:notlskeys", "1"),
+        ])
+
+        connections = self.database.connection.execute("SELECT capture FROM connections ORDER BY capture")
+        self.assertEqual(connections.fetchall(), [(first,), (second,)])
+
+    def test_export_replaces_variant(self):
+
+        first = self.database.export("a.pcap", Application(), "1")
+        other = self.database.export("b.pcap", Application(), "3")
+        second = self.database.export("a.pcap", Application(), "2")
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.get_captures(), [(first, "a.pcap", "", "2"), (other, "b.pcap", "", "3")])
+
+        connections = self.database.connection.execute("SELECT capture FROM connections ORDER BY capture")
+        self.assertEqual(connections.fetchall(), [(first,), (other,)])
+
+
+if __name__ == "__main__":
+    unittest.main()
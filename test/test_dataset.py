@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+import numpy
+
+from fingerprinting.analysis import features
+from processpcaps.dataset import Dataset, build_dataset, get_label
+
+
+def make_features(seed, connections, objects):
+
+    generator = numpy.random.default_rng(seed)
+
+    return (
+        generator.random((connections, len(features.CONNECTION_COLUMNS))),
+        generator.random((objects, len(features.OBJECT_COLUMNS)))
+    )
+
+
+def fake_extract_capture(filename, known_hash=None, testname="", use_cache=True):
+
+    # the contents of the file stand in for its hash and seed its features
+    with open(filename) as fp:
+        capture_hash = fp.read()
+
+    if capture_hash == known_hash:
+        return capture_hash, None
+
+    return capture_hash, make_features(int(capture_hash), 1, 2)
+
+
+class DatasetTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "dataset.npz")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertDatasetEqual(self, dataset, expected):
+
+        self.assertEqual(dataset.captures, expected.captures)
+        self.assertEqual(dataset.hashes, expected.hashes)
+        self.assertEqual(dataset.labels, expected.labels)
+        self.assertEqual(dataset.index, expected.index)
+
+        for name in ("connections", "objects", "connection_captures", "object_captures"):
+            self.assertTrue(numpy.array_equal(getattr(dataset, name), getattr(expected, name)), msg=name)
+
+    def test_insert_remove_merge(self):
+
+        dataset = Dataset()
+        parts = {capture: make_features(seed, seed + 1, 2 * seed) for seed, capture in enumerate("abc")}
+
+        for capture, contents in parts.items():
+            dataset.insert(capture, "hash-" + capture, "label-" + capture, *contents)
+
+        dataset.merge()
+        dataset.remove("b")
+
+        # inserting a capture again replaces its rows
+        replacement = make_features(9, 2, 3)
+        dataset.insert("a", "hash-a2", "label-a", *replacement)
+        dataset.merge()
+
+        self.assertEqual(dataset.captures, ["c", "a"])
+        self.assertEqual(dataset.hashes, ["hash-c", "hash-a2"])
+        self.assertEqual(dataset.get_hash("a"), "hash-a2")
+        self.assertIsNone(dataset.get_hash("b"))
+
+        self.assertTrue(numpy.array_equal(dataset.connections, numpy.concatenate([parts["c"][0], replacement[0]])))
+        self.assertTrue(numpy.array_equal(dataset.objects, numpy.concatenate([parts["c"][1], replacement[1]])))
+        self.assertEqual(dataset.connection_captures.tolist(), [0, 0, 0, 1, 1])
+        self.assertEqual(dataset.object_captures.tolist(), [0, 0, 0, 0, 1, 1, 1])
+
+        dataset.save(self.filename)
+        self.assertDatasetEqual(Dataset.load(self.filename), dataset)
+
+        with numpy.load(self.filename) as contents:
+            self.assertEqual(contents["object_labels"].tolist(), ["label-c"] * 4 + ["label-a"] * 3)
+
+    def test_empty(self):
+
+        Dataset().save(self.filename)
+        self.assertDatasetEqual(Dataset.load(self.filename), Dataset())
+        self.assertEqual(len(Dataset.load(os.path.join(self.directory.name, "missing.npz"))), 0)
+
+    def test_build_prunes_and_relabels(self):
+
+        corpus = os.path.join(self.directory.name, "corpus")
+        captures = {}
+
+        for page, seed in (("a", 1), ("b", 2), ("c", 3)):
+
+            os.makedirs(os.path.join(corpus, page))
+            captures[page] = os.path.join(corpus, page, "capture.pcap")
+
+            with open(captures[page], "w") as fp:
+                fp.write(str(seed))
+
+        with mock.patch("processpcaps.dataset.extract_capture", fake_extract_capture):
+
+            dataset = build_dataset(corpus, self.filename)
+            self.assertEqual(dataset.labels, ["a", "b", "c"])
+
+            os.remove(captures["b"])
+
+            dataset = build_dataset(corpus, self.filename, label=lambda filename: "page-" + get_label(filename))
+
+        self.assertEqual(dataset.captures, [captures["a"], captures["c"]])
+        self.assertEqual(dataset.labels, ["page-a", "page-c"])
+        self.assertDatasetEqual(Dataset.load(self.filename), dataset)
+
+
+if __name__ == "__main__":
+    unittest.main()
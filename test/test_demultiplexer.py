@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+
+from fingerprinting.demultiplexer import ConnectionDemultiplexer
+
+from test.test_snapshot import CONNECTIONS, OUTPUT_FILES, read_outputs
+
+
+class ConnectionDemultiplexerTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.demultiplexer = ConnectionDemultiplexer()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.demultiplexer.parse_fields(CONNECTIONS)
+
+    def test_connections(self):
+
+        applications = self.demultiplexer.applications
+
+        self.assertEqual(sorted(applications), [0, 1])
+        self.assertIsNot(applications[0], applications[1])
+
+        # every connection only holds its own packets and objects
+        self.assertEqual(sorted(applications[0].packets), [1, 3, 5, 7])
+        self.assertEqual(sorted(applications[1].packets), [2, 4, 6, 8])
+        self.assertEqual(
+            [web_object.name for web_object in applications[0].streams[1].objects],
+            ["/index.html"]
+        )
+        self.assertEqual(
+            [web_object.name for web_object in applications[1].streams[1].objects],
+            ["/app.js"]
+        )
+
+    def test_identifiers(self):
+
+        applications = self.demultiplexer.applications
+
+        self.assertIs(applications[0].identifiers, self.demultiplexer.identifiers)
+        self.assertIs(applications[1].identifiers, self.demultiplexer.identifiers)
+
+        # ids are handed out in capture order across both connections
+        frames = sorted(
+            (frame.packet.id, frame.id)
+            for application in applications.values()
+            for frame in application.frames.values()
+        )
+        records = sorted(
+            (record.packet.id, record.id)
+            for application in applications.values()
+            for record in application.records
+        )
+
+        self.assertEqual([frame_id for _, frame_id in frames], list(range(1, 13)))
+        self.assertEqual([record_id for _, record_id in records], list(range(1, 9)))
+
+    def test_serialize(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            self.demultiplexer.serialize(directory)
+
+            self.assertEqual(sorted(os.listdir(directory)), ["tcpstream_0", "tcpstream_1"])
+
+            for tcp_stream in ("tcpstream_0", "tcpstream_1"):
+                for filename in OUTPUT_FILES:
+                    self.assertTrue(os.path.exists(os.path.join(directory, tcp_stream, filename)))
+
+            first = read_outputs(os.path.join(directory, "tcpstream_0"))["streams.yml"]
+            second = read_outputs(os.path.join(directory, "tcpstream_1"))["streams.yml"]
+
+            self.assertIn(b"/index.html", first)
+            self.assertNotIn(b"/app.js", first)
+            self.assertIn(b"/app.js", second)
+            self.assertNotIn(b"/index.html", second)
+
+
+if __name__ == "__main__":
+    unittest.main()
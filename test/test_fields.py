@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from fingerprinting.application import Application
+from fingerprinting.analysis.h2f import Settings
+from fingerprinting.analysis.fields import AGGREGATOR, FIELDS, SEPARATOR, FieldsRow
+
+
+def make_line(values):
+
+    # one tab separated column per field, occurrences joined by the aggregator
+    return SEPARATOR.join(AGGREGATOR.join(str(v) for v in values.get(field, ())) for field in FIELDS) + "\n"
+
+
+class FieldsRowTest(unittest.TestCase):
+
+    def test_packet(self):
+
+        row = FieldsRow(make_line({
+            "frame.number": [7],
+            "frame.time_delta": [0.5],
+            "frame.len": [1514],
+            "frame.time_relative": [1.25],
+            "ip.src": ["10.0.0.1"],
+            "ip.dst": ["10.0.0.2"],
+            "tcp.srcport": [443],
+            "tcp.dstport": [50000],
+        }))
+
+        packet = row.packet
+
+        self.assertEqual(packet.proto("frame").integer("frame.number"), 7)
+        self.assertEqual(packet.proto("frame").real("frame.time_relative"), 1.25)
+        self.assertEqual(packet.proto("ip").string("ip.src"), "10.0.0.1")
+        self.assertEqual(packet.proto("tcp").integer("tcp.srcport"), 443)
+        self.assertEqual(row.records, [])
+        self.assertEqual(row.frames, [])
+
+    def test_handshakes_grouped_by_record(self):
+
+        # ServerHello and Certificate share the first record, ServerHelloDone
+        # has one of its own and the last record is an encrypted Finished
+        row = FieldsRow(make_line({
+            "ssl.record.content_type": [22, 22, 20, 22],
+            "ssl.record.length": [4 + 70 + 4 + 2000, 4, 1, 40],
+            "ssl.handshake.type": [2, 11, 14],
+            "ssl.handshake.length": [70, 2000, 0],
+        }))
+
+        records = row.records
+        types = [
+            record.nested("ssl.handshake").integer("ssl.handshake.type") if record.exists("ssl.handshake") else None
+            for record in records
+        ]
+
+        self.assertEqual([record.integer("ssl.record.length") for record in records], [2078, 4, 1, 40])
+        self.assertEqual(types, [2, 14, None, None])
+
+    def test_frames(self):
+
+        row = FieldsRow(make_line({
+            "http2.type": [4, 1, 8],
+            "http2.length": [18, 30, 4],
+            "http2.streamid": [0, 1, 0],
+            "http2.flags": ["0x00", "0x25", "0x00"],
+            "http2.exclusive": ["False"],
+            "http2.headers.weight_real": [256],
+            "http2.stream_dependency": [0],
+            "http2.header.count": [2],
+            "http2.header.name": [":method", "user-agent"],
+            "http2.header.value": ["GET", "test"],
+            # 8 is SETTINGS_ENABLE_CONNECT_PROTOCOL, which has no value field
+            "http2.settings.id": [1, 8, 4],
+            "http2.settings.header_table_size": [4096],
+            "http2.settings.initial_window_size": [65535],
+            "http2.window_update.window_size_increment": [1 << 20],
+        }))
+
+        settings, headers, window_update = row.frames
+
+        self.assertEqual(Settings.parse_json(settings.nested_children("http2.settings")), {
+            "HEADER_TABLE_SIZE": 4096,
+            "INITIAL_WINDOW_SIZE": 65535,
+        })
+
+        self.assertEqual(headers.integer("http2.streamid"), 1)
+        self.assertEqual(headers.integer("http2.headers.weight_real"), 256)
+        self.assertEqual(headers.string("http2.exclusive"), "0")
+        self.assertEqual(headers.nested("http2.flags").string("http2.flags.end_stream"), "1")
+        self.assertEqual(headers.nested("http2.flags").string("http2.flags.priority"), "1")
+        self.assertEqual(
+            [header.fields for _, header in headers.children("http2.header")],
+            [{"http2.headers.method": "GET"}]
+        )
+
+        self.assertEqual(window_update.integer("http2.window_update.window_size_increment"), 1 << 20)
+
+    def test_frames_without_application_data(self):
+
+        packet = {
+            "frame.number": [3],
+            "frame.time_delta": [0.1],
+            "frame.len": [200],
+            "frame.time_relative": [0.2],
+            "ip.src": ["10.0.0.1"],
+            "ip.dst": ["10.0.0.2"],
+            "tcp.srcport": [50000],
+            "tcp.dstport": [443],
+            "tcp.stream": [0],
+            "http2.type": [4],
+            "http2.length": [0],
+            "http2.streamid": [0],
+            "http2.flags": ["0x01"],
+        }
+
+        state = Application()
+
+        # a handshake record only, and no record at all
+        for records in ({"ssl.record.content_type": [22], "ssl.record.length": [40]}, {}):
+
+            with self.assertLogs("fingerprinting.application", level="WARNING") as logs:
+                state.process_fields(FieldsRow(make_line(dict(packet, **records))))
+
+            self.assertEqual(logs.output, [
+                "WARNING:fingerprinting.application:[!] Skipping packet 3: "
+                "HTTP/2 frames without an application data record"
+            ])
+
+        self.assertEqual((state.packets, state.frames, state.records), ({}, {}, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
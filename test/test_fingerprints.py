@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from types import SimpleNamespace
+
+from fingerprinting.analysis.fingerprints import FingerprintIndex
+
+
+def make_capture(lengths):
+
+    # just enough of an Application for get_web_objects
+    objects = [SimpleNamespace(name="/%d" % length, length=length) for length in lengths]
+    return SimpleNamespace(streams={1: SimpleNamespace(objects=objects)})
+
+
+class FingerprintIndexTest(unittest.TestCase):
+
+    def make_index(self):
+
+        index = FingerprintIndex()
+
+        # the first page was captured ten times, the second only once
+        for _ in range(10):
+            index.insert_capture("often", make_capture([100, 200, 300]))
+
+        index.insert_capture("once", make_capture([100, 200, 300, 400, 500, 600]))
+
+        return index
+
+    def test_match_per_capture(self):
+
+        ranking = self.make_index().match([100, 200, 300])
+
+        self.assertEqual([label for label, _, _ in ranking], ["often", "once"])
+        self.assertAlmostEqual(ranking[0][1], 1.0)
+        self.assertAlmostEqual(ranking[1][1], 0.5)
+
+    def test_match_tolerance(self):
+
+        index = self.make_index()
+
+        self.assertEqual(index.match([450]), [])
+        self.assertEqual(index.match([450], tolerance=50)[0][0], "once")
+        self.assertEqual(
+            sorted(index.match_object(400, tolerance=100)),
+            [("/300", "often", 300)] * 10 + [("/300", "once", 300), ("/400", "once", 400), ("/500", "once", 500)]
+        )
+
+    def test_save_load(self):
+
+        index = self.make_index()
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            filename = os.path.join(directory, "index.npz")
+            index.save(filename)
+            loaded = FingerprintIndex.load(filename)
+
+        self.assertEqual(len(loaded), len(index))
+        self.assertEqual(loaded.match([100, 200, 300]), index.match([100, 200, 300]))
+
+
+if __name__ == "__main__":
+    unittest.main()
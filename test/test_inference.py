@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy
+
+from fingerprinting.analysis.columns import RecordStore
+from fingerprinting.analysis.record import TlsRecordType
+from fingerprinting.analysis.inference import FrameInference, C2S, S2C
+
+OVERHEAD = 24
+
+
+def make_records(records, overhead=OVERHEAD):
+
+    # (direction, plaintext length, timestamp) of application data records
+    return RecordStore(numpy.array([
+        (i, i, TlsRecordType.APPLICATION_DATA.value, direction, length + overhead, 0, 0, timestamp)
+        for i, (direction, length, timestamp) in enumerate(records)
+    ], dtype=RecordStore.DTYPE))
+
+
+def make_overhead_records(lengths):
+
+    return RecordStore(numpy.array([
+        (i, i, TlsRecordType.APPLICATION_DATA.value, S2C, length, 0, 0, 0.0)
+        for i, length in enumerate(lengths)
+    ], dtype=RecordStore.DTYPE))
+
+
+# one request for a 20000 byte resource, the response is a 128 byte HEADERS
+# frame and DATA frames of 16384 and 3616 bytes, spread over a full record
+# and the rest of the write
+CONNECTION = [
+    (C2S, 24 + 27 + 13, 0.0),
+    (S2C, 21, 0.1),
+    (C2S, 9, 0.2),
+    (S2C, 9, 0.2),
+    (C2S, 49, 0.3),
+    (S2C, 16384, 0.4),
+    (S2C, 128 + 16393 + 3625 - 16384, 0.5),
+    (S2C, 9, 0.6),
+    (S2C, 17, 0.7),
+]
+
+# the TLS 1.3 handshake after the ServerHello: EncryptedExtensions,
+# Certificate, CertificateVerify and Finished of the server, then the
+# Finished of the client, all sent as application data records
+HANDSHAKE = [
+    (S2C, 4 + 6 + 1, 0.0),
+    (S2C, 4 + 2500 + 1, 0.0),
+    (S2C, 4 + 260 + 1, 0.0),
+    (S2C, 4 + 32 + 1, 0.0),
+    (C2S, 4 + 32 + 1, 0.0),
+]
+
+
+class FrameInferenceTest(unittest.TestCase):
+
+    def test_connection(self):
+
+        inference = FrameInference(make_records(CONNECTION))
+        summary = inference.serialize()
+
+        self.assertEqual(inference.overhead, OVERHEAD)
+        self.assertEqual(inference.requests, 1)
+        self.assertEqual(summary["frames"], {"MAGIC": 1, "SETTINGS": 4, "HEADERS": 2, "DATA": 3, "PING": 1})
+
+        response = inference.frames.select(direction=S2C)
+        self.assertEqual(response["length"].tolist(), [21, 9, 128, 16393, 3625, 9, 17])
+        self.assertEqual(response["record"].tolist(), [1, 3, 5, 5, 6, 7, 8])
+
+        self.assertEqual(summary["objects"], [{
+            "length": 20000,
+            "frames": 3,
+            "records": 2,
+            "first_seen": 0.4,
+            "last_seen": 0.6,
+        }])
+
+    def test_tls13_handshake(self):
+
+        # the same connection as under TLS 1.2, the encrypted handshake is
+        # neither frames nor objects
+        expected = dict(FrameInference(make_records(CONNECTION)).serialize(), overhead=17)
+        inference = FrameInference(make_records(HANDSHAKE + CONNECTION, 17))
+
+        self.assertEqual(inference.overhead, 17)
+        self.assertEqual(inference.requests, 1)
+        self.assertEqual(inference.serialize(), expected)
+        self.assertEqual(inference.frames.select(direction=S2C)["record"].tolist(), [6, 8, 10, 10, 11, 12, 13])
+
+    def test_headers_length(self):
+
+        # a wrong guess of the header block moves its error into the object
+        inference = FrameInference(make_records(CONNECTION), headers_length=100)
+        self.assertEqual(inference.objects["length"].tolist(), [20028])
+
+    def test_estimate_overhead(self):
+
+        estimate = FrameInference.estimate_overhead
+
+        self.assertEqual(estimate(make_overhead_records([])), 24)
+
+        # records filled up to the maximum: AES-GCM in TLS 1.2 and TLS 1.3
+        self.assertEqual(estimate(make_overhead_records([16384 + 24, 33, 500])), 24)
+        self.assertEqual(estimate(make_overhead_records([16384 + 17, 26, 500])), 17)
+
+        # no empty frame, the smallest records are a WINDOW_UPDATE and a PING
+        # under AES-GCM, not empty frames under a 28 or 32 byte overhead
+        self.assertEqual(estimate(make_overhead_records([13 + 24, 17 + 24, 13 + 24, 500])), 24)
+
+        # ChaCha20-Poly1305 only adds its tag
+        self.assertEqual(estimate(make_overhead_records([9 + 16, 13 + 16, 17 + 16, 400])), 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+
+from fingerprinting.analysis.intervals import IntervalIndex
+
+
+def scan(intervals, point):
+
+    return [value for start, finish, value in intervals if start <= point <= finish]
+
+
+class IntervalIndexTest(unittest.TestCase):
+
+    def test_brute_force(self):
+
+        generator = random.Random(1)
+
+        for _ in range(200):
+
+            intervals = []
+
+            for value in range(generator.randint(0, 40)):
+                start = generator.randint(0, 50)
+                finish = start + generator.choice((0, 0, 1, 5, 20))
+                intervals.append((start, finish, value))
+
+            index = IntervalIndex(intervals)
+
+            # every endpoint, the points between them and both sides outside
+            for point in [p / 2 for p in range(-2, 2 * 75)]:
+                self.assertEqual(index.query(point), scan(intervals, point), msg=(intervals, point))
+
+    def test_real_timestamps(self):
+
+        generator = random.Random(2)
+        intervals = [
+            (start, start + generator.expovariate(2), value)
+            for value, start in enumerate(generator.uniform(0, 10) for _ in range(500))
+        ]
+
+        index = IntervalIndex(intervals)
+
+        for point in [generator.uniform(-1, 12) for _ in range(500)] + [start for start, _, _ in intervals]:
+            self.assertEqual(index.query(point), scan(intervals, point))
+
+    def test_empty(self):
+
+        self.assertEqual(IntervalIndex([]).query(1.0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
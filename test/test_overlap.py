@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+
+from fingerprinting.analysis.wobj import WebObject
+from fingerprinting.analysis.overlap import OverlapMatrix, RELATIONS, UNDEFINED
+
+
+def make_object(generator):
+
+    # small integer timestamps, so that ties between objects are common
+    web_object = WebObject.__new__(WebObject)
+    web_object.request = {"timestamp": generator.randint(0, 10)}
+    web_object.response = {}
+    web_object.body = []
+    web_object.finished = False
+
+    stage = generator.choice(("request", "response", "payload", "finished", "finished"))
+
+    if stage != "request":
+        web_object.response = {"timestamp": web_object.request["timestamp"] + generator.randint(0, 5)}
+
+    if stage in ("payload", "finished"):
+        timestamp = web_object.response["timestamp"]
+
+        for _ in range(generator.randint(1, 4)):
+            timestamp += generator.randint(0, 3)
+            web_object.body.append({"timestamp": timestamp})
+
+        web_object.finished = stage == "finished"
+
+    return web_object
+
+
+class OverlapMatrixTest(unittest.TestCase):
+
+    def test_compare(self):
+
+        generator = random.Random(1)
+
+        for _ in range(50):
+
+            objects = [make_object(generator) for _ in range(generator.randint(1, 12))]
+            matrix = OverlapMatrix(objects)
+
+            self.assertEqual(len(matrix), len(objects))
+
+            for i, lhs in enumerate(objects):
+                for j, rhs in enumerate(objects):
+                    self.assertEqual(matrix.compare(i, j), lhs.compare(rhs), msg=(i, j))
+
+    def test_relations(self):
+
+        generator = random.Random(2)
+        objects = [make_object(generator) for _ in range(30)]
+        matrix = OverlapMatrix(objects)
+
+        for i, lhs in enumerate(objects):
+            for j, rhs in enumerate(objects):
+
+                # defined exactly when both objects reached the compared parts
+                for k, name in enumerate(RELATIONS):
+
+                    lhs_part, rhs_part = name.split("_")
+                    defined = all(
+                        (web_object.body if part == "payload" else getattr(web_object, part))
+                        for web_object, part in ((lhs, lhs_part), (rhs, rhs_part))
+                    )
+
+                    self.assertEqual(matrix.relations[i, j, k] != UNDEFINED, defined, msg=(i, j, name))
+
+                payloads = lhs.body and rhs.body and \
+                    lhs.body[0]["timestamp"] <= rhs.body[-1]["timestamp"] and \
+                    rhs.body[0]["timestamp"] <= lhs.body[-1]["timestamp"]
+
+                self.assertEqual(matrix.multiplexed()[i, j], bool(payloads) and i != j)
+
+        self.assertEqual(matrix.concurrency().tolist(), matrix.multiplexed().sum(axis=1).tolist())
+
+    def test_empty(self):
+
+        matrix = OverlapMatrix([])
+
+        self.assertEqual(matrix.relations.shape, (0, 0, len(RELATIONS)))
+        self.assertEqual(matrix.concurrency().tolist(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,652 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import signal
+import unittest
+
+from fingerprinting.analysis.h2f import Frame
+from fingerprinting.analysis.slotted import EMPTY
+from fingerprinting.analysis.packet import Packet, SslFakeSegment
+from fingerprinting.analysis.record import SslSegmentData, TlsRecord, TlsRecordType
+
+# the items of a packet are built without tshark layers, their layer id is
+# their position so that a layout is the order process_mapssl2http2 sees
+
+
+def make_record(layer_id, segments):
+
+    record = TlsRecord.__new__(TlsRecord)
+    record.type = TlsRecordType.APPLICATION_DATA
+    record.layer_id = layer_id
+    record.sublayer_id = 0
+    record.segment_data = [None] * segments
+
+    return record
+
+
+def make_frame(layer_id):
+
+    frame = Frame.__new__(Frame)
+    frame.layer_id = layer_id
+    frame.sublayer_id = 0
+    frame.last_ssl_record = None
+    frame.ssl_segment_reassembly = None
+
+    return frame
+
+
+def make_fake_segment(layer_id):
+
+    fake_segment = SslFakeSegment.__new__(SslFakeSegment)
+    fake_segment.layer_id = layer_id
+    fake_segment.frame_layer_id = None
+
+    return fake_segment
+
+
+def make_packet(layout):
+
+    # layout is a sequence of "F" (frame), "R" (reassembly) or the segment
+    # count of a record
+    packet = Packet.__new__(Packet)
+    packet.records = []
+    packet.frames = []
+    packet.fake_segments = []
+
+    for layer_id, item in enumerate(layout):
+
+        if item == "F":
+            packet.frames.append(make_frame(layer_id))
+        elif item == "R":
+            packet.fake_segments.append(make_fake_segment(layer_id))
+        else:
+            packet.records.append(make_record(layer_id, item))
+
+    return packet
+
+
+def get_mapping(packet):
+
+    # layer id of the record every frame was mapped to
+    return [
+        frame.last_ssl_record.layer_id if frame.last_ssl_record is not None else None
+        for frame in packet.frames
+    ]
+
+
+class ReferenceItem(object):
+
+    def __init__(self, item_type, layer_id, segments=0):
+        self.item = self
+        self.index = -1
+        self.type = item_type
+        self.reasslength = -1
+        self.layer_id = layer_id
+        self.segment_data = [None] * segments
+        self.last_ssl_record = None
+        self.frame_layer_id = None
+        self.ssl_segment_reassembly = None
+
+
+class Looping(Exception):
+    pass
+
+
+class Timeout(object):
+
+    # fails a call that does not return within the given seconds
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    @staticmethod
+    def expire(signum, frame):
+        raise Looping()
+
+    def __enter__(self):
+        self.handler = signal.signal(signal.SIGALRM, self.expire)
+        signal.setitimer(signal.ITIMER_REAL, self.seconds)
+
+    def __exit__(self, *args):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, self.handler)
+
+
+def reference_mapssl2http2(items_sorted, limit=1000):
+
+    # the original linear-scan mapping, on plain objects that accept any
+    # attribute, stopped after limit iterations of its main loop
+
+    for index in range(0, len(items_sorted) - 1):
+
+        item = items_sorted[index]
+        next_item = items_sorted[index + 1]
+
+        if item.type != "sslreass":
+            continue
+
+        if item.reasslength >= 0:
+            next_item.index = item.index - 1
+            next_item.reasslength = item.reasslength
+
+        elif next_item.type == "sslreass":
+            reassembled_length = 2
+
+            for j in range(index + 2, len(items_sorted)):
+
+                if items_sorted[j].type == "sslreass":
+                    reassembled_length += 1
+                else:
+                    break
+
+            item.reasslength = reassembled_length
+            item.index = item.reasslength - 1
+
+            next_item.reasslength = reassembled_length
+            next_item.index = item.reasslength - 2
+
+        else:
+            item.index = 0
+            item.reasslength = 1
+
+    def get_next_item_of_type(item_type, start):
+        for index in range(start, len(items_sorted)):
+            if items_sorted[index].type == item_type:
+                return index
+        return -1
+
+    def get_next_item_not_of_type(item_type, start):
+        for index in range(start, len(items_sorted)):
+            if items_sorted[index].type != item_type:
+                return index
+        return -1
+
+    def get_next_item_of_type_nossl(item_type, start):
+        for index in range(start, len(items_sorted)):
+            if items_sorted[index].type == item_type:
+                return index
+            elif item_type == "ssl":
+                break
+        return -1
+
+    record_index = get_next_item_of_type("ssl", 0)
+    frame_index = get_next_item_not_of_type("ssl", record_index)
+    reassembled_index = get_next_item_of_type_nossl("sslreass", frame_index)
+    frame_index = get_next_item_of_type_nossl("http2frame", frame_index)
+
+    while record_index >= 0 and frame_index >= 0:
+
+        limit -= 1
+
+        if limit < 0:
+            raise Looping()
+
+        ssl_record = items_sorted[record_index].item
+
+        if len(ssl_record.segment_data) == 1:
+
+            frame_index = get_next_item_of_type_nossl("http2frame", frame_index)
+
+            if frame_index < 0:
+                frame = items_sorted[frame_index].item
+                frame.last_ssl_record = ssl_record
+                frame_index += 1
+
+        elif reassembled_index < 0:
+
+            frame_index = get_next_item_of_type_nossl("http2frame", frame_index)
+
+            if frame_index >= 0:
+                frame = items_sorted[frame_index].item
+                frame.last_ssl_record = ssl_record
+                frame_index += 1
+
+        else:
+
+            reassembled_index = get_next_item_of_type_nossl("sslreass", reassembled_index)
+
+            if reassembled_index >= 0:
+                pointer_sslreass = items_sorted[reassembled_index]
+                actual_sslreass_delta_i = 2 * pointer_sslreass.index - (pointer_sslreass.reasslength - 1)
+                sslreass = items_sorted[reassembled_index + actual_sslreass_delta_i]
+                frame = items_sorted[frame_index].item
+                frame.ssl_segment_reassembly = sslreass.item
+                sslreass.item.frame_layer_id = frame.layer_id
+                frame_index += 1
+                reassembled_index += 1
+
+        if record_index + 1 >= len(items_sorted):
+            continue
+
+        if items_sorted[record_index + 1].type != "ssl":
+
+            ssl_record = items_sorted[record_index].item
+
+            while frame_index < len(items_sorted) and items_sorted[frame_index].type == "http2frame":
+                frame = items_sorted[frame_index].item
+                frame.last_ssl_record = ssl_record
+                frame_index += 1
+
+            record_index = get_next_item_of_type("ssl", record_index + 1)
+            tmp_index = get_next_item_not_of_type("ssl", record_index)
+            reassembled_index = get_next_item_of_type_nossl("sslreass", tmp_index)
+            frame_index = get_next_item_of_type_nossl("http2frame", tmp_index)
+
+        else:
+
+            record_index += 1
+
+
+def make_reference(layout):
+
+    types = {"F": "http2frame", "R": "sslreass"}
+
+    return [
+        ReferenceItem(types[item], layer_id) if item in types else ReferenceItem("ssl", layer_id, item)
+        for layer_id, item in enumerate(layout)
+    ]
+
+
+def get_layer_id(item):
+
+    return item.layer_id if item is not None else None
+
+
+def get_reference_result(items):
+
+    frames = [item for item in items if item.type == "http2frame"]
+    fake_segments = [item for item in items if item.type == "sslreass"]
+
+    return (
+        [get_layer_id(frame.last_ssl_record) for frame in frames],
+        [get_layer_id(frame.ssl_segment_reassembly) for frame in frames],
+        [fake_segment.frame_layer_id for fake_segment in fake_segments],
+    )
+
+
+def get_result(packet):
+
+    return (
+        get_mapping(packet),
+        [get_layer_id(frame.ssl_segment_reassembly) for frame in packet.frames],
+        [fake_segment.frame_layer_id for fake_segment in packet.fake_segments],
+    )
+
+
+class MapSslToHttp2Test(unittest.TestCase):
+
+    def compare(self, layout):
+
+        # returns whether the reference wrapped onto a trailing non-frame item
+        # and whether it never finished
+        items = make_reference(layout)
+        looping = False
+
+        try:
+            reference_mapssl2http2(items)
+        except Looping:
+            # the reference spins on its last record repeating one step, so
+            # what it assigned by the limit is what it would hold forever
+            looping = True
+        except Exception as exception:
+            with self.assertRaises(type(exception), msg=layout):
+                make_packet(layout).process_mapssl2http2()
+            return False, False
+
+        packet = make_packet(layout)
+
+        with Timeout(1):
+            packet.process_mapssl2http2()
+
+        self.assertEqual(get_result(packet), get_reference_result(items), msg=layout)
+
+        return items[-1].type != "http2frame" and items[-1].last_ssl_record is not None, looping
+
+    def test_reference(self):
+
+        generator = random.Random(1)
+        wrapped = 0
+        looping = 0
+
+        for _ in range(5000):
+
+            layout = [generator.choice((1, 1, 2, "F", "F", "F", "R")) for _ in range(generator.randint(1, 10))]
+            result = self.compare(layout)
+            wrapped += result[0]
+            looping += result[1]
+
+        # the negative index case and the layouts the original never finished
+        # have to be among the generated layouts
+        self.assertGreater(wrapped, 0)
+        self.assertGreater(looping, 0)
+
+    def test_reference_layouts(self):
+
+        for layout in ([1, "F", "F"], [2, 1, "F", 2], [2, "R", "F", "F", 1], ["F", 1, "R", "R", "F", "F"]):
+            self.compare(layout)
+
+    def test_looping_layouts(self):
+
+        layouts = (
+            (["R", "F", "F", "F", "F", "R", 1, 1], [None, None, None, None]),
+            ([1, "R", "F", "F", "F", "R", "R", 1], [0, 0, 0]),
+            ([2, "F", "R", 1, "F", 1, 2, 1], [None, 3]),
+        )
+
+        for layout, mapping in layouts:
+
+            self.assertTrue(self.compare(layout)[1], msg=layout)
+
+            packet = make_packet(layout)
+
+            with Timeout(1):
+                packet.process_mapssl2http2()
+
+            self.assertEqual(get_mapping(packet), mapping, msg=layout)
+
+    def test_single_record(self):
+
+        packet = make_packet([1, "F", "F"])
+        packet.process_mapssl2http2()
+
+        self.assertEqual(get_mapping(packet), [0, 0])
+
+    def test_last_item_is_record(self):
+
+        # the second record finds no frame after the one consumed by the
+        # first, so its frame index wraps onto the trailing record
+        packet = make_packet([2, 1, "F", 2])
+        packet.process_mapssl2http2()
+
+        self.assertEqual(get_mapping(packet), [3])
+        self.assertFalse(hasattr(packet.records[-1], "last_ssl_record"))
+
+
+# the original attribution of frame bytes to records, run on packets whose
+# record ids are their position in the packet, which it looked them up by
+
+
+def reference_associate_frames_with_records(packet):
+
+    def find_noseg(record, frame):
+
+        for ssl_record in packet.records:
+
+            if ssl_record.packet.id == record.packet.id and \
+                    ssl_record.layer_id == record.layer_id and \
+                    ssl_record.sublayer_id == record.sublayer_id:
+
+                ssl_segment = ssl_record.segment_data[0]
+                ssl_segment.frames.append([frame.id, frame.body])
+
+                return ssl_record.id, ssl_segment.id
+
+        return ()
+
+    def find(segment, frame):
+
+        packet_id = segment[0]
+        ssl_length = segment[1]
+
+        for ssl_record in packet.records:
+
+            if packet_id != packet.id:
+                continue
+
+            for ssl_segment in ssl_record.segment_data[1:]:
+
+                frame_length = sum(piece[1] for piece in ssl_segment.frames)
+
+                if frame_length + ssl_length > ssl_segment.length:
+                    continue
+
+                ssl_segment.frames.append([frame.id, ssl_length])
+
+                return ssl_record.id, ssl_segment.id
+
+        return ()
+
+    for frame in packet.frames:
+
+        if frame.ssl_segment_reassembly is None:
+
+            record = frame.last_ssl_record
+            indices = find_noseg(record, frame)
+
+            if len(indices) == 2:
+                frame.insert_reassembled_segment(indices[0], record.length, indices[1], frame.body)
+
+        else:
+
+            for segment in frame.ssl_segment_reassembly.segments:
+
+                indices = find(segment, frame)
+
+                if len(indices) == 2:
+                    frame.insert_reassembled_segment(
+                        indices[0], packet.records[indices[0]].length,
+                        indices[1], segment[1]
+                    )
+
+
+def reference_remove_duplicate_reassemblies(packet):
+
+    packet.frames_unique = []
+    packet.ssl_segments_reassembled = []
+
+    for fake_segment in packet.fake_segments:
+
+        unique_segment = True
+
+        for reassembled_segment in packet.ssl_segments_reassembled:
+
+            if fake_segment.length != reassembled_segment.length or \
+                    fake_segment.count != reassembled_segment.count:
+                continue
+
+            comparison_list = zip(fake_segment.segments, reassembled_segment.segments)
+
+            if not any(i[0] != j[0] or i[1] != j[1] for i, j in comparison_list):
+                unique_segment = False
+                break
+
+        if unique_segment:
+            packet.ssl_segments_reassembled.append(fake_segment)
+            packet.frames_unique.extend([
+                frame for frame in packet.frames
+                if frame.layer_id == fake_segment.frame_layer_id
+            ])
+
+    packet.frames_unique.extend([
+        frame for frame in packet.frames
+        if frame.ssl_segment_reassembly is None
+    ])
+
+
+def reference_update_frame_bytecount(packet):
+
+    for frame in packet.frames:
+
+        frame_start = -1
+        frame_finish = -1
+
+        for segment_index in frame.ssl_segment_indices:
+
+            ssl_record = packet.records[segment_index.record_id]
+            frame_length = sum(piece[1] for ssl_segment in ssl_record.segment_data for piece in ssl_segment.frames)
+
+            last_http2_frame = 0
+            ssl_record.content_length = frame_length
+            segment_index.content_length = ssl_record.content_length
+
+            for ssl_segment in ssl_record.segment_data:
+
+                first_ssl_segment = 0
+                http2_ssl_seg_size = 0
+
+                for piece in ssl_segment.frames:
+
+                    if piece[0] == frame.id:
+                        http2_ssl_seg_size = piece[1]
+                        first_ssl_segment = last_http2_frame
+
+                    last_http2_frame += piece[1]
+
+                if ssl_segment.id != segment_index.segment_id:
+                    continue
+
+                if frame_length > 0:
+                    first_ssl_segment = first_ssl_segment / (1.0 * frame_length) * ssl_record.length
+                    last_ssl_segment = first_ssl_segment + http2_ssl_seg_size / (1.0 * frame_length) * ssl_record.length
+                else:
+                    first_ssl_segment = 0
+                    last_ssl_segment = ssl_record.length
+
+                first_ssl_segment = max(first_ssl_segment, 0)
+                last_ssl_segment = min(last_ssl_segment, ssl_record.length)
+
+                segment_index.bytecount_start = ssl_record.bytecount_index + first_ssl_segment
+                segment_index.bytecount_finish = ssl_record.bytecount_index + last_ssl_segment - 1
+
+                if frame_start == -1:
+                    frame_start = segment_index.bytecount_start
+                    frame_finish = segment_index.bytecount_finish
+                else:
+                    frame_finish = max(frame_finish, segment_index.bytecount_finish)
+                    frame_start = min(frame_start, segment_index.bytecount_start)
+
+                break
+
+        frame.bytecount_start = frame_start
+        frame.bytecount_finish = frame_finish
+
+
+def make_attribution_packet(generator):
+
+    # a packet with records of several segments, frames that either sit in
+    # the record they were mapped to or in a reassembly, and duplicated
+    # reassemblies; layer ids are drawn from a small range so they collide
+    packet = Packet.__new__(Packet)
+    packet.id = 5
+    packet.records = []
+    packet.frames = []
+    packet.fake_segments = []
+    packet.frames_unique = EMPTY
+    packet.ssl_segments_reassembled = EMPTY
+
+    segment_id = 0
+    lengths = (0, 0, 5, 10, 20, 40)
+
+    for record_id in range(generator.randint(1, 4)):
+
+        record = TlsRecord.__new__(TlsRecord)
+        record.id = record_id
+        record.packet = packet
+        record.layer_id = generator.randint(0, 2)
+        record.sublayer_id = generator.randint(0, 1)
+        record.length = generator.choice(lengths)
+        record.content_length = 0
+        record.bytecount_index = generator.randint(0, 1000)
+        record.segment_data = []
+
+        for _ in range(generator.randint(1, 3)):
+            record.segment_data.append(SslSegmentData(segment_id, generator.choice(lengths)))
+            segment_id += 1
+
+        packet.records.append(record)
+
+    for frame_id in range(generator.randint(1, 6)):
+
+        frame = make_frame(generator.randint(0, 3))
+        frame.id = 100 + frame_id
+        frame.body = generator.choice(lengths)
+        frame.bytecount_start = 0
+        frame.bytecount_finish = 0
+        frame.ssl_segment_indices = EMPTY
+        frame.last_ssl_record = generator.choice(packet.records)
+
+        if generator.random() < 0.5:
+
+            fake_segment = make_fake_segment(generator.randint(0, 3))
+            fake_segment.frame_layer_id = frame.layer_id
+            fake_segment.segments = [
+                [generator.choice((packet.id, packet.id, packet.id - 1)), generator.choice(lengths)]
+                for _ in range(generator.randint(1, 3))
+            ]
+            fake_segment.count = len(fake_segment.segments)
+            fake_segment.length = sum(length for _, length in fake_segment.segments)
+
+            frame.ssl_segment_reassembly = fake_segment
+            packet.fake_segments.append(fake_segment)
+
+            if generator.random() < 0.3:
+                duplicate = make_fake_segment(fake_segment.layer_id)
+                duplicate.frame_layer_id = generator.randint(0, 3)
+                duplicate.segments = [list(segment) for segment in fake_segment.segments]
+                duplicate.count = fake_segment.count
+                duplicate.length = fake_segment.length
+                packet.fake_segments.append(duplicate)
+
+        packet.frames.append(frame)
+
+    return packet
+
+
+def get_attribution(packet):
+
+    return (
+        [
+            (
+                frame.bytecount_start,
+                frame.bytecount_finish,
+                [
+                    (
+                        index.record_id, index.record_size, index.segment_id, index.segment_size,
+                        index.content_length, index.bytecount_start, index.bytecount_finish
+                    )
+                    for index in frame.ssl_segment_indices
+                ]
+            )
+            for frame in packet.frames
+        ],
+        [
+            (record.content_length, [ssl_segment.frames for ssl_segment in record.segment_data])
+            for record in packet.records
+        ],
+        [packet.fake_segments.index(fake_segment) for fake_segment in packet.ssl_segments_reassembled],
+        [packet.frames.index(frame) for frame in packet.frames_unique],
+    )
+
+
+class AttributionTest(unittest.TestCase):
+
+    def test_reference(self):
+
+        empty = 0
+
+        for seed in range(3000):
+
+            reference = make_attribution_packet(random.Random(seed))
+            reference_associate_frames_with_records(reference)
+            reference_remove_duplicate_reassemblies(reference)
+            reference_update_frame_bytecount(reference)
+
+            packet = make_attribution_packet(random.Random(seed))
+            packet.associate_frames_with_records()
+            packet.remove_duplicate_reassemblies()
+            packet.update_frame_bytecount()
+
+            self.assertEqual(get_attribution(packet), get_attribution(reference), msg=seed)
+
+            empty += any(
+                ssl_segment.length == 0 and len(ssl_segment.frames) > 0
+                for record in packet.records
+                for ssl_segment in record.segment_data[1:]
+            )
+
+        # empty pieces placed into empty segments have to be among them
+        self.assertGreater(empty, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+
+from xml.etree import ElementTree
+
+from fingerprinting.application import Application
+from fingerprinting.analysis.parser import MissingField, XmlWrapper, iterate_packets
+
+from test.test_snapshot import read_outputs
+
+# the first packets of firefox-1.pcap in the PDML layout of tshark, reduced to
+# the fields the analysis reads
+PDML_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "firefox-1-head.pdml")
+
+
+class LinearWrapper(object):
+
+    # the wrapper before the field index, every lookup is a search over the
+    # children of the layer
+
+    def __init__(self, layer):
+        self.layer = layer
+
+    def find(self, field):
+        return self.layer.find('field[@name="%s"]' % field)
+
+    def nested(self, field):
+
+        xml_element = self.find(field)
+
+        if xml_element is not None and len(xml_element) > 0:
+            return LinearWrapper(xml_element)
+        else:
+            raise MissingField(field)
+
+    def proto(self, field):
+
+        xml_element = self.layer.find('proto[@name="%s"]' % field)
+
+        if xml_element is None:
+            raise MissingField(field)
+        else:
+            return LinearWrapper(xml_element)
+
+    def exists(self, field):
+        return self.find(field) is not None
+
+    def children(self, field):
+        return enumerate(self.layer.findall('field[@name="%s"]' % field))
+
+    def nested_children(self, field):
+        return ((index, LinearWrapper(xml_element)) for index, xml_element in self.children(field))
+
+    def convert(self, field, conversion):
+
+        xml_element = self.find(field)
+
+        if xml_element is None:
+            raise MissingField(field)
+        else:
+            return conversion(xml_element.attrib["show"])
+
+    def integer(self, field):
+        return self.convert(field, int)
+
+    def boolean(self, field):
+        return self.convert(field, lambda value: value == "1")
+
+    def real(self, field):
+        return self.convert(field, float)
+
+    def string(self, field):
+        return self.convert(field, str)
+
+
+def call(wrapper, method, field):
+
+    # the result of a lookup, or the type of the exception it raised
+    try:
+        result = getattr(wrapper, method)(field)
+    except (MissingField, KeyError, ValueError) as exception:
+        return type(exception)
+
+    if isinstance(result, (XmlWrapper, LinearWrapper)):
+        return result.layer
+    elif method in ("children", "nested_children"):
+        return [(index, getattr(element, "layer", element)) for index, element in result]
+    else:
+        return result
+
+
+class XmlWrapperTest(unittest.TestCase):
+
+    METHODS = (
+        "exists", "children", "nested_children", "nested", "proto",
+        "integer", "boolean", "real", "string"
+    )
+
+    def test_linear_search(self):
+
+        root = ElementTree.parse(PDML_FILENAME).getroot()
+        repeated = 0
+
+        for layer in root.iter():
+
+            if len(layer) == 0:
+                continue
+
+            names = [element.attrib.get("name") for element in layer] + ["missing.field"]
+            repeated += len(names) - len(set(names))
+
+            wrapper = XmlWrapper(layer)
+            reference = LinearWrapper(layer)
+
+            # twice, so the second pass reads the converted values back from the cache
+            for _ in range(2):
+                for name in names:
+                    for method in self.METHODS:
+                        self.assertEqual(
+                            call(wrapper, method, name),
+                            call(reference, method, name),
+                            msg=(layer.attrib.get("name"), method, name)
+                        )
+
+        # records, frames and headers repeat their field names in one layer
+        self.assertGreater(repeated, 0)
+
+    def test_conversion_cache(self):
+
+        wrapper = XmlWrapper(ElementTree.fromstring(
+            '<proto name="http2.stream">'
+            '<field name="http2.streamid" show="3"/>'
+            '<field name="http2.streamid" show="5"/>'
+            '</proto>'
+        ))
+
+        # the first occurrence wins and every conversion is cached on its own
+        self.assertEqual(wrapper.integer("http2.streamid"), 3)
+        self.assertEqual(wrapper.string("http2.streamid"), "3")
+        self.assertEqual(wrapper.real("http2.streamid"), 3.0)
+        self.assertEqual(wrapper.integer("http2.streamid"), 3)
+        self.assertEqual(
+            [child.layer.attrib["show"] for _, child in wrapper.nested_children("http2.streamid")],
+            ["3", "5"]
+        )
+
+        with self.assertRaises(MissingField):
+            wrapper.integer("http2.length")
+
+
+class IteratePacketsTest(unittest.TestCase):
+
+    def test_packets(self):
+
+        expected = [ElementTree.tostring(packet) for packet in ElementTree.parse(PDML_FILENAME).getroot()]
+
+        # packets are serialised as they are yielded, before the root drops them
+        with open(PDML_FILENAME, mode="rb") as fp:
+            packets = [ElementTree.tostring(packet) for packet in iterate_packets(fp)]
+
+        self.assertEqual(packets, expected)
+
+    def test_application(self):
+
+        with contextlib.redirect_stdout(io.StringIO()):
+
+            state = Application()
+            state.parse_xml(ElementTree.parse(PDML_FILENAME))
+
+            with open(PDML_FILENAME, mode="rb") as fp:
+                incremental = Application()
+                incremental.parse_xml_incremental(fp)
+
+        self.assertGreater(len(state.frames), 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            for name, application in (("tree", state), ("incremental", incremental)):
+                os.makedirs(os.path.join(directory, name))
+                application.serialize(os.path.join(directory, name))
+
+            self.assertEqual(
+                read_outputs(os.path.join(directory, "incremental")),
+                read_outputs(os.path.join(directory, "tree"))
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import unittest
+
+import main
+
+from fingerprinting.common.progress import Progress
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.now
+
+
+class ProgressTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.clock = FakeClock()
+        self.progress = Progress(interval=10.0, clock=self.clock)
+
+    def update(self, packets):
+
+        for _ in range(packets):
+            self.progress.update(2, 100)
+
+    def test_rate(self):
+
+        # the clock is only read once per CHECK_INTERVAL packets
+        self.clock.now = 5.0
+
+        with self.assertNoLogs("fingerprinting.common.progress"):
+            self.update(Progress.CHECK_INTERVAL)
+
+        self.assertEqual(self.clock.calls, 2)
+
+        self.clock.now = 16.0
+
+        with self.assertLogs("fingerprinting.common.progress", level="INFO") as logs:
+            self.update(Progress.CHECK_INTERVAL)
+
+        self.assertEqual(logs.output, [
+            "INFO:fingerprinting.common.progress:[>] 2048 packets (128/s), 4096 frames (256/s), 204800 bytes (12800/s)"
+        ])
+
+        # the next report is due one interval after this one
+        self.clock.now = 20.0
+
+        with self.assertNoLogs("fingerprinting.common.progress"):
+            self.update(Progress.CHECK_INTERVAL)
+
+    def test_summary(self):
+
+        self.update(10)
+        self.clock.now = 2.0
+
+        with self.assertLogs("fingerprinting.common.progress", level="INFO") as logs:
+            self.progress.finish()
+
+        self.assertEqual(logs.output, [
+            "INFO:fingerprinting.common.progress:[>] 10 packets (5/s), 20 frames (10/s), 1000 bytes (500/s)"
+        ])
+
+    def test_log_level(self):
+
+        def get_level(*arguments):
+            return main.get_log_level(main.get_parser().parse_args(list(arguments) + ["capture.pcap"]))
+
+        self.assertEqual(get_level(), logging.INFO)
+        self.assertEqual(get_level("-v"), logging.DEBUG)
+        self.assertEqual(get_level("-vv"), logging.DEBUG)
+        self.assertEqual(get_level("-q"), logging.ERROR)
+        self.assertEqual(get_level("-q", "-v"), logging.ERROR)
+
+
+if __name__ == "__main__":
+    unittest.main()
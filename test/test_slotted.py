@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import yaml
+import unittest
+
+from fingerprinting.common import utils
+from fingerprinting.application import Application
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# object dump of firefox-1.pcap written before the slotted model, next to the
+# YAML output of the same run
+DUMP_FILENAME = os.path.join(DIRECTORY, "firefox-1-all.yml")
+OUTPUT_DIRECTORY = os.path.join(os.path.dirname(DIRECTORY), "test_output")
+
+
+def read_output(filename):
+
+    with open(os.path.join(OUTPUT_DIRECTORY, filename)) as fp:
+        return yaml.load(fp, Loader=utils.YAML_LOADER)
+
+
+class OldDumpTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.application = utils.read_pickle(DUMP_FILENAME, Application)
+
+    def test_packets(self):
+
+        packets = read_output("packets.yml")
+
+        self.assertEqual(len(self.application.packets), len(packets))
+
+        for packet_id, packet in self.application.packets.items():
+            self.assertEqual(packet.serialize(), packets[packet_id], msg=packet_id)
+
+    def test_frames(self):
+
+        frames = read_output("frames.yml")
+
+        self.assertEqual(len(self.application.frames), len(frames))
+
+        for frame_id, frame in self.application.frames.items():
+            self.assertEqual(frame.serialize(), frames[frame_id], msg=frame_id)
+
+    def test_streams(self):
+
+        streams = read_output("streams.yml")
+
+        for stream_id, stream in self.application.streams.items():
+
+            # children are a set, the dump does not keep their order
+            serialized = stream.serialize()
+            serialized["children"] = sorted(serialized["children"])
+            streams[stream_id]["children"] = sorted(streams[stream_id]["children"])
+
+            self.assertEqual(serialized, streams[stream_id], msg=stream_id)
+
+    def test_upgraded_state(self):
+
+        packet = next(iter(self.application.packets.values()))
+        frames = list(self.application.frames.values())
+
+        self.assertGreater(packet.length_total, 0)
+        self.assertIsNone(packet.identifiers)
+
+        self.assertTrue(any(frame.ssl_segment_reassembly is None for frame in frames))
+        self.assertFalse(any(frame.ssl_segment_reassembly == [] for frame in frames))
+
+        for record in self.application.records:
+            for segment in record.segment_data:
+                self.assertEqual(segment.frames_length, sum(length for _, length in segment.frames))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import struct
+import tempfile
+import unittest
+import contextlib
+
+from fingerprinting.common import snapshot
+from fingerprinting.application import Application
+
+from test.test_fields import make_line
+
+OUTPUT_FILES = ("stats.yml", "distributions.yml", "streams.yml", "packets.yml", "frames.yml")
+
+
+def make_packet(number, timestamp, client, fields, tcp_stream=0):
+
+    addresses = ["10.0.0.1", "10.0.0.2"]
+    ports = [50000 + tcp_stream, 443]
+
+    if not client:
+        addresses.reverse()
+        ports.reverse()
+
+    return make_line(dict({
+        "frame.number": [number],
+        "frame.time_delta": [0.1],
+        "frame.len": [200],
+        "frame.time_relative": [timestamp],
+        "ip.src": [addresses[0]],
+        "ip.dst": [addresses[1]],
+        "tcp.srcport": [ports[0]],
+        "tcp.dstport": [ports[1]],
+        "tcp.stream": [tcp_stream],
+    }, **fields))
+
+
+def make_connection(tcp_stream=0, numbers=(1, 2, 3, 4), start=0.0, resource="/index.html"):
+
+    # a handshake and one request for the resource answered with 100 bytes
+    timestamps = [start + 0.1 * i for i in range(4)]
+    fields = [{
+        "ssl.record.content_type": [22], "ssl.record.length": [200],
+        "ssl.handshake.type": [1], "ssl.handshake.length": [196],
+    }, {
+        "ssl.record.content_type": [22], "ssl.record.length": [80],
+        "ssl.handshake.type": [2], "ssl.handshake.length": [76],
+    }, {
+        "ssl.record.content_type": [23], "ssl.record.length": [24 + 27 + 60 + 24],
+        "http2.magic": ["PRI * HTTP/2.0"],
+        "http2.type": [4, 1], "http2.length": [18, 51], "http2.streamid": [0, 1], "http2.flags": ["0x00", "0x05"],
+        "http2.header.count": [2], "http2.header.name": [":method", ":path"], "http2.header.value": ["GET", resource],
+        "http2.settings.id": [4, 5, 3],
+        "http2.settings.initial_window_size": [65535],
+        "http2.settings.max_frame_size": [16384],
+        "http2.settings.max_concurrent_streams": [100],
+    }, {
+        "ssl.record.content_type": [23], "ssl.record.length": [24 + 9 + 40 + 109],
+        "http2.type": [4, 1, 0], "http2.length": [0, 31, 100], "http2.streamid": [0, 1, 1],
+        "http2.flags": ["0x01", "0x04", "0x01"],
+        "http2.header.count": [1], "http2.header.name": [":status"], "http2.header.value": ["200"],
+    }]
+
+    return [
+        make_packet(number, timestamp, i % 2 == 0, packet_fields, tcp_stream)
+        for i, (number, timestamp, packet_fields) in enumerate(zip(numbers, timestamps, fields))
+    ]
+
+
+CAPTURE = make_connection()
+
+# two connections whose packets alternate, the second one asks for /app.js
+CONNECTIONS = [
+    line
+    for pair in zip(make_connection(0, (1, 3, 5, 7)), make_connection(1, (2, 4, 6, 8), 0.05, "/app.js"))
+    for line in pair
+]
+
+
+def read_outputs(directory):
+
+    contents = {}
+
+    for filename in OUTPUT_FILES:
+        with open(os.path.join(directory, filename), mode="rb") as fp:
+            contents[filename] = fp.read()
+
+    return contents
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_directory(self, name):
+
+        directory = os.path.join(self.directory.name, name)
+        os.makedirs(directory)
+
+        return directory
+
+    def test_round_trip(self):
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            state = Application()
+            state.parse_fields(CAPTURE)
+
+        self.assertEqual([len(stream.objects) for stream in state.streams.values()], [0, 1])
+
+        written = self.make_directory("written")
+        reloaded = self.make_directory("reloaded")
+
+        state.serialize(written)
+        loaded = Application.load(written)
+        loaded.serialize(reloaded)
+
+        self.assertEqual(read_outputs(reloaded), read_outputs(written))
+
+        # the object graph keeps its cycles: frames point back at their packet
+        frame = next(iter(loaded.frames.values()))
+        self.assertIs(loaded.packets[frame.packet.id], frame.packet)
+
+    def test_rejects_other_files(self):
+
+        filename = os.path.join(self.directory.name, "other.snapshot")
+
+        with open(filename, mode="wb") as fp:
+            fp.write(b"not a snapshot")
+
+        with self.assertRaises(Exception):
+            snapshot.read_snapshot(filename, Application)
+
+        with open(filename, mode="wb") as fp:
+            fp.write(snapshot.HEADER.pack(snapshot.MAGIC, snapshot.VERSION + 1))
+
+        with self.assertRaises(Exception):
+            snapshot.read_snapshot(filename, Application)
+
+        snapshot.write_snapshot(filename, {"frames": []})
+
+        with self.assertRaises(Exception):
+            snapshot.read_snapshot(filename, Application)
+
+        self.assertEqual(struct.calcsize(snapshot.HEADER.format), snapshot.HEADER.size)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import math
+import random
+import unittest
+
+from types import SimpleNamespace
+
+from fingerprinting.analysis.h2 import Http2Frame
+from fingerprinting.analysis.statistics import Distribution, Moments, QuantileSketch, Statistics
+
+
+def exact_quantile(values, q):
+
+    # the element QuantileSketch.quantile estimates
+    return sorted(values)[int(q * (len(values) - 1))]
+
+
+def make_sketch(values):
+
+    sketch = QuantileSketch()
+
+    for value in values:
+        sketch.insert(value)
+
+    return sketch
+
+
+class QuantileSketchTest(unittest.TestCase):
+
+    def assertQuantiles(self, sketch, values):
+
+        for q in (0.0, 0.1, 0.5, 0.9, 0.99, 1.0):
+
+            exact = exact_quantile(values, q)
+            estimate = sketch.quantile(q)
+
+            self.assertLessEqual(abs(estimate - exact), sketch.relative_accuracy * exact + 1e-12, msg=(q, exact))
+
+    def test_quantiles(self):
+
+        generator = random.Random(1)
+
+        for values in (
+            [generator.lognormvariate(0, 2) for _ in range(5000)],
+            [generator.randint(9, 16393) for _ in range(5000)],
+            [0.0] * 100 + [generator.expovariate(100) for _ in range(900)],
+            [42.0],
+        ):
+            self.assertQuantiles(make_sketch(values), values)
+
+    def test_merge(self):
+
+        generator = random.Random(2)
+
+        parts = [
+            [generator.lognormvariate(mean, 1) for _ in range(generator.randint(1, 2000))]
+            for mean in (-3, 0, 3)
+        ] + [[0.0] * 10]
+
+        sketch = QuantileSketch()
+
+        for values in parts:
+            sketch.merge(make_sketch(values))
+
+        values = [value for values in parts for value in values]
+
+        self.assertEqual(sketch.count, len(values))
+        self.assertEqual(sketch.buckets, make_sketch(values).buckets)
+        self.assertQuantiles(sketch, values)
+
+    def test_merge_accuracy_mismatch(self):
+
+        with self.assertRaises(Exception):
+            QuantileSketch().merge(QuantileSketch(0.05))
+
+    def test_empty(self):
+
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+
+class MomentsTest(unittest.TestCase):
+
+    def test_merge(self):
+
+        generator = random.Random(3)
+        values = [generator.gauss(10, 3) for _ in range(1000)]
+
+        merged = Moments()
+
+        for start in range(0, len(values), 300):
+
+            part = Moments()
+
+            for value in values[start:start + 300]:
+                part.insert(value)
+
+            merged.merge(part)
+
+        mean = sum(values) / len(values)
+        variance = sum((value - mean) ** 2 for value in values) / len(values)
+
+        self.assertEqual(merged.count, len(values))
+        self.assertAlmostEqual(merged.mean, mean)
+        self.assertAlmostEqual(merged.variance, variance)
+        self.assertEqual((merged.minimum, merged.maximum), (min(values), max(values)))
+
+
+def make_frame(frame_type, direction, length, timestamp):
+    return SimpleNamespace(type=frame_type, direction=direction, length=length, timestamp=timestamp)
+
+
+class StatisticsTest(unittest.TestCase):
+
+    def test_direction_gaps(self):
+
+        # the gaps of a direction run between consecutive frames of any type
+        statistics = Statistics()
+
+        for frame in (
+            make_frame(Http2Frame.HEADERS, "S2C", 100, 1.0),
+            make_frame(Http2Frame.DATA, "S2C", 1000, 1.5),
+            make_frame(Http2Frame.HEADERS, "S2C", 100, 3.0),
+            make_frame(Http2Frame.HEADERS, "C2S", 50, 0.5),
+        ):
+            statistics.insert_frame(frame)
+
+        distributions = statistics.serialize_distributions()
+        server = distributions["directions"]["S2C"]
+
+        self.assertEqual(server["count"], 3)
+        self.assertEqual(server["length"], 1200)
+        self.assertEqual(server["inter_arrival"]["count"], 2)
+        self.assertAlmostEqual(server["inter_arrival"]["mean"], 1.0)
+        self.assertFalse(server["inter_arrival"]["pooled"])
+
+        headers = distributions["frames"]["HEADERS"]["S2C"]
+        self.assertAlmostEqual(headers["inter_arrival"]["mean"], 2.0)
+
+    def test_merge_is_pooled(self):
+
+        first = Statistics()
+        second = Statistics()
+
+        first.insert_frame(make_frame(Http2Frame.DATA, "S2C", 10, 1.0))
+        first.insert_frame(make_frame(Http2Frame.DATA, "S2C", 10, 2.0))
+        second.insert_frame(make_frame(Http2Frame.DATA, "S2C", 10, 1.5))
+        second.insert_frame(make_frame(Http2Frame.DATA, "S2C", 10, 2.5))
+
+        merged = Statistics().merge(first)
+        self.assertFalse(merged.get_direction("S2C").pooled)
+
+        merged.merge(second)
+        direction = merged.get_direction("S2C")
+
+        # two gaps of one second each, not the three half-second gaps of the
+        # interleaved sequence
+        self.assertTrue(direction.pooled)
+        self.assertEqual(direction.count, 4)
+        self.assertEqual(direction.gaps.count, 2)
+        self.assertAlmostEqual(direction.gaps.mean, 1.0)
+        self.assertEqual(merged.total_length, 40)
+
+    def test_counters_only(self):
+
+        # streams keep the per type counters without any distributions
+        connection = Statistics()
+        connection.insert_frame(make_frame(Http2Frame.DATA, "S2C", 10, 2.0))
+
+        statistics = Statistics(distributions=False)
+        statistics.insert_frame(make_frame(Http2Frame.DATA, "S2C", 10, 1.0))
+        statistics.merge(connection)
+
+        self.assertEqual(statistics.distributions, {})
+        self.assertEqual(statistics.directions, {})
+        self.assertEqual(statistics.total_count, 2)
+        self.assertEqual(statistics.mapping[Http2Frame.DATA]["length"], 20)
+
+    def test_distribution_throughput(self):
+
+        distribution = Distribution()
+
+        for timestamp in (0.0, 1.0, 2.0):
+            distribution.insert(100, timestamp)
+
+        self.assertEqual(distribution.duration, 2.0)
+        self.assertEqual(distribution.throughput, 150.0)
+        self.assertTrue(math.isclose(distribution.gap_sketch.quantile(0.5), 1.0, rel_tol=0.01))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,8 @@ import sys
 import subprocess
 
 from test.process_tests import firefox1
+from test.process_tests import firefox1_mapping
 
 if __name__ == "__main__":
+    firefox1_mapping()
     firefox1()